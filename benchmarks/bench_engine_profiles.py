@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк профилей движка БД: прежние общие настройки против профиля диалекта.
+
+Нагрузка - параллельные пользователи, которые создают посты и читают ленту
+через репозитории бота. Запуск из корня репозитория:
+
+    python benchmarks/bench_engine_profiles.py
+
+Переменные окружения:
+    BENCH_USERS        - количество параллельных пользователей (по умолчанию 20)
+    BENCH_OPS          - операций на пользователя (по умолчанию 50)
+    BENCH_POSTGRES_URL - дополнительно прогнать на PostgreSQL (postgresql+asyncpg://...)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+import events_bot.bot.handlers  # noqa: E402,F401  (порядок импорта как в main.py)
+from events_bot.database.connection import build_engine  # noqa: E402
+from events_bot.database.models import Base, Category, User  # noqa: E402
+from events_bot.database.repositories import PostRepository  # noqa: E402
+
+USERS = int(os.getenv("BENCH_USERS", "20"))
+OPS = int(os.getenv("BENCH_OPS", "50"))
+
+# Настройки, которые раньше применялись ко всем диалектам
+LEGACY_OPTIONS = dict(
+    echo=False, pool_pre_ping=True, pool_recycle=300, pool_size=10, max_overflow=20
+)
+
+
+async def prepare(engine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as db:
+        category = Category(name="Bench")
+        db.add(category)
+        await db.flush()
+        for user_id in range(1, USERS + 1):
+            user = User(id=user_id, username=f"user{user_id}", city="Moscow")
+            user.categories.append(category)
+            db.add(user)
+        await db.commit()
+
+
+async def user_workload(session_maker, user_id: int, category_id: int, errors: list) -> None:
+    for op in range(OPS):
+        try:
+            async with session_maker() as db:
+                if op % 2 == 0:
+                    await PostRepository.create_post(
+                        db, f"Post {user_id}-{op}", "Bench", user_id, [category_id], "Moscow"
+                    )
+                else:
+                    await PostRepository.get_feed_posts(db, user_id, limit=10)
+        except Exception as e:
+            errors.append(type(e).__name__)
+
+
+async def run(name: str, engine) -> None:
+    await prepare(engine)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    errors: list = []
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(user_workload(session_maker, user_id, 1, errors) for user_id in range(1, USERS + 1))
+    )
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    total = USERS * OPS
+    print(
+        f"{name:<28} {total / elapsed:>9.1f} оп/с  {elapsed:>7.2f} с  ошибок: {len(errors)}"
+        + (f" ({', '.join(sorted(set(errors)))})" if errors else "")
+    )
+
+
+async def main() -> None:
+    print(f"Пользователей: {USERS}, операций на пользователя: {OPS}\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_url = f"sqlite+aiosqlite:///{tmp}/legacy.db"
+        profile_url = f"sqlite+aiosqlite:///{tmp}/profile.db"
+        await run("sqlite: общие настройки", create_async_engine(legacy_url, **LEGACY_OPTIONS))
+        await run("sqlite: профиль", build_engine(profile_url))
+
+    postgres_url = os.getenv("BENCH_POSTGRES_URL")
+    if postgres_url:
+        await run("postgres: общие настройки", create_async_engine(postgres_url, **LEGACY_OPTIONS))
+        await run("postgres: профиль", build_engine(postgres_url))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк горячих запросов репозиториев: select(...), собираемый при каждом
+вызове, против заранее собранных запросов с параметрами (bindparam).
+
+Замеряется процессорное время на вызов (time.process_time), то есть работа
+Python на построение запроса, ключ кэша, компиляцию и разбор результата.
+Запуск из корня репозитория:
+
+    python benchmarks/bench_query_compile.py
+
+Переменные окружения:
+    BENCH_CALLS - вызовов каждого запроса (по умолчанию 2000)
+    BENCH_RATE  - обновлений в секунду для оценки экономии CPU (по умолчанию 50)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import and_, func, or_, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+import events_bot.bot.handlers  # noqa: E402,F401  (порядок импорта как в main.py)
+from events_bot.database.connection import build_engine  # noqa: E402
+from events_bot.database.models import Base, Category, Like, Post, User  # noqa: E402
+from events_bot.database.repositories import (  # noqa: E402
+    LikeRepository,
+    PostRepository,
+    UserRepository,
+)
+
+CALLS = int(os.getenv("BENCH_CALLS", "2000"))
+RATE = float(os.getenv("BENCH_RATE", "50"))
+
+
+# Прежние формы запросов: select собирается заново при каждом вызове
+async def legacy_get_by_telegram_id(db, telegram_id):
+    result = await db.execute(select(User).where(User.id == telegram_id))
+    return result.scalar_one_or_none()
+
+
+async def legacy_get_user_like(db, user_id, post_id):
+    result = await db.execute(
+        select(Like).where(and_(Like.user_id == user_id, Like.post_id == post_id))
+    )
+    return result.scalar_one_or_none()
+
+
+async def legacy_user_category_ids(db, user_id):
+    result = await db.execute(
+        select(User).where(User.id == user_id).options(selectinload(User.categories))
+    )
+    user = result.scalar_one_or_none()
+    return [category.id for category in user.categories] if user else []
+
+
+async def legacy_get_feed_posts(db, user_id, limit=10, offset=0):
+    category_ids = await legacy_user_category_ids(db, user_id)
+    if not category_ids:
+        return []
+    result = await db.execute(
+        select(Post)
+        .join(Post.categories)
+        .where(
+            and_(
+                Post.categories.any(Category.id.in_(category_ids)),
+                Post.is_approved == True,
+                Post.is_published == True,
+                or_(Post.event_at.is_(None), Post.event_at > func.now()),
+            )
+        )
+        .options(selectinload(Post.author), selectinload(Post.categories))
+        .order_by(Post.published_at.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return result.scalars().all()
+
+
+async def legacy_get_feed_posts_count(db, user_id):
+    category_ids = await legacy_user_category_ids(db, user_id)
+    if not category_ids:
+        return 0
+    result = await db.execute(
+        select(func.count(Post.id))
+        .join(Post.categories)
+        .where(
+            and_(
+                Post.categories.any(Category.id.in_(category_ids)),
+                Post.is_approved == True,
+                Post.is_published == True,
+                or_(Post.event_at.is_(None), Post.event_at > func.now()),
+            )
+        )
+    )
+    return result.scalar() or 0
+
+
+QUERIES = [
+    (
+        "get_by_telegram_id",
+        legacy_get_by_telegram_id,
+        UserRepository.get_by_telegram_id,
+        lambda i: (i % 50 + 1,),
+    ),
+    (
+        "get_user_like",
+        legacy_get_user_like,
+        LikeRepository.get_user_like,
+        lambda i: (i % 50 + 1, i % 20 + 1),
+    ),
+    (
+        "get_feed_posts",
+        legacy_get_feed_posts,
+        PostRepository.get_feed_posts,
+        lambda i: (i % 50 + 1,),
+    ),
+    (
+        "get_feed_posts_count",
+        legacy_get_feed_posts_count,
+        PostRepository.get_feed_posts_count,
+        lambda i: (i % 50 + 1,),
+    ),
+]
+
+
+async def prepare(engine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as db:
+        categories = [Category(name=f"Bench {index}") for index in range(3)]
+        db.add_all(categories)
+        users = []
+        for user_id in range(1, 51):
+            user = User(id=user_id, username=f"user{user_id}", city="Moscow")
+            user.categories.extend(categories[: user_id % 3 + 1])
+            users.append(user)
+        db.add_all(users)
+        event_at = datetime.now() + timedelta(days=7)
+        for index in range(20):
+            post = Post(
+                title=f"Post {index}",
+                content="Bench",
+                author_id=index + 1,
+                city="Moscow",
+                event_at=event_at,
+                is_approved=True,
+                is_published=True,
+                published_at=datetime.now(),
+            )
+            post.categories.append(categories[index % 3])
+            db.add(post)
+        await db.flush()
+        db.add_all(Like(user_id=user_id, post_id=user_id % 20 + 1) for user_id in range(1, 51))
+        await db.commit()
+
+
+async def measure(session_maker, func, args_for) -> float:
+    """Процессорное время на вызов, мкс"""
+    async with session_maker() as db:
+        # Прогрев: кэши компиляции и соединение
+        for i in range(50):
+            await func(db, *args_for(i))
+        started = time.process_time()
+        for i in range(CALLS):
+            await func(db, *args_for(i))
+        elapsed = time.process_time() - started
+    return elapsed / CALLS * 1e6
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        await prepare(engine)
+        session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        print(f"Вызовов каждого запроса: {CALLS}\n")
+        print(f"{'запрос':<22} {'select, мкс':>12} {'готовый, мкс':>13} {'экономия':>9}")
+        saved_total = 0.0
+        for name, legacy, cached, args_for in QUERIES:
+            legacy_us = await measure(session_maker, legacy, args_for)
+            cached_us = await measure(session_maker, cached, args_for)
+            saved_total += legacy_us - cached_us
+            print(
+                f"{name:<22} {legacy_us:>12.1f} {cached_us:>13.1f} "
+                f"{(1 - cached_us / legacy_us) * 100:>8.1f}%"
+            )
+        await engine.dispose()
+
+    # Типичное обновление ленты: пользователь, лайк, страница и счетчик
+    print(
+        f"\nЭкономия CPU на обновление (все четыре запроса): {saved_total:.1f} мкс; "
+        f"при {RATE:.0f} обновлениях/с - {saved_total * RATE / 1e4:.2f}% одного ядра"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк инициализации БД при старте: прежний create_all + проверка категорий
+(и 15 отдельных commit при первом запуске) против миграций с версией схемы.
+
+Каждый запуск создает новый движок, как при перезапуске бота. Запуск из
+корня репозитория:
+
+    python benchmarks/bench_startup.py
+
+Переменные окружения:
+    BENCH_RUNS         - количество запусков (по умолчанию 20)
+    BENCH_POSTGRES_URL - дополнительно замерить повторный старт на PostgreSQL
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker  # noqa: E402
+
+import events_bot.bot.handlers  # noqa: E402,F401  (порядок импорта как в main.py)
+from events_bot.database.connection import build_engine  # noqa: E402
+from events_bot.database.migrations import DEFAULT_CATEGORIES, run_migrations  # noqa: E402
+from events_bot.database.models import Base  # noqa: E402
+from events_bot.database.partitioning import add_event_at_columns  # noqa: E402
+from events_bot.database.repositories import CategoryRepository  # noqa: E402
+
+RUNS = int(os.getenv("BENCH_RUNS", "20"))
+
+
+async def legacy_init(engine) -> None:
+    """Прежний init_database"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await add_event_at_columns(conn)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as db:
+        if not await CategoryRepository.get_all_active(db):
+            for category in DEFAULT_CATEGORIES:
+                await CategoryRepository.create_category(db, **category)
+
+
+async def migrations_init(engine) -> None:
+    await run_migrations(engine)
+
+
+async def start(url: str, init) -> float:
+    """Время одного старта в мс, включая первое соединение"""
+    started = time.perf_counter()
+    engine = build_engine(url)
+    await init(engine)
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return elapsed * 1000
+
+
+async def measure(name: str, make_url, init, cold: bool) -> None:
+    timings = []
+    for run in range(RUNS):
+        url = make_url(run if cold else "warm")
+        if not cold and run == 0:
+            # Первый запуск только готовит базу
+            await start(url, init)
+        timings.append(await start(url, init))
+    print(
+        f"{name:<46} медиана {statistics.median(timings):>8.1f} мс  "
+        f"мин {min(timings):>8.1f} мс"
+    )
+
+
+async def main() -> None:
+    print(f"Запусков: {RUNS}\n")
+    for name, init in (("create_all + категории", legacy_init), ("миграции", migrations_init)):
+        with tempfile.TemporaryDirectory() as tmp:
+            make_url = lambda suffix: f"sqlite+aiosqlite:///{tmp}/{suffix}.db"  # noqa: E731
+            await measure(f"sqlite, первый старт: {name}", make_url, init, cold=True)
+            await measure(f"sqlite, повторный старт: {name}", make_url, init, cold=False)
+
+    postgres_url = os.getenv("BENCH_POSTGRES_URL")
+    if postgres_url:
+        for name, init in (("create_all + категории", legacy_init), ("миграции", migrations_init)):
+            await measure(f"postgres, повторный старт: {name}", lambda _: postgres_url, init, cold=False)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк приема обновлений: long polling против webhook.
+
+Оба режима работают локально, без Telegram. Для polling используется сессия
+бота, которая отвечает на getUpdates пачками синтетических обновлений с
+искусственной задержкой сети (как долгий опрос с накопившейся очередью).
+Для webhook обновления отправляются POST-запросами на aiohttp-сервер из
+events_bot.bot.webhook. Обработчик сообщения имитирует работу через sleep.
+Запуск из корня репозитория:
+
+    python benchmarks/bench_webhook.py
+
+Переменные окружения:
+    BENCH_UPDATES     - количество обновлений (по умолчанию 2000)
+    BENCH_WORK_MS     - время обработки одного обновления, мс (по умолчанию 20)
+    BENCH_RTT_MS      - задержка ответа getUpdates, мс (по умолчанию 50)
+    BENCH_BATCH       - обновлений в одном ответе getUpdates (по умолчанию 100)
+    BENCH_CONCURRENCY - одновременных POST-запросов к webhook (по умолчанию 40)
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.methods import GetMe, GetUpdates  # noqa: E402
+from aiogram.types import Message, Update, User  # noqa: E402
+from aiohttp import ClientSession, web  # noqa: E402
+
+import events_bot.bot.handlers  # noqa: E402,F401  (порядок импорта как в main.py)
+from events_bot.bot.webhook import create_webhook_app  # noqa: E402
+
+UPDATES = int(os.getenv("BENCH_UPDATES", "2000"))
+WORK_MS = float(os.getenv("BENCH_WORK_MS", "20"))
+RTT_MS = float(os.getenv("BENCH_RTT_MS", "50"))
+BATCH = int(os.getenv("BENCH_BATCH", "100"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "40"))
+TOKEN = "42:TEST"
+SECRET = "bench-secret"
+
+
+def make_update(update_id: int) -> Dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": update_id, "type": "private"},
+            "from": {"id": update_id, "is_bot": False, "first_name": "Bench"},
+            "text": str(time.perf_counter()),
+        },
+    }
+
+
+class Stats:
+    """Задержки от отправки обновления до окончания обработки"""
+
+    def __init__(self):
+        self.sent_at: Dict[int, float] = {}
+        self.latencies: List[float] = []
+        self.done = asyncio.Event()
+
+    def finish(self, update_id: int) -> None:
+        self.latencies.append(time.perf_counter() - self.sent_at[update_id])
+        if len(self.latencies) == UPDATES:
+            self.done.set()
+
+
+def make_dispatcher(stats: Stats) -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.message()
+    async def handle(message: Message):
+        await asyncio.sleep(WORK_MS / 1000)
+        stats.finish(message.message_id)
+
+    return dp
+
+
+class FakePollingSession(BaseSession):
+    """Сессия, отдающая синтетические обновления на getUpdates"""
+
+    def __init__(self, stats: Stats):
+        super().__init__()
+        self.stats = stats
+        self.next_id = 1
+
+    async def make_request(self, bot, method, timeout=None):
+        if isinstance(method, GetMe):
+            return User(id=42, is_bot=True, first_name="Bench")
+        if isinstance(method, GetUpdates):
+            await asyncio.sleep(RTT_MS / 1000)
+            updates = []
+            while self.next_id <= UPDATES and len(updates) < BATCH:
+                # Время отправки - момент, когда обновление попало в очередь Telegram
+                self.stats.sent_at[self.next_id] = time.perf_counter()
+                updates.append(Update.model_validate(make_update(self.next_id)))
+                self.next_id += 1
+            if not updates:
+                await asyncio.sleep(3600)
+            return updates
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def report(name: str, elapsed: float, latencies: List[float], acks: List[float] = None) -> None:
+    latencies = sorted(latencies)
+    line = (
+        f"{name:<10} {UPDATES / elapsed:>8.0f} обн/с  "
+        f"медиана {statistics.median(latencies) * 1000:>7.1f} мс  "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:>7.1f} мс"
+    )
+    if acks:
+        line += f"  ответ 200: медиана {statistics.median(acks) * 1000:.2f} мс"
+    print(line)
+
+
+async def bench_polling() -> None:
+    stats = Stats()
+    dp = make_dispatcher(stats)
+    bot = Bot(TOKEN, session=FakePollingSession(stats))
+    started = time.perf_counter()
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+    await stats.done.wait()
+    elapsed = time.perf_counter() - started
+    await dp.stop_polling()
+    await polling
+    report("polling", elapsed, stats.latencies)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def bench_webhook() -> None:
+    stats = Stats()
+    dp = make_dispatcher(stats)
+    bot = Bot(TOKEN)
+    app = create_webhook_app(dp, bot, "/webhook", secret_token=SECRET)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    url = f"http://127.0.0.1:{port}/webhook"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    acks: List[float] = []
+    queue = asyncio.Queue()
+    for update_id in range(1, UPDATES + 1):
+        queue.put_nowait(update_id)
+
+    async def sender(session: ClientSession):
+        # Как Telegram: не больше max_connections одновременных запросов
+        while not queue.empty():
+            update_id = queue.get_nowait()
+            stats.sent_at[update_id] = sent = time.perf_counter()
+            async with session.post(url, json=make_update(update_id), headers=headers) as response:
+                assert response.status == 200, response.status
+            acks.append(time.perf_counter() - sent)
+
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*(sender(session) for _ in range(CONCURRENCY)))
+        await stats.done.wait()
+    elapsed = time.perf_counter() - started
+    await runner.cleanup()
+    await bot.session.close()
+    report("webhook", elapsed, stats.latencies, acks)
+
+
+async def main() -> None:
+    print(
+        f"Обновлений: {UPDATES}, обработка {WORK_MS:g} мс, getUpdates {RTT_MS:g} мс "
+        f"по {BATCH}, соединений webhook: {CONCURRENCY}\n"
+    )
+    await bench_polling()
+    await bench_webhook()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
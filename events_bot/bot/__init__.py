@@ -12,7 +12,8 @@ from .keyboards import (
 )
 from .states import UserStates, PostStates
 from .utils import send_post_notification
-from .middleware import DatabaseMiddleware
+from .middleware import DatabaseMiddleware, LazySession, ThrottlingMiddleware
+from .dispatcher import build_dispatcher
 
 __all__ = [
     "register_start_handlers",
@@ -27,4 +28,7 @@ __all__ = [
     "PostStates",
     "send_post_notification",
     "DatabaseMiddleware",
+    "LazySession",
+    "ThrottlingMiddleware",
+    "build_dispatcher",
 ]
@@ -0,0 +1,187 @@
+"""
+Типизированные callback_data и таблица маршрутизации по префиксу.
+
+Кнопки с параметрами кодируются фабриками CallbackData с короткими
+префиксами, действия - числами (IntEnum): "f:2:0:3:0" вместо
+"feed_next_3_12". Обработчик такой кнопки находится одним поиском префикса
+в CallbackTable, а не перебором фильтров F.data.startswith(...) по всем
+роутерам. Кнопки без параметров ("main_menu", "help" и т.п.) по-прежнему
+обрабатываются обычными фильтрами роутеров.
+"""
+
+from enum import IntEnum
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+import logfire
+from aiogram import Router
+from aiogram.dispatcher.event.bases import SkipHandler
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.state import State
+from aiogram.types import CallbackQuery
+
+
+class Section(IntEnum):
+    FEED = 0
+    LIKED = 1
+
+
+class FeedAction(IntEnum):
+    OPEN = 0
+    PREV = 1
+    NEXT = 2
+    BACK = 3
+    HEART = 4
+
+
+class ModerateAction(IntEnum):
+    APPROVE = 0
+    REJECT = 1
+    CHANGES = 2
+
+
+class FeedCallback(CallbackData, prefix="f"):
+    """Лента и избранное: навигация, карточка поста, сердечко"""
+
+    action: FeedAction
+    section: Section
+    page: int
+    post_id: int = 0
+
+
+class LikeCallback(CallbackData, prefix="lk"):
+    """Сердечко из уведомления о новом посте"""
+
+    post_id: int
+
+
+class CityCallback(CallbackData, prefix="ct"):
+    """Выбор города в профиле (индекс в CITIES)"""
+
+    index: int
+
+
+class PostCityCallback(CallbackData, prefix="pct"):
+    """Выбор города нового поста (индекс в CITIES)"""
+
+    index: int
+
+
+class CategoryCallback(CallbackData, prefix="c"):
+    """Выбор категории в профиле"""
+
+    category_id: int
+
+
+class PostCategoryCallback(CallbackData, prefix="pc"):
+    """Выбор категории нового поста"""
+
+    category_id: int
+
+
+class ModerateCallback(CallbackData, prefix="m"):
+    """Действие модератора над постом"""
+
+    action: ModerateAction
+    post_id: int
+
+
+def _parse_legacy_like(data: str) -> CallbackData:
+    # like_post_<post_id>
+    return LikeCallback(post_id=int(data.rsplit("_", 1)[1]))
+
+
+def _parse_legacy_moderate(data: str) -> CallbackData:
+    # moderate_<approve|reject|changes>_<post_id>
+    _, action, post_id = data.split("_")
+    return ModerateCallback(action=ModerateAction[action.upper()], post_id=int(post_id))
+
+
+# Кнопки прежнего формата в уже отправленных сообщениях (уведомления, очередь модерации)
+LEGACY_PARSERS: Dict[str, Callable[[str], CallbackData]] = {
+    "like_post_": _parse_legacy_like,
+    "moderate_": _parse_legacy_moderate,
+}
+
+
+class CallbackTable:
+    """Таблица префикс -> (фабрика callback_data, обработчик, требуемое состояние FSM)"""
+
+    def __init__(self):
+        self._routes: Dict[str, Tuple[Type[CallbackData], HandlerObject, Optional[str]]] = {}
+
+    def route(self, factory: Type[CallbackData], state: State = None):
+        """
+        Декоратор обработчика кнопок фабрики factory.
+
+        Обработчик получает callback, callback_data и данные middleware
+        (db, state и т.п.) по именам своих параметров, как обычный обработчик aiogram.
+        """
+
+        def decorator(handler: Callable) -> Callable:
+            self._routes[factory.__prefix__] = (
+                factory,
+                HandlerObject(callback=handler),
+                state.state if state is not None else None,
+            )
+            return handler
+
+        return decorator
+
+    def _resolve(self, data: str) -> Optional[Tuple[Any, Optional[CallbackData]]]:
+        """
+        Маршрут и разобранные данные кнопки.
+
+        Returns:
+            None - кнопка не из таблицы; (маршрут или None, None) - префикс
+            известен, но данные битые или устаревшего формата
+        """
+        prefix, separator, _ = data.partition(":")
+        route = None
+        if separator:
+            route = self._routes.get(prefix)
+            if route is None:
+                return None
+            parse = route[0].unpack
+        else:
+            for legacy_prefix, parse in LEGACY_PARSERS.items():
+                if data.startswith(legacy_prefix):
+                    break
+            else:
+                return None
+        try:
+            callback_data = parse(data)
+        except (ValueError, TypeError, KeyError) as e:
+            logfire.warning(f"Не удалось разобрать callback_data {data!r}: {e}")
+            return route, None
+        return route or self._routes[callback_data.__prefix__], callback_data
+
+    def handler_for(self, data: str) -> Optional[Callable]:
+        """Обработчик кнопки (для статистики); None - кнопка не из таблицы или битая"""
+        resolved = self._resolve(data)
+        if resolved is None or resolved[1] is None:
+            return None
+        return resolved[0][1].callback
+
+    async def dispatch(self, callback: CallbackQuery, **data: Any) -> Any:
+        resolved = self._resolve(callback.data or "")
+        if resolved is None:
+            # Кнопка без параметров - дальше по фильтрам роутеров
+            raise SkipHandler()
+        if resolved[1] is None:
+            # Кнопка из старого сообщения, формат которой больше не поддерживается
+            await callback.answer("Кнопка устарела, откройте меню заново")
+            return None
+        (_, handler, required_state), callback_data = resolved
+        if required_state is not None and await data["state"].get_state() != required_state:
+            raise SkipHandler()
+        return await handler.call(callback, callback_data=callback_data, **data)
+
+    def register(self, dp: Router) -> None:
+        """Подключить таблицу к диспетчеру (до остальных роутеров)"""
+        router = Router(name="callback_table")
+        router.callback_query()(self.dispatch)
+        dp.include_router(router)
+
+
+# Таблица для использования во всем приложении
+callback_table = CallbackTable()
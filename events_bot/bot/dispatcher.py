@@ -0,0 +1,54 @@
+import os
+from aiogram import Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
+from .callbacks import callback_table
+from .fsm_storage import CoalescingStorage, create_fsm_storage
+from .handlers import (
+    register_start_handlers,
+    register_user_handlers,
+    register_post_handlers,
+    register_callback_handlers,
+    register_moderation_handlers,
+    register_feed_handlers,
+)
+from .middleware import DatabaseMiddleware, FSMBatchMiddleware, ThrottlingMiddleware
+
+
+def build_dispatcher(storage: BaseStorage = None) -> Dispatcher:
+    """
+    Создать диспетчер со всеми middleware и обработчиками.
+
+    Используется и в однопроцессном режиме, и в каждом рабочем процессе
+    (BOT_WORKERS > 1).
+
+    Args:
+        storage: Хранилище FSM (по умолчанию - по FSM_STORAGE, см. fsm_storage.py)
+    """
+    storage = storage or create_fsm_storage()
+    dp = Dispatcher(storage=storage)
+
+    # Изменения FSM за обновление записываются одним запросом
+    if isinstance(storage, CoalescingStorage):
+        dp.update.outer_middleware(FSMBatchMiddleware(storage))
+
+    # Ограничение частоты до поиска обработчика и открытия сессии БД
+    if os.getenv("THROTTLING", "true").lower() != "false":
+        throttling_middleware = ThrottlingMiddleware()
+        dp.message.outer_middleware(throttling_middleware)
+        dp.callback_query.outer_middleware(throttling_middleware)
+
+    # Подключаем middleware для базы данных
+    database_middleware = DatabaseMiddleware()
+    dp.message.middleware(database_middleware)
+    dp.callback_query.middleware(database_middleware)
+
+    # Регистрируем обработчики: сначала кнопки с callback_data из таблицы,
+    # остальные callback проходят дальше к фильтрам роутеров
+    callback_table.register(dp)
+    register_start_handlers(dp)
+    register_user_handlers(dp)
+    register_post_handlers(dp)
+    register_callback_handlers(dp)
+    register_moderation_handlers(dp)
+    register_feed_handlers(dp)
+    return dp
@@ -0,0 +1,239 @@
+"""
+Хранилище состояний FSM (FSM_STORAGE).
+
+- sql (по умолчанию) - таблица fsm_states в основной БД;
+- redis - RedisStorage aiogram по REDIS_URL (нужен пакет redis);
+- memory - MemoryStorage, состояния теряются при перезапуске.
+
+Брошенные состояния удаляются через FSM_STATE_TTL секунд после последнего
+изменения. Изменения состояния за время обработки одного обновления (несколько
+update_data, set_state и т.п.) копятся в памяти и записываются одним запросом
+после обработчика (см. CoalescingStorage и FSMBatchMiddleware).
+"""
+
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+import logfire
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from events_bot.database.connection import create_async_engine_and_session
+from events_bot.database.repositories import FSMRepository
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+class SQLStorage(BaseStorage):
+    """Состояния FSM в таблице fsm_states"""
+
+    def __init__(self, ttl: float = None, evict_interval: float = None):
+        """
+        Args:
+            ttl: Через сколько секунд после последнего изменения состояние удаляется
+            evict_interval: Как часто (в секундах) удалять истекшие записи
+        """
+        self.ttl = ttl or float(os.getenv("FSM_STATE_TTL", "86400"))
+        self.evict_interval = evict_interval or float(os.getenv("FSM_EVICT_INTERVAL", "3600"))
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._last_eviction = time.monotonic()
+
+    def _expires_at(self) -> datetime:
+        return datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=self.ttl)
+
+    async def get_record(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Состояние и данные одним запросом"""
+        _, session_maker = create_async_engine_and_session()
+        async with session_maker() as db:
+            record = await FSMRepository.get(db, self.key_builder.build(key))
+        if record is None:
+            return None, {}
+        state, data = record
+        return state, json.loads(data) if data else {}
+
+    async def _save(self, key: StorageKey, **values) -> None:
+        _, session_maker = create_async_engine_and_session()
+        async with session_maker() as db:
+            await FSMRepository.save(db, self.key_builder.build(key), self._expires_at(), **values)
+            await self._maybe_evict(db)
+
+    async def set_record(self, key: StorageKey, state: StateType, data: Dict[str, Any]) -> None:
+        """Записать состояние и данные одним запросом (пустая запись удаляется)"""
+        state = _state_name(state)
+        if state is None and not data:
+            _, session_maker = create_async_engine_and_session()
+            async with session_maker() as db:
+                await FSMRepository.delete(db, self.key_builder.build(key))
+            return
+        await self._save(key, state=state, data=json.dumps(data, ensure_ascii=False))
+
+    async def _maybe_evict(self, db) -> None:
+        if time.monotonic() - self._last_eviction < self.evict_interval:
+            return
+        self._last_eviction = time.monotonic()
+        deleted = await FSMRepository.delete_expired(db)
+        if deleted:
+            logfire.info(f"Удалено брошенных состояний FSM: {deleted}")
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._save(key, state=_state_name(state))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self.get_record(key))[0]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._save(key, data=json.dumps(data, ensure_ascii=False))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self.get_record(key))[1]
+
+    async def close(self) -> None:
+        pass
+
+
+class _PendingRecord:
+    """Состояние ключа, накопленное за время обработки обновления"""
+
+    __slots__ = ("state", "data", "loaded", "state_changed", "data_changed")
+
+    def __init__(self):
+        self.state: Optional[str] = None
+        self.data: Dict[str, Any] = {}
+        self.loaded = False
+        self.state_changed = False
+        self.data_changed = False
+
+
+# Ключ -> накопленное состояние для текущего обновления (None - вне обработки)
+_pending: ContextVar[Optional[Dict[StorageKey, _PendingRecord]]] = ContextVar(
+    "fsm_pending", default=None
+)
+
+
+class CoalescingStorage(BaseStorage):
+    """
+    Обертка над хранилищем, объединяющая изменения одного обновления.
+
+    Внутри batch() состояние каждого ключа читается из хранилища один раз,
+    а все изменения записываются при выходе: одним set_record, если его
+    поддерживает хранилище, иначе по одному set_state/set_data.
+    Вне batch() вызовы передаются хранилищу как есть.
+    """
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    @asynccontextmanager
+    async def batch(self):
+        if _pending.get() is not None:
+            yield
+            return
+        token = _pending.set({})
+        try:
+            yield
+        finally:
+            pending = _pending.get()
+            _pending.reset(token)
+            # Пишем и при ошибке обработчика: без обертки изменения уже были бы сохранены
+            await self._flush(pending)
+
+    async def _flush(self, pending: Dict[StorageKey, _PendingRecord]) -> None:
+        set_record = getattr(self.storage, "set_record", None)
+        for key, record in pending.items():
+            if record.state_changed and record.data_changed and set_record is not None:
+                await set_record(key, record.state, record.data)
+                continue
+            if record.state_changed:
+                await self.storage.set_state(key, record.state)
+            if record.data_changed:
+                await self.storage.set_data(key, record.data)
+
+    async def _get_pending(self, key: StorageKey) -> Optional[_PendingRecord]:
+        pending = _pending.get()
+        if pending is None:
+            return None
+        record = pending.get(key)
+        if record is None:
+            record = pending[key] = _PendingRecord()
+        if not record.loaded:
+            get_record = getattr(self.storage, "get_record", None)
+            if get_record is not None:
+                state, data = await get_record(key)
+            else:
+                state = await self.storage.get_state(key)
+                data = await self.storage.get_data(key)
+            if not record.state_changed:
+                record.state = state
+            if not record.data_changed:
+                record.data = data
+            record.loaded = True
+        return record
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        pending = _pending.get()
+        if pending is None:
+            await self.storage.set_state(key, state)
+            return
+        record = pending.setdefault(key, _PendingRecord())
+        record.state = _state_name(state)
+        record.state_changed = True
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._get_pending(key)
+        if record is None:
+            return await self.storage.get_state(key)
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        pending = _pending.get()
+        if pending is None:
+            await self.storage.set_data(key, data)
+            return
+        record = pending.setdefault(key, _PendingRecord())
+        record.data = data.copy()
+        record.data_changed = True
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get_pending(key)
+        if record is None:
+            return await self.storage.get_data(key)
+        return record.data.copy()
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+
+def _create_redis_storage(ttl: float) -> Optional[BaseStorage]:
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        logfire.warning("FSM_STORAGE=redis, но REDIS_URL не задан")
+        return None
+    try:
+        from aiogram.fsm.storage.redis import RedisStorage
+    except ImportError:
+        logfire.warning("Пакет redis не установлен (pip install redis)")
+        return None
+    return RedisStorage.from_url(redis_url, state_ttl=int(ttl), data_ttl=int(ttl))
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Хранилище FSM по переменной FSM_STORAGE"""
+    backend = os.getenv("FSM_STORAGE", "sql").lower()
+    if backend == "memory":
+        return MemoryStorage()
+
+    ttl = float(os.getenv("FSM_STATE_TTL", "86400"))
+    if backend == "redis":
+        storage = _create_redis_storage(ttl)
+        if storage is None:
+            logfire.warning("Используем SQL-хранилище FSM")
+            storage = SQLStorage(ttl)
+    else:
+        storage = SQLStorage(ttl)
+    return CoalescingStorage(storage)
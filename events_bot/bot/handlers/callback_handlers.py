@@ -4,6 +4,8 @@ from aiogram.fsm.context import FSMContext
 from events_bot.database.services import UserService, CategoryService, LikeService, NotificationService
 from events_bot.bot.states import UserStates
 from events_bot.bot.keyboards import get_category_selection_keyboard, get_main_keyboard
+from events_bot.bot.utils import edit_reply_markup, edit_text
+from events_bot.bot.callbacks import CategoryCallback, LikeCallback, callback_table
 
 router = Router()
 
@@ -13,10 +15,10 @@ def register_callback_handlers(dp: Router):
     dp.include_router(router)
 
 
-@router.callback_query(F.data.startswith("category_"))
-async def process_category_selection(callback: CallbackQuery, state: FSMContext, db):
+@callback_table.route(CategoryCallback)
+async def process_category_selection(callback: CallbackQuery, callback_data: CategoryCallback, state: FSMContext, db):
     """Обработка выбора категории (множественный выбор)"""
-    category_id = int(callback.data.split("_")[1])
+    category_id = callback_data.category_id
 
     # Получаем все категории
     categories = await CategoryService.get_all_categories(db)
@@ -34,7 +36,8 @@ async def process_category_selection(callback: CallbackQuery, state: FSMContext,
     await state.update_data(selected_categories=selected_ids)
 
     # Обновляем клавиатуру
-    await callback.message.edit_reply_markup(
+    await edit_reply_markup(
+        callback.message,
         reply_markup=get_category_selection_keyboard(categories, selected_ids)
     )
     await callback.answer()
@@ -58,22 +61,24 @@ async def confirm_categories_selection(callback: CallbackQuery, state: FSMContex
     selected_categories = [cat for cat in categories if cat.id in selected_ids]
     category_names = ", ".join([cat.name for cat in selected_categories])
 
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✅ Выбраны категории: {category_names}\n\n"
         "Теперь вы можете получать уведомления в этих категориях."
     )
 
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "Выберите действие:", reply_markup=get_main_keyboard()
     )
     await state.clear()
 
 
-@router.callback_query(F.data.startswith("like_post_"))
-async def handle_like_from_notification(callback: CallbackQuery, db):
+@callback_table.route(LikeCallback)
+async def handle_like_from_notification(callback: CallbackQuery, callback_data: LikeCallback, db):
     """Обработка лайка из уведомления"""
     try:
-        post_id = int(callback.data.split("_")[2])
+        post_id = callback_data.post_id
         user_id = callback.from_user.id
 
         # Проверяем, есть ли уже лайк
@@ -88,7 +93,7 @@ async def handle_like_from_notification(callback: CallbackQuery, db):
 
         # Обновляем кнопку
         new_keyboard = NotificationService.get_like_keyboard(post_id, result["action"] == "added")
-        await callback.message.edit_reply_markup(reply_markup=new_keyboard)
+        await edit_reply_markup(callback.message, reply_markup=new_keyboard)
 
     except Exception as e:
         logfire.error(f"Ошибка при лайке из уведомления: {e}")
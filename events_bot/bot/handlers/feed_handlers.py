@@ -1,8 +1,8 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, FSInputFile, InputMediaPhoto, Message
 from aiogram.fsm.context import FSMContext
-from aiogram.exceptions import TelegramBadRequest
-from events_bot.database.services import PostService, LikeService
+from events_bot.database import PostView, release_connection
+from events_bot.database.services import PostService, LikeService, MediaService
 from events_bot.bot.keyboards.main_keyboard import get_main_keyboard
 from events_bot.bot.keyboards.feed_keyboard import (
     get_feed_list_keyboard,
@@ -10,9 +10,11 @@ from events_bot.bot.keyboards.feed_keyboard import (
     get_liked_list_keyboard,
     get_liked_post_keyboard,
 )
-from events_bot.storage import file_storage
+from events_bot.bot.utils import edit_media, edit_reply_markup, edit_text
+from events_bot.bot.callbacks import FeedAction, FeedCallback, Section, callback_table
 import logfire
 from datetime import timezone
+from typing import List
 try:
     from zoneinfo import ZoneInfo
 except Exception:
@@ -41,31 +43,28 @@ async def show_feed_callback(callback: CallbackQuery, db):
     await show_feed_page(callback, 0, db)
 
 
-@router.callback_query(F.data.startswith("feed_"))
-async def handle_feed_navigation(callback: CallbackQuery, db):
-    """Обработка навигации по ленте"""
-    data = callback.data.split("_")
-    action = data[1]
-    logfire.info(f"Пользователь {callback.from_user.id} навигация по ленте: {action}")
+@callback_table.route(FeedCallback)
+async def handle_feed_navigation(callback: CallbackQuery, callback_data: FeedCallback, db):
+    """Обработка навигации по ленте и избранному"""
+    action = callback_data.action
+    current_page = callback_data.page
+    liked = callback_data.section == Section.LIKED
+    show_page = show_liked_page if liked else show_feed_page
+    logfire.info(
+        f"Пользователь {callback.from_user.id} навигация по "
+        f"{'избранному' if liked else 'ленте'}: {action.name.lower()}"
+    )
     try:
-        if action in ["prev", "next"]:
-            current_page = int(data[2])
-            total_pages = int(data[3])
-            new_page = max(0, current_page - 1) if action == "prev" else current_page + 1
-            await show_feed_page(callback, new_page, db)
-        elif action == "open":
-            post_id = int(data[2])
-            current_page = int(data[3])
-            total_pages = int(data[4])
-            await show_post_details(callback, post_id, current_page, total_pages, db)
-        elif action == "back":
-            current_page = int(data[2])
-            await show_feed_page(callback, current_page, db)
-        elif action == "heart":
-            post_id = int(data[2])
-            current_page = int(data[3])
-            total_pages = int(data[4])
-            await handle_post_heart(callback, post_id, db, data)
+        if action in (FeedAction.PREV, FeedAction.NEXT):
+            new_page = max(0, current_page - 1) if action == FeedAction.PREV else current_page + 1
+            await show_page(callback, new_page, db)
+        elif action == FeedAction.OPEN:
+            show_details = show_liked_post_details if liked else show_post_details
+            await show_details(callback, callback_data.post_id, current_page, db)
+        elif action == FeedAction.BACK:
+            await show_page(callback, current_page, db)
+        elif action == FeedAction.HEART:
+            await handle_post_heart(callback, callback_data, db)
     except Exception as e:
         logfire.exception("Ошибка навигации по ленте {e}", e=e)
     await callback.answer()
@@ -74,7 +73,8 @@ async def handle_feed_navigation(callback: CallbackQuery, db):
 @router.callback_query(F.data == "main_menu")
 async def return_to_main_menu(callback: CallbackQuery):
     """Возврат в главное меню"""
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "Выберите действие:", reply_markup=get_main_keyboard()
     )
     await callback.answer()
@@ -100,9 +100,7 @@ async def show_feed_page_cmd(message: Message, page: int, db):
     # Получаем общее количество постов для пагинации
     total_posts = await PostService.get_feed_posts_count(db, message.from_user.id)
     total_pages = (total_posts + POSTS_PER_PAGE - 1) // POSTS_PER_PAGE
-    # Список кратких карточек (предварительно загрузим категории)
-    for post in posts:
-        await db.refresh(post, attribute_names=["categories"])
+    # Список кратких карточек
     preview_text = format_feed_list(posts, page * POSTS_PER_PAGE + 1, total_posts)
     await message.answer(
         preview_text,
@@ -120,38 +118,25 @@ async def show_feed_page(callback: CallbackQuery, page: int, db):
     )
     if not posts:
         logfire.info(f"Пользователь {callback.from_user.id} — в ленте нет постов")
-        try:
-            await callback.message.edit_text(
-                "📭 В ленте пока нет постов по вашим категориям.\n\n"
-                "Попробуйте:\n"
-                "• Выбрать другие категории\n"
-                "• Создать пост самому",
-                reply_markup=get_main_keyboard()
-            )
-        except TelegramBadRequest as e:
-            if "message is not modified" in str(e):
-                pass
-            else:
-                raise
+        await edit_text(
+            callback.message,
+            "📭 В ленте пока нет постов по вашим категориям.\n\n"
+            "Попробуйте:\n"
+            "• Выбрать другие категории\n"
+            "• Создать пост самому",
+            reply_markup=get_main_keyboard()
+        )
         return
     # Получаем общее количество постов для пагинации
     total_posts = await PostService.get_feed_posts_count(db, callback.from_user.id)
     total_pages = (total_posts + POSTS_PER_PAGE - 1) // POSTS_PER_PAGE
-    for post in posts:
-        await db.refresh(post, attribute_names=["categories"])
     preview_text = format_feed_list(posts, page * POSTS_PER_PAGE + 1, total_posts)
-    try:
-        await callback.message.edit_text(
-            preview_text,
-            reply_markup=get_feed_list_keyboard(posts, page, total_pages),
-            parse_mode="HTML",
-        )
-    except TelegramBadRequest as e:
-        if "message is not modified" in str(e):
-            # Игнорируем попытку редактировать без изменений
-            pass
-        else:
-            raise
+    await edit_text(
+        callback.message,
+        preview_text,
+        reply_markup=get_feed_list_keyboard(posts, page, total_pages),
+        parse_mode="HTML",
+    )
 
 
 def _msk_str(dt) -> str:
@@ -167,23 +152,16 @@ def _msk_str(dt) -> str:
     return dt.strftime('%d.%m.%Y %H:%M')
 
 
-def format_post_for_feed(post, current_position: int, total_posts: int, likes_count: int = 0) -> str:
+def format_post_for_feed(post: PostView, current_position: int, total_posts: int, likes_count: int = 0) -> str:
     """Формат карточки поста (детально)"""
-    author_name = 'Аноним'
-    if hasattr(post, 'author') and post.author is not None:
-        author_name = (getattr(post.author, 'first_name', None) or getattr(post.author, 'username', None) or 'Аноним')
-    category_names = []
-    if hasattr(post, 'categories') and post.categories is not None:
-        category_names = [getattr(cat, 'name', 'Неизвестно') for cat in post.categories]
-    category_str = ', '.join(category_names) if category_names else 'Неизвестно'
-    post_city = getattr(post, 'city', 'Не указан')
-    event_at = getattr(post, 'event_at', None)
-    event_str = _msk_str(event_at)
+    category_str = ', '.join(post.category_names) if post.category_names else 'Неизвестно'
+    post_city = post.city or 'Не указан'
+    event_str = _msk_str(post.event_at)
     return (
         f"📰 Пост\n\n"
         f"📝 <b>{post.title}</b>\n\n"
         f"{post.content}\n\n"
-        f"👤 Автор: {author_name}\n"
+        f"👤 Автор: {post.author_name}\n"
         f"🏙️ Город: {post_city}\n"
         f"📂 Категории: {category_str}\n"
         f"📅 Актуально до: {event_str}\n"
@@ -192,14 +170,12 @@ def format_post_for_feed(post, current_position: int, total_posts: int, likes_co
     )
 
 
-def format_feed_list(posts, current_position_start: int, total_posts: int) -> str:
+def format_feed_list(posts: List[PostView], current_position_start: int, total_posts: int) -> str:
     """Формат списка кратких карточек 4-5 постов"""
     lines = ["📰 Лента постов (кратко)", ""]
     for idx, post in enumerate(posts, start=current_position_start):
-        category_names = [getattr(cat, 'name', 'Неизвестно') for cat in (post.categories or [])]
-        category_str = ', '.join(category_names) if category_names else 'Неизвестно'
-        event_at = getattr(post, 'event_at', None)
-        event_str = _msk_str(event_at)
+        category_str = ', '.join(post.category_names) if post.category_names else 'Неизвестно'
+        event_str = _msk_str(post.event_at)
         lines.append(f"{idx}. <b>{post.title}</b>")
         lines.append(f"   📂 {category_str}")
         lines.append(f"   📅 {event_str}")
@@ -209,8 +185,13 @@ def format_feed_list(posts, current_position_start: int, total_posts: int) -> st
     return "\n".join(lines)
 
 
-async def handle_post_heart(callback: CallbackQuery, post_id: int, db, data):
+def _total_pages(total_posts: int) -> int:
+    return (total_posts + POSTS_PER_PAGE - 1) // POSTS_PER_PAGE
+
+
+async def handle_post_heart(callback: CallbackQuery, callback_data: FeedCallback, db):
     """Обработка нажатия на сердечко"""
+    post_id = callback_data.post_id
     logfire.info(f"Пользователь {callback.from_user.id} нажал на сердечко посту {post_id}")
     
     try:
@@ -229,11 +210,10 @@ async def handle_post_heart(callback: CallbackQuery, post_id: int, db, data):
         # Обновляем клавиатуру с новым количеством лайков
         is_liked = await LikeService.is_post_liked_by_user(db, callback.from_user.id, post_id)
         
-        current_page = int(data[3])
-        total_pages = int(data[4])
+        current_page = callback_data.page
         # Выбираем правильную клавиатуру для текущего раздела (лента или избранное)
-        section = data[0]
-        if section == "liked":
+        if callback_data.section == Section.LIKED:
+            total_pages = _total_pages(await PostService.get_liked_posts_count(db, callback.from_user.id))
             new_keyboard = get_liked_post_keyboard(
                 current_page=current_page,
                 total_pages=total_pages,
@@ -242,6 +222,7 @@ async def handle_post_heart(callback: CallbackQuery, post_id: int, db, data):
                 likes_count=likes_count,
             )
         else:
+            total_pages = _total_pages(await PostService.get_feed_posts_count(db, callback.from_user.id))
             new_keyboard = get_feed_post_keyboard(
                 current_page=current_page,
                 total_pages=total_pages,
@@ -249,7 +230,7 @@ async def handle_post_heart(callback: CallbackQuery, post_id: int, db, data):
                 is_liked=is_liked,
                 likes_count=likes_count,
             )
-        await callback.message.edit_reply_markup(reply_markup=new_keyboard)
+        await edit_reply_markup(callback.message, reply_markup=new_keyboard)
         
         logfire.info(f"Сердечко посту {post_id} успешно {action_text}")
         
@@ -258,40 +239,35 @@ async def handle_post_heart(callback: CallbackQuery, post_id: int, db, data):
         await callback.answer("❌ Ошибка при сохранении сердечка", show_alert=True) 
 
 
-async def show_post_details(callback: CallbackQuery, post_id: int, current_page: int, total_pages: int, db):
-    post = await PostService.get_post_by_id(db, post_id)
+async def show_post_details(callback: CallbackQuery, post_id: int, current_page: int, db):
+    post = await PostService.get_post_view(db, post_id)
     if not post:
         await callback.answer("Пост не найден", show_alert=True)
         return
-    await db.refresh(post, attribute_names=["author", "categories"])
     is_liked = await LikeService.is_post_liked_by_user(db, callback.from_user.id, post.id)
     likes_count = await LikeService.get_post_likes_count(db, post.id)
-    text = format_post_for_feed(post, current_page + 1, await PostService.get_feed_posts_count(db, callback.from_user.id), likes_count)
+    total_posts = await PostService.get_feed_posts_count(db, callback.from_user.id)
+    total_pages = _total_pages(total_posts)
+    text = format_post_for_feed(post, current_page + 1, total_posts, likes_count)
     if post.image_id:
-        media_photo = await file_storage.get_media_photo(post.image_id)
-        if media_photo:
-            try:
-                await callback.message.edit_media(
-                    media=InputMediaPhoto(media=media_photo.media, caption=text, parse_mode="HTML"),
-                    reply_markup=get_feed_post_keyboard(current_page, total_pages, post.id, is_liked, likes_count),
-                )
-            except TelegramBadRequest as e:
-                if "message is not modified" in str(e):
-                    pass
-                else:
-                    raise
+        photo = await MediaService.get_photo(db, post.image_id)
+        if photo:
+            # edit_media может выгружать файл - не держим соединение с БД
+            await release_connection(db)
+            edited = await edit_media(
+                callback.message,
+                media=InputMediaPhoto(media=photo, caption=text, parse_mode="HTML"),
+                reply_markup=get_feed_post_keyboard(current_page, total_pages, post.id, is_liked, likes_count),
+            )
+            if edited and not isinstance(photo, str):
+                await MediaService.remember_sent_photo(db, post.image_id, edited)
             return
-    try:
-        await callback.message.edit_text(
-            text,
-            reply_markup=get_feed_post_keyboard(current_page, total_pages, post.id, is_liked, likes_count),
-            parse_mode="HTML",
-        )
-    except TelegramBadRequest as e:
-        if "message is not modified" in str(e):
-            pass
-        else:
-            raise
+    await edit_text(
+        callback.message,
+        text,
+        reply_markup=get_feed_post_keyboard(current_page, total_pages, post.id, is_liked, likes_count),
+        parse_mode="HTML",
+    )
 
 
 @router.callback_query(F.data == "liked_posts")
@@ -299,82 +275,43 @@ async def show_liked(callback: CallbackQuery, db):
     await show_liked_page(callback, 0, db)
 
 
-@router.callback_query(F.data.startswith("liked_"))
-async def handle_liked_navigation(callback: CallbackQuery, db):
-    data = callback.data.split("_")
-    action = data[1]
-    try:
-        if action in ["prev", "next"]:
-            current_page = int(data[2])
-            total_pages = int(data[3])
-            new_page = max(0, current_page - 1) if action == "prev" else current_page + 1
-            await show_liked_page(callback, new_page, db)
-        elif action == "open":
-            post_id = int(data[2])
-            current_page = int(data[3])
-            total_pages = int(data[4])
-            await show_liked_post_details(callback, post_id, current_page, total_pages, db)
-        elif action == "back":
-            current_page = int(data[2])
-            await show_liked_page(callback, current_page, db)
-        elif action == "heart":
-            post_id = int(data[2])
-            current_page = int(data[3])
-            total_pages = int(data[4])
-            await handle_post_heart(callback, post_id, db, data)
-    except Exception as e:
-        logfire.exception("Ошибка навигации по избранному {e}", e=e)
-    await callback.answer()
-
-
 async def show_liked_page(callback: CallbackQuery, page: int, db):
     posts = await PostService.get_liked_posts(db, callback.from_user.id, POSTS_PER_PAGE, page * POSTS_PER_PAGE)
     if not posts:
-        await callback.message.edit_text("📭 У вас пока нет избранных постов", reply_markup=get_main_keyboard())
+        await edit_text(callback.message, "📭 У вас пока нет избранных постов", reply_markup=get_main_keyboard())
         return
     total_posts = await PostService.get_liked_posts_count(db, callback.from_user.id)
     total_pages = (total_posts + POSTS_PER_PAGE - 1) // POSTS_PER_PAGE
     text = format_feed_list(posts, page + 1, total_posts)
-    try:
-        await callback.message.edit_text(text, reply_markup=get_liked_list_keyboard(posts, page, total_pages))
-    except TelegramBadRequest as e:
-        if "message is not modified" in str(e):
-            pass
-        else:
-            raise
+    await edit_text(callback.message, text, reply_markup=get_liked_list_keyboard(posts, page, total_pages))
 
 
-async def show_liked_post_details(callback: CallbackQuery, post_id: int, current_page: int, total_pages: int, db):
-    post = await PostService.get_post_by_id(db, post_id)
+async def show_liked_post_details(callback: CallbackQuery, post_id: int, current_page: int, db):
+    post = await PostService.get_post_view(db, post_id)
     if not post:
         await callback.answer("Пост не найден", show_alert=True)
         return
-    await db.refresh(post, attribute_names=["author", "categories"])
     is_liked = await LikeService.is_post_liked_by_user(db, callback.from_user.id, post.id)
     likes_count = await LikeService.get_post_likes_count(db, post.id)
-    text = format_post_for_feed(post, current_page + 1, await PostService.get_liked_posts_count(db, callback.from_user.id), likes_count)
+    total_posts = await PostService.get_liked_posts_count(db, callback.from_user.id)
+    total_pages = _total_pages(total_posts)
+    text = format_post_for_feed(post, current_page + 1, total_posts, likes_count)
     if post.image_id:
-        media_photo = await file_storage.get_media_photo(post.image_id)
-        if media_photo:
-            try:
-                await callback.message.edit_media(
-                    media=InputMediaPhoto(media=media_photo.media, caption=text, parse_mode="HTML"),
-                    reply_markup=get_liked_post_keyboard(current_page, total_pages, post.id, is_liked, likes_count),
-                )
-            except TelegramBadRequest as e:
-                if "message is not modified" in str(e):
-                    pass
-                else:
-                    raise
+        photo = await MediaService.get_photo(db, post.image_id)
+        if photo:
+            # edit_media может выгружать файл - не держим соединение с БД
+            await release_connection(db)
+            edited = await edit_media(
+                callback.message,
+                media=InputMediaPhoto(media=photo, caption=text, parse_mode="HTML"),
+                reply_markup=get_liked_post_keyboard(current_page, total_pages, post.id, is_liked, likes_count),
+            )
+            if edited and not isinstance(photo, str):
+                await MediaService.remember_sent_photo(db, post.image_id, edited)
             return
-    try:
-        await callback.message.edit_text(
-            text,
-            reply_markup=get_liked_post_keyboard(current_page, total_pages, post.id, is_liked, likes_count),
-            parse_mode="HTML",
-        )
-    except TelegramBadRequest as e:
-        if "message is not modified" in str(e):
-            pass
-        else:
-            raise
\ No newline at end of file
+    await edit_text(
+        callback.message,
+        text,
+        reply_markup=get_liked_post_keyboard(current_page, total_pages, post.id, is_liked, likes_count),
+        parse_mode="HTML",
+    )
\ No newline at end of file
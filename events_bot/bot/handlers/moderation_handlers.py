@@ -8,7 +8,8 @@ from events_bot.database.services import (
     PostService,
     NotificationService,
 )
-from events_bot.bot.utils import send_post_notification
+from events_bot.bot.utils import edit_text, send_post_notification
+from events_bot.bot.callbacks import ModerateAction, ModerateCallback, callback_table
 from events_bot.storage import file_storage
 from events_bot.database.models import ModerationAction
 from events_bot.bot.keyboards import (
@@ -43,13 +44,11 @@ async def cmd_moderation(message: Message, db):
     logfire.info(f"Найдено {len(pending_posts)} постов на модерации")
     response = "Посты на модерации:\n\n"
     for post in pending_posts:
-        await db.refresh(post, attribute_names=["author", "categories"])
-        category_names = [cat.name for cat in post.categories] if post.categories else ['Неизвестно']
-        category_str = ', '.join(category_names)
-        post_city = getattr(post, 'city', 'Не указан')
+        category_str = ', '.join(post.category_names or ('Неизвестно',))
+        post_city = post.city or 'Не указан'
         response += f"{post.title}\n"
         response += f"Город: {post_city}\n"
-        response += f"{post.author.first_name or post.author.username}\n"
+        response += f"{post.author_name}\n"
         response += f"{category_str}\n"
         response += f"ID: {post.id}\n\n"
 
@@ -66,7 +65,8 @@ async def show_moderation_queue_callback(callback: CallbackQuery, db):
 
     if not pending_posts:
         logfire.info("Очередь модерации пуста")
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "Нет постов на модерации.",
             reply_markup=get_moderation_queue_keyboard(),
         )
@@ -75,17 +75,16 @@ async def show_moderation_queue_callback(callback: CallbackQuery, db):
     logfire.info(f"Найдено {len(pending_posts)} постов на модерации")
     response = "Посты на модерации:\n\n"
     for post in pending_posts:
-        await db.refresh(post, attribute_names=["author", "categories"])
-        category_names = [cat.name for cat in post.categories] if post.categories else ['Неизвестно']
-        category_str = ', '.join(category_names)
-        post_city = getattr(post, 'city', 'Не указан')
+        category_str = ', '.join(post.category_names or ('Неизвестно',))
+        post_city = post.city or 'Не указан'
         response += f"{post.title}\n"
         response += f"Город: {post_city}\n"
-        response += f"{post.author.first_name or post.author.username}\n"
+        response += f"{post.author_name}\n"
         response += f"{category_str}\n"
         response += f"ID: {post.id}\n\n"
 
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         response, reply_markup=get_moderation_queue_keyboard()
     )
     await callback.answer()
@@ -99,7 +98,8 @@ async def refresh_moderation_queue(callback: CallbackQuery, db):
 
     if not pending_posts:
         logfire.info("Очередь модерации пуста при обновлении")
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "Нет постов на модерации.",
             reply_markup=get_moderation_queue_keyboard(),
         )
@@ -109,32 +109,30 @@ async def refresh_moderation_queue(callback: CallbackQuery, db):
     logfire.info(f"Обновлено: найдено {len(pending_posts)} постов на модерации")
     response = "Посты на модерации:\n\n"
     for post in pending_posts:
-        await db.refresh(post, attribute_names=["author", "categories"])
-        category_names = [cat.name for cat in post.categories] if post.categories else ['Неизвестно']
-        category_str = ', '.join(category_names)
-        post_city = getattr(post, 'city', 'Не указан')
+        category_str = ', '.join(post.category_names or ('Неизвестно',))
+        post_city = post.city or 'Не указан'
         response += f"{post.title}\n"
         response += f"Город: {post_city}\n"
-        response += f"{post.author.first_name or post.author.username}\n"
+        response += f"{post.author_name}\n"
         response += f"{category_str}\n"
         response += f"ID: {post.id}\n\n"
 
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         response, reply_markup=get_moderation_queue_keyboard()
     )
     await callback.answer("Очередь обновлена")
 
 
-@router.callback_query(F.data.startswith("moderate_"))
-async def process_moderation_action(callback: CallbackQuery, state: FSMContext, db):
+@callback_table.route(ModerateCallback)
+async def process_moderation_action(callback: CallbackQuery, callback_data: ModerateCallback, state: FSMContext, db):
     """Обработка действий модерации"""
-    data = callback.data.split("_")
-    action = data[1]
-    post_id = int(data[2])
+    action = callback_data.action
+    post_id = callback_data.post_id
     
-    logfire.info(f"Модератор {callback.from_user.id} выполняет действие {action} для поста {post_id}")
+    logfire.info(f"Модератор {callback.from_user.id} выполняет действие {action.name.lower()} для поста {post_id}")
 
-    if action == "approve":
+    if action == ModerateAction.APPROVE:
         post = await PostService.approve_post(db, post_id, callback.from_user.id)
         if post:
             # Публикуем пост
@@ -161,18 +159,18 @@ async def process_moderation_action(callback: CallbackQuery, state: FSMContext,
             logfire.error(f"Ошибка при одобрении поста {post_id}")
             await callback.answer("❌ Ошибка при одобрении поста")
 
-    elif action == "reject":
+    elif action == ModerateAction.REJECT:
         # спрашиваем комментарий у модератора, сохраняя post_id и тип действия
         await state.update_data(pending_post_id=post_id, pending_action="reject")
         await state.set_state(ModerationStates.waiting_for_comment)
-        await callback.message.edit_text("❌ Укажите причину отклонения (комментарий для автора):")
+        await edit_text(callback.message, "❌ Укажите причину отклонения (комментарий для автора):")
         await callback.answer()
 
-    elif action == "changes":
+    elif action == ModerateAction.CHANGES:
         # спрашиваем комментарий у модератора, сохраняя post_id в FSM
         await state.update_data(pending_post_id=post_id)
         await state.set_state(ModerationStates.waiting_for_comment)
-        await callback.message.edit_text("📝 Введите комментарий для автора (что исправить):")
+        await edit_text(callback.message, "📝 Введите комментарий для автора (что исправить):")
         await callback.answer()
 
 
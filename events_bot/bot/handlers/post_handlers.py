@@ -5,12 +5,15 @@ from typing import Union
 import logfire
 from events_bot.database.services import PostService, UserService, CategoryService
 from events_bot.bot.states import PostStates
+from events_bot.bot.utils import edit_text, stream_telegram_file
+from events_bot.bot.callbacks import PostCategoryCallback, PostCityCallback, callback_table
+from events_bot.bot.keyboards.city_keyboard import CITIES
 from events_bot.bot.keyboards import (
     get_main_keyboard,
     get_category_selection_keyboard,
     get_city_keyboard,
 )
-from events_bot.storage import file_storage
+from events_bot.storage import file_storage, image_pipeline
 from loguru import logger
 
 router = Router()
@@ -53,7 +56,8 @@ async def start_create_post(callback: CallbackQuery, state: FSMContext, db):
     await state.set_state(PostStates.creating_post)
     
     # Сначала предлагаем выбрать город
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "🏙️ Выберите город для поста:",
         reply_markup=get_city_keyboard(for_post=True)
     )
@@ -65,17 +69,18 @@ async def start_create_post(callback: CallbackQuery, state: FSMContext, db):
 async def cancel_post_creation(callback: CallbackQuery, state: FSMContext, db):
     """Отмена создания поста"""
     await state.clear()
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "❌ Создание поста отменено.",
         reply_markup=get_main_keyboard()
     )
     await callback.answer()
 
 
-@router.callback_query(PostStates.waiting_for_city_selection, F.data.startswith("post_city_"))
-async def process_post_city_selection(callback: CallbackQuery, state: FSMContext, db):
+@callback_table.route(PostCityCallback, state=PostStates.waiting_for_city_selection)
+async def process_post_city_selection(callback: CallbackQuery, callback_data: PostCityCallback, state: FSMContext, db):
     """Обработка выбора города для поста"""
-    city = callback.data[10:]  # Убираем префикс "post_city_"
+    city = CITIES[callback_data.index]
 
     # Сохраняем выбранный город
     await state.update_data(post_city=city)
@@ -83,7 +88,8 @@ async def process_post_city_selection(callback: CallbackQuery, state: FSMContext
     # Получаем все категории для выбора
     all_categories = await CategoryService.get_all_categories(db)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🏙️ Город {city} выбран!\n\n📂 Теперь выберите категории для поста:",
         reply_markup=get_category_selection_keyboard(all_categories, for_post=True)
     )
@@ -91,10 +97,10 @@ async def process_post_city_selection(callback: CallbackQuery, state: FSMContext
     await callback.answer()
 
 
-@router.callback_query(PostStates.waiting_for_category_selection, F.data.startswith("post_category_"))
-async def process_post_category_selection(callback: CallbackQuery, state: FSMContext, db):
+@callback_table.route(PostCategoryCallback, state=PostStates.waiting_for_category_selection)
+async def process_post_category_selection(callback: CallbackQuery, callback_data: PostCategoryCallback, state: FSMContext, db):
     """Мультивыбор категорий для поста"""
-    category_id = int(callback.data.split("_")[2])  # post_category_123 -> 123
+    category_id = callback_data.category_id
     data = await state.get_data()
     category_ids = data.get("category_ids", [])
 
@@ -106,7 +112,8 @@ async def process_post_category_selection(callback: CallbackQuery, state: FSMCon
 
     # Получаем все категории для выбора
     all_categories = await CategoryService.get_all_categories(db)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "📂 Выберите одну или несколько категорий для поста (можно выбрать несколько):",
         reply_markup=get_category_selection_keyboard(all_categories, category_ids, for_post=True)
     )
@@ -123,7 +130,8 @@ async def confirm_post_categories(callback: CallbackQuery, state: FSMContext, db
         return
     await state.update_data(category_ids=category_ids)
     logfire.info(f"Категории подтверждены для пользователя {callback.from_user.id}: {category_ids}")
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📝 Создание поста в категориях: {len(category_ids)} выбрано\n\nВведите заголовок поста:"
     )
     await state.set_state(PostStates.waiting_for_title)
@@ -205,12 +213,12 @@ async def process_post_image(message: Message, state: FSMContext, db):
     # Получаем самое большое изображение
     photo = message.photo[-1]
     
-    # Скачиваем файл
+    # Скачиваем файл потоком прямо в конвейер обработки и хранилище
     file_info = await message.bot.get_file(photo.file_id)
-    file_data = await message.bot.download_file(file_info.file_path)
+    stream = stream_telegram_file(message.bot, file_info.file_path)
     
-    # Сохраняем файл
-    file_id = await file_storage.save_file(file_data.read(), 'jpg')
+    # Уменьшаем, перекодируем и сохраняем изображение вместе с миниатюрой
+    file_id = await image_pipeline.ingest_stream(file_storage, stream)
     
     await state.update_data(image_id=file_id)
     await continue_post_creation(message, state, db)
@@ -8,6 +8,9 @@ from events_bot.bot.keyboards import (
     get_category_selection_keyboard,
     get_city_keyboard,
 )
+from events_bot.bot.utils import edit_text
+from events_bot.bot.callbacks import CityCallback, callback_table
+from events_bot.bot.keyboards.city_keyboard import CITIES
 
 router = Router()
 
@@ -43,12 +46,9 @@ async def cmd_my_posts(message: Message, db):
 
     response = "📊 Ваши посты:\n\n"
     for post in posts:
-        # Загружаем связанные объекты
-        await db.refresh(post, attribute_names=["categories"])
         status = "✅ Одобрен" if post.is_approved else "⏳ На модерации"
-        category_names = [cat.name for cat in post.categories] if post.categories else ['Неизвестно']
-        category_str = ', '.join(category_names)
-        post_city = getattr(post, 'city', 'Не указан')
+        category_str = ', '.join(post.category_names or ('Неизвестно',))
+        post_city = post.city or 'Не указан'
         response += f"📝 {post.title}\n"
         response += f"🏙️ {post_city}\n"
         response += f"📂 {category_str}\n"
@@ -117,10 +117,10 @@ async def cmd_help(message: Message):
     )
 
 
-@router.callback_query(F.data.startswith("city_"))
-async def process_city_selection_callback(callback: CallbackQuery, state: FSMContext, db):
+@callback_table.route(CityCallback)
+async def process_city_selection_callback(callback: CallbackQuery, callback_data: CityCallback, state: FSMContext, db):
     """Обработка выбора города через инлайн-кнопку"""
-    city = callback.data[5:]
+    city = CITIES[callback_data.index]
 
     # Обновляем город пользователя
     user = await UserService.register_user(
@@ -130,10 +130,10 @@ async def process_city_selection_callback(callback: CallbackQuery, state: FSMCon
         first_name=callback.from_user.first_name,
         last_name=callback.from_user.last_name,
     )
-    user.city = city
-    await db.commit()
+    await UserService.set_user_city(db, user.id, city)
     categories = await CategoryService.get_all_categories(db)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🏙️ Город {city} выбран!\n\nТеперь выберите категории для публикации постов:",
         reply_markup=get_category_selection_keyboard(categories),
     )
@@ -144,7 +144,8 @@ async def process_city_selection_callback(callback: CallbackQuery, state: FSMCon
 @router.callback_query(F.data == "change_city")
 async def change_city_callback(callback: CallbackQuery, state: FSMContext):
     """Изменение города через инлайн-кнопку"""
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "Выберите новый город:", reply_markup=get_city_keyboard()
     )
     await state.set_state(UserStates.waiting_for_city)
@@ -160,7 +161,8 @@ async def change_category_callback(callback: CallbackQuery, state: FSMContext, d
     )
     selected_ids = [cat.id for cat in user_categories]
 
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "Выберите категории для публикации постов:",
         reply_markup=get_category_selection_keyboard(categories, selected_ids),
     )
@@ -174,26 +176,24 @@ async def show_my_posts_callback(callback: CallbackQuery, db):
     posts = await PostService.get_user_posts(db, callback.from_user.id)
 
     if not posts:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "📭 У вас пока нет постов.", reply_markup=get_main_keyboard()
         )
         return
 
     response = "📊 Ваши посты:\n\n"
     for post in posts:
-        # Загружаем связанные объекты
-        await db.refresh(post, attribute_names=["categories"])
         status = "✅ Одобрен" if post.is_approved else "⏳ На модерации"
-        category_names = [cat.name for cat in post.categories] if post.categories else ['Неизвестно']
-        category_str = ', '.join(category_names)
-        post_city = getattr(post, 'city', 'Не указан')
+        category_str = ', '.join(post.category_names or ('Неизвестно',))
+        post_city = post.city or 'Не указан'
         response += f"📝 {post.title}\n"
         response += f"🏙️ {post_city}\n"
         response += f"📂 {category_str}\n"
         response += f"📅 {post.created_at.strftime('%d.%m.%Y %H:%M')}\n"
         response += f"📊 {status}\n\n"
 
-    await callback.message.edit_text(response, reply_markup=get_main_keyboard())
+    await edit_text(callback.message, response, reply_markup=get_main_keyboard())
     await callback.answer()
 
 
@@ -224,7 +224,8 @@ async def show_help_callback(callback: CallbackQuery):
 ❓ **Поддержка:** Обратитесь к администратору бота
 """
 
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         help_text, reply_markup=get_main_keyboard(), parse_mode="Markdown"
     )
     await callback.answer()
@@ -236,7 +237,8 @@ async def show_main_menu_callback(callback: CallbackQuery):
     menu_text = """
  *Главное меню*
 """
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         menu_text,
         reply_markup=get_main_keyboard(),
         parse_mode="Markdown"
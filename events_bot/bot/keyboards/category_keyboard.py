@@ -7,6 +7,7 @@ from aiogram.types import (
 from typing import List
 from events_bot.database.models import Category
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from events_bot.bot.callbacks import CategoryCallback, PostCategoryCallback
 
 
 def get_category_keyboard() -> ReplyKeyboardMarkup:
@@ -27,13 +28,13 @@ def get_category_selection_keyboard(
 
     builder = InlineKeyboardBuilder()
     
-    # Используем разные префиксы для разных контекстов
-    prefix = "post_category_" if for_post else "category_"
+    # Используем разные callback_data для разных контекстов
+    factory = PostCategoryCallback if for_post else CategoryCallback
     
     for category in categories:
         is_selected = category.id in selected_ids
         text = f"{category.name} {'⭐️' if is_selected else '▫️'}"
-        builder.button(text=text, callback_data=f"{prefix}{category.id}")
+        builder.button(text=text, callback_data=factory(category_id=category.id))
     builder.adjust(2)
     
     confirm_callback = "confirm_post_categories" if for_post else "confirm_categories"
@@ -1,23 +1,26 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from events_bot.bot.callbacks import CityCallback, PostCityCallback
+
+# В callback_data передается индекс города: новые города добавлять в конец списка
+CITIES = [
+    "СПбГУ", "ПГУПС", "СПбПУ", "ИТМО",
+    "СПбГЭУ", "Горный", "РГПУ", "СПбГМТУ",
+    "СПбГАСУ", "Военмех", "ЛЭТИ", "СПХФУ", "ГУАП",
+    "СПбГУТ", "РГГМУ", "СПбГЛТУ", "СПбГУПТД",
+    "СПбГИКиТ", "СПГХПА"
+]
 
 
 def get_city_keyboard(for_post: bool = False) -> InlineKeyboardMarkup:
     """Инлайн-клавиатура для выбора города"""
-    cities = [
-        "СПбГУ", "ПГУПС", "СПбПУ", "ИТМО",
-        "СПбГЭУ", "Горный", "РГПУ", "СПбГМТУ",
-        "СПбГАСУ", "Военмех", "ЛЭТИ", "СПХФУ", "ГУАП",
-        "СПбГУТ", "РГГМУ", "СПбГЛТУ", "СПбГУПТД",
-        "СПбГИКиТ", "СПГХПА"
-    ]
     builder = InlineKeyboardBuilder()
     
-    # Используем разные префиксы для разных контекстов
-    prefix = "post_city_" if for_post else "city_"
+    # Используем разные callback_data для разных контекстов
+    factory = PostCityCallback if for_post else CityCallback
     
-    for city in cities:
-        builder.button(text=city, callback_data=f"{prefix}{city}")
+    for index, city in enumerate(CITIES):
+        builder.button(text=city, callback_data=factory(index=index))
     builder.adjust(2)
     
     buttons = []
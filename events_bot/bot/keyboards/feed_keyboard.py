@@ -1,62 +1,58 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup
+from typing import List
+from events_bot.database.views import PostView
+from events_bot.bot.callbacks import FeedAction, FeedCallback, Section
 
 
-def get_feed_list_keyboard(posts, current_page: int, total_pages: int) -> InlineKeyboardMarkup:
-    """Клавиатура списка постов (подборка)"""
-    builder = InlineKeyboardBuilder()
-    for post in posts:
-        builder.button(text=f"Подробнее: {post.title[:28]}", callback_data=f"feed_open_{post.id}_{current_page}_{total_pages}")
-    # Навигация
-    if current_page > 0:
-        builder.button(text="⬅️ Назад", callback_data=f"feed_prev_{current_page}_{total_pages}")
-    if current_page < total_pages - 1:
-        builder.button(text="Вперед ➡️", callback_data=f"feed_next_{current_page}_{total_pages}")
-    builder.button(text="🏠 Главное меню", callback_data="main_menu")
-    builder.adjust(1, 2, 1)
-    return builder.as_markup()
+def _feed_button(builder: InlineKeyboardBuilder, text: str, action: FeedAction, section: Section, page: int, post_id: int = 0) -> None:
+    builder.button(
+        text=text,
+        callback_data=FeedCallback(action=action, section=section, page=page, post_id=post_id),
+    )
 
 
-def get_feed_post_keyboard(current_page: int, total_pages: int, post_id: int, is_liked: bool = False, likes_count: int = 0) -> InlineKeyboardMarkup:
-    """Клавиатура карточки одного поста"""
-    builder = InlineKeyboardBuilder()
-    heart_emoji = "❤️" if is_liked else "🤍"
-    heart_text = f"{heart_emoji} {likes_count}" if likes_count > 0 else heart_emoji
-    builder.button(text=heart_text, callback_data=f"feed_heart_{post_id}_{current_page}_{total_pages}")
-    builder.button(text="↩️ К списку", callback_data=f"feed_back_{current_page}_{total_pages}")
-    # Навигация
+def _navigation(builder: InlineKeyboardBuilder, section: Section, current_page: int, total_pages: int) -> None:
     if current_page > 0:
-        builder.button(text="⬅️ Назад", callback_data=f"feed_prev_{current_page}_{total_pages}")
+        _feed_button(builder, "⬅️ Назад", FeedAction.PREV, section, current_page)
     if current_page < total_pages - 1:
-        builder.button(text="Вперед ➡️", callback_data=f"feed_next_{current_page}_{total_pages}")
+        _feed_button(builder, "Вперед ➡️", FeedAction.NEXT, section, current_page)
     builder.button(text="🏠 Главное меню", callback_data="main_menu")
-    builder.adjust(2, 2)
-    return builder.as_markup()
 
 
-def get_liked_list_keyboard(posts, current_page: int, total_pages: int) -> InlineKeyboardMarkup:
+def _list_keyboard(section: Section, posts: List[PostView], current_page: int, total_pages: int) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for post in posts:
-        builder.button(text=f"Подробнее: {post.title[:28]}", callback_data=f"liked_open_{post.id}_{current_page}_{total_pages}")
-    if current_page > 0:
-        builder.button(text="⬅️ Назад", callback_data=f"liked_prev_{current_page}_{total_pages}")
-    if current_page < total_pages - 1:
-        builder.button(text="Вперед ➡️", callback_data=f"liked_next_{current_page}_{total_pages}")
-    builder.button(text="🏠 Главное меню", callback_data="main_menu")
+        _feed_button(builder, f"Подробнее: {post.title[:28]}", FeedAction.OPEN, section, current_page, post.id)
+    _navigation(builder, section, current_page, total_pages)
     builder.adjust(1, 2, 1)
     return builder.as_markup()
 
 
-def get_liked_post_keyboard(current_page: int, total_pages: int, post_id: int, is_liked: bool = False, likes_count: int = 0) -> InlineKeyboardMarkup:
+def _post_keyboard(section: Section, current_page: int, total_pages: int, post_id: int, is_liked: bool, likes_count: int) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     heart_emoji = "❤️" if is_liked else "🤍"
     heart_text = f"{heart_emoji} {likes_count}" if likes_count > 0 else heart_emoji
-    builder.button(text=heart_text, callback_data=f"liked_heart_{post_id}_{current_page}_{total_pages}")
-    builder.button(text="↩️ К списку", callback_data=f"liked_back_{current_page}_{total_pages}")
-    if current_page > 0:
-        builder.button(text="⬅️ Назад", callback_data=f"liked_prev_{current_page}_{total_pages}")
-    if current_page < total_pages - 1:
-        builder.button(text="Вперед ➡️", callback_data=f"liked_next_{current_page}_{total_pages}")
-    builder.button(text="🏠 Главное меню", callback_data="main_menu")
+    _feed_button(builder, heart_text, FeedAction.HEART, section, current_page, post_id)
+    _feed_button(builder, "↩️ К списку", FeedAction.BACK, section, current_page)
+    _navigation(builder, section, current_page, total_pages)
     builder.adjust(2, 2)
     return builder.as_markup()
+
+
+def get_feed_list_keyboard(posts: List[PostView], current_page: int, total_pages: int) -> InlineKeyboardMarkup:
+    """Клавиатура списка постов (подборка)"""
+    return _list_keyboard(Section.FEED, posts, current_page, total_pages)
+
+
+def get_feed_post_keyboard(current_page: int, total_pages: int, post_id: int, is_liked: bool = False, likes_count: int = 0) -> InlineKeyboardMarkup:
+    """Клавиатура карточки одного поста"""
+    return _post_keyboard(Section.FEED, current_page, total_pages, post_id, is_liked, likes_count)
+
+
+def get_liked_list_keyboard(posts: List[PostView], current_page: int, total_pages: int) -> InlineKeyboardMarkup:
+    return _list_keyboard(Section.LIKED, posts, current_page, total_pages)
+
+
+def get_liked_post_keyboard(current_page: int, total_pages: int, post_id: int, is_liked: bool = False, likes_count: int = 0) -> InlineKeyboardMarkup:
+    return _post_keyboard(Section.LIKED, current_page, total_pages, post_id, is_liked, likes_count)
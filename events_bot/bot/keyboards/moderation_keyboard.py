@@ -1,14 +1,24 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup
+from events_bot.bot.callbacks import ModerateAction, ModerateCallback
 
 
 def get_moderation_keyboard(post_id: int) -> InlineKeyboardMarkup:
     """Инлайн-клавиатура для модерации поста"""
     builder = InlineKeyboardBuilder()
-    builder.button(text="✅ Одобрить", callback_data=f"moderate_approve_{post_id}")
-    builder.button(text="❌ Отклонить", callback_data=f"moderate_reject_{post_id}")
+    builder.button(
+        text="✅ Одобрить",
+        callback_data=ModerateCallback(action=ModerateAction.APPROVE, post_id=post_id),
+    )
+    builder.button(
+        text="❌ Отклонить",
+        callback_data=ModerateCallback(action=ModerateAction.REJECT, post_id=post_id),
+    )
     builder.adjust(2)
-    builder.button(text="📝 Запросить изменения", callback_data=f"moderate_changes_{post_id}")
+    builder.button(
+        text="📝 Запросить изменения",
+        callback_data=ModerateCallback(action=ModerateAction.CHANGES, post_id=post_id),
+    )
     builder.adjust(2, 1)
     return builder.as_markup()
 
@@ -1,19 +1,276 @@
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
-from typing import Callable, Dict, Any, Awaitable
+from aiogram.types import CallbackQuery, TelegramObject
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Any, Awaitable, List, Optional, Set, Tuple
+import os
+import time
+import logfire
+from events_bot.bot.callbacks import CallbackTable
 from events_bot.bot.utils import get_db_session
+from events_bot.database.replicas import USER_ID_KEY
+
+
+class LazySession:
+    """
+    Сессия базы данных, создаваемая при первом обращении.
+
+    Проксирует все атрибуты AsyncSession. Обработчики, которые не трогают БД
+    (/help, главное меню и т.д.), не создают и не закрывают сессию вовсе.
+    """
+
+    __slots__ = ("_session_factory", "_session", "user_id")
+
+    def __init__(self, session_factory: Callable = get_db_session, user_id: Optional[int] = None):
+        """
+        Args:
+            session_factory: Фабрика AsyncSession
+            user_id: Пользователь Telegram, от имени которого идут запросы
+                (для чтения своих записей с основной БД при наличии реплик)
+        """
+        self._session_factory = session_factory
+        self._session = None
+        self.user_id = user_id
+
+    @property
+    def is_used(self) -> bool:
+        """Была ли сессия создана"""
+        return self._session is not None
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = self._session_factory()
+            self._session.info[USER_ID_KEY] = self.user_id
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get_session(), name)
+
+    async def release(self) -> None:
+        """
+        Зафиксировать транзакцию и вернуть соединение в пул.
+
+        Сессия и загруженные объекты остаются доступны, соединение будет
+        взято заново при следующем запросе.
+        """
+        if self._session is not None and self._session.in_transaction():
+            await self._session.commit()
+
+    async def close(self) -> None:
+        """Закрыть сессию, если она создавалась"""
+        if self._session is not None:
+            session, self._session = self._session, None
+            await session.close()
 
 
 class DatabaseMiddleware(BaseMiddleware):
-    """Middleware для автоматического получения сессии базы данных"""
-    
+    """Middleware для ленивого получения сессии базы данных"""
+
+    # Как часто (в обработанных событиях) писать статистику использования БД в лог
+    STATS_LOG_INTERVAL = 500
+
+    def __init__(self):
+        self.total_calls = 0
+        # Имя обработчика -> количество вызовов / вызовов, которые обращались к БД
+        self.handler_calls: Counter = Counter()
+        self.handler_db_uses: Counter = Counter()
+        self._sessions_counter = logfire.metric_counter("db_sessions_opened")
+        self._skipped_counter = logfire.metric_counter("db_sessions_skipped")
+
+    @staticmethod
+    def _handler_name(event: TelegramObject, data: Dict[str, Any]) -> str:
+        handler = data.get("handler")
+        callback = getattr(handler, "callback", None)
+        table = getattr(callback, "__self__", None)
+        if isinstance(table, CallbackTable) and isinstance(event, CallbackQuery):
+            # Кнопки из таблицы маршрутизации учитываем по их собственным обработчикам
+            callback = table.handler_for(event.data or "") or callback
+        return getattr(callback, "__qualname__", None) or "unknown"
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Статистика по обработчикам: вызовы, обращения к БД и их доля"""
+        return {
+            name: {
+                "calls": calls,
+                "db_uses": self.handler_db_uses[name],
+                "db_ratio": self.handler_db_uses[name] / calls,
+            }
+            for name, calls in self.handler_calls.most_common()
+        }
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        db = LazySession(user_id=user.id if user else None)
+        data['db'] = db
+        try:
+            return await handler(event, data)
+        finally:
+            used = db.is_used
+            await db.close()
+            self._record(self._handler_name(event, data), used)
+
+    def _record(self, name: str, used: bool) -> None:
+        """Учесть, обращался ли обработчик к БД"""
+        self.total_calls += 1
+        self.handler_calls[name] += 1
+        if used:
+            self.handler_db_uses[name] += 1
+            self._sessions_counter.add(1)
+        else:
+            self._skipped_counter.add(1)
+
+        if self.total_calls % self.STATS_LOG_INTERVAL == 0:
+            logfire.info("Статистика использования БД обработчиками", handlers=self.stats())
+
+
+class FSMBatchMiddleware(BaseMiddleware):
+    """Middleware, записывающее изменения FSM одного обновления одним запросом"""
+
+    def __init__(self, storage):
+        """
+        Args:
+            storage: CoalescingStorage диспетчера
+        """
+        self.storage = storage
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
-        async with get_db_session() as db:
-            data['db'] = db
+        async with self.storage.batch():
             return await handler(event, data)
 
+
+def parse_throttle_policies(spec: str) -> List[Tuple[str, float, float]]:
+    """
+    Разобрать политики вида "f:=3/5,lk:=1/3" (префикс=скорость/запас).
+
+    Returns:
+        Список (префикс, токенов в секунду, размер корзины), длинные префиксы первыми
+    """
+    policies = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        prefix, _, limits = item.strip().partition("=")
+        rate, _, burst = limits.partition("/")
+        policies.append((prefix, float(rate), float(burst or rate)))
+    return sorted(policies, key=lambda policy: len(policy[0]), reverse=True)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничение частоты запросов пользователя.
+
+    У каждого пользователя общая корзина токенов (THROTTLE_RATE в секунду,
+    не больше THROTTLE_BURST) и отдельные корзины для префиксов callback_data
+    из THROTTLE_CALLBACK_POLICIES. Обновление без токена отбрасывается, на
+    callback отвечаем коротким уведомлением.
+
+    Повторные нажатия той же кнопки, пока первое еще обрабатывается,
+    не выполняются: им сразу отвечает callback.answer(). В многопроцессном
+    режиме обновления пользователя идут строго по очереди, поэтому повторы
+    отбрасывает UpdateSequencer (workers.py) еще до диспетчера.
+    """
+
+    # f: - лента и избранное, f:4: - сердечко в карточке (FeedAction.HEART),
+    # lk: и like_post_ - сердечко из уведомления (новый и прежний формат)
+    DEFAULT_POLICIES = "f:=3/5,f:4:=1/3,lk:=1/3,like_post_=1/3"
+
+    def __init__(
+        self,
+        rate: float = None,
+        burst: float = None,
+        policies: str = None,
+        max_buckets: int = None,
+    ):
+        """
+        Args:
+            rate: Общая скорость пополнения корзины, токенов в секунду
+            burst: Размер общей корзины
+            policies: Политики для префиксов callback_data (см. parse_throttle_policies)
+            max_buckets: Сколько корзин держать в памяти (вытесняются давно не использованные)
+        """
+        self.rate = rate or float(os.getenv("THROTTLE_RATE", "5"))
+        self.burst = burst or float(os.getenv("THROTTLE_BURST", "10"))
+        self.policies = parse_throttle_policies(
+            policies if policies is not None
+            else os.getenv("THROTTLE_CALLBACK_POLICIES", self.DEFAULT_POLICIES)
+        )
+        self.max_buckets = max_buckets or int(os.getenv("THROTTLE_MAX_BUCKETS", "20000"))
+        # (user_id, префикс) -> [токены, время последнего пополнения]
+        self._buckets: "OrderedDict[Tuple[int, str], List[float]]" = OrderedDict()
+        # (user_id, callback_data), которые сейчас обрабатываются
+        self._in_flight: Set[Tuple[int, str]] = set()
+        self._throttled_counter = logfire.metric_counter("updates_throttled")
+        self._coalesced_counter = logfire.metric_counter("callbacks_coalesced")
+
+    def _take(self, key: Tuple[int, str], rate: float, burst: float) -> bool:
+        """Взять токен из корзины; False - корзина пуста"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def _policy(self, data: str) -> Optional[Tuple[str, float, float]]:
+        for policy in self.policies:
+            if data.startswith(policy[0]):
+                return policy
+        return None
+
+    def allow(self, user_id: int, callback_data: Optional[str] = None) -> bool:
+        """Проверить общую корзину пользователя и корзину префикса callback_data"""
+        if callback_data:
+            policy = self._policy(callback_data)
+            if policy is not None and not self._take((user_id, policy[0]), policy[1], policy[2]):
+                return False
+        return self._take((user_id, ""), self.rate, self.burst)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        if not isinstance(event, CallbackQuery):
+            if not self.allow(user.id):
+                self._throttled_counter.add(1)
+                return None
+            return await handler(event, data)
+
+        key = (user.id, event.data or "")
+        if key in self._in_flight:
+            # Та же кнопка уже обрабатывается - только снимаем "часики"
+            self._coalesced_counter.add(1)
+            await event.answer()
+            return None
+        if not self.allow(user.id, event.data):
+            self._throttled_counter.add(1)
+            await event.answer("⏳ Слишком часто, подождите немного")
+            return None
+
+        self._in_flight.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(key)
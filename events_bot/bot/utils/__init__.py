@@ -1,4 +1,13 @@
 from .database import get_db_session
 from .notifications import send_post_notification
+from .downloads import stream_telegram_file
+from .editing import edit_media, edit_reply_markup, edit_text
 
-__all__ = ["get_db_session", "send_post_notification"]
+__all__ = [
+    "get_db_session",
+    "send_post_notification",
+    "stream_telegram_file",
+    "edit_text",
+    "edit_media",
+    "edit_reply_markup",
+]
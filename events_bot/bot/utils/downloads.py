@@ -0,0 +1,19 @@
+from typing import AsyncIterator
+from aiogram import Bot
+from events_bot.storage.streams import CHUNK_SIZE, iter_file
+
+
+def stream_telegram_file(
+    bot: Bot, file_path: str, chunk_size: int = CHUNK_SIZE, timeout: int = 30
+) -> AsyncIterator[bytes]:
+    """Потоково скачать файл Telegram блоками, без буфера на весь файл"""
+    api = bot.session.api
+    if api.is_local:
+        # Локальный Bot API сервер отдает путь к файлу на диске
+        return iter_file(api.wrap_local_file.to_local(file_path), chunk_size)
+    return bot.session.stream_content(
+        url=api.file_url(bot.token, file_path),
+        timeout=timeout,
+        chunk_size=chunk_size,
+        raise_for_status=True,
+    )
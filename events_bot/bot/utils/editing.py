@@ -0,0 +1,168 @@
+"""
+Редактирование сообщений без лишних запросов к Telegram.
+
+Для каждого сообщения (chat_id, message_id) хранится хэш последнего
+отрисованного содержимого и клавиатуры. Если новое содержимое совпадает,
+запрос не отправляется: Telegram все равно ответил бы ошибкой
+"message is not modified", а запрос учелся бы в лимитах.
+
+Если сообщения нет в кэше, сравниваем с его снимком из callback.message.
+В группах (модерация) сообщение могут редактировать обработчики других
+процессов, поэтому там кэш не используется, только снимок.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InputMedia, Message
+
+
+def _digest(*parts: Any) -> bytes:
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(str(part).encode())
+        hasher.update(b"\0")
+    return hasher.digest()
+
+
+def _markup_digest(reply_markup) -> bytes:
+    if reply_markup is None:
+        return _digest(None)
+    return _digest(reply_markup.model_dump_json(exclude_none=True))
+
+
+def _media_ref(media: InputMedia) -> Optional[str]:
+    """
+    Идентификатор файла: file_id, путь, URL или имя загружаемого файла.
+
+    None - надежного идентификатора нет (например, BufferedInputFile без имени).
+    """
+    if isinstance(media.media, str):
+        return media.media
+    for attribute in ("path", "url", "filename"):
+        value = getattr(media.media, attribute, None)
+        if value:
+            return str(value)
+    return None
+
+
+class RenderCache:
+    """Хэши последнего содержимого сообщений с ограничением размера (LRU)"""
+
+    def __init__(self, max_size: int = None):
+        self.max_size = max_size or int(os.getenv("EDIT_CACHE_SIZE", "10000"))
+        self._items: "OrderedDict[Tuple[int, int], Tuple[bytes, bytes]]" = OrderedDict()
+
+    def get(self, key: Tuple[int, int]) -> Optional[Tuple[bytes, bytes]]:
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: Tuple[int, int], value: Tuple[bytes, bytes]) -> None:
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def forget(self, key: Tuple[int, int]) -> None:
+        self._items.pop(key, None)
+
+
+# Кэш для использования во всем приложении
+render_cache = RenderCache()
+
+
+def _key(message: Message) -> Tuple[int, int]:
+    return message.chat.id, message.message_id
+
+
+def _snapshot(message: Message, parse_mode: Optional[str]) -> Tuple[Optional[bytes], bytes]:
+    """Хэши содержимого сообщения по его снимку (содержимое None - фото)"""
+    markup = _markup_digest(message.reply_markup)
+    if message.text is None:
+        return None, markup
+    text = message.html_text if parse_mode == "HTML" else message.text
+    return _digest("text", parse_mode, text), markup
+
+
+def _current(message: Message, parse_mode: Optional[str] = None) -> Tuple[Optional[bytes], bytes]:
+    if message.chat.type == "private":
+        cached = render_cache.get(_key(message))
+        if cached is not None:
+            return cached
+    return _snapshot(message, parse_mode)
+
+
+async def _send(message: Message, rendered: Tuple[bytes, bytes], request):
+    """Выполнить редактирование и запомнить отрисованное содержимое"""
+    try:
+        result = await request
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            render_cache.forget(_key(message))
+            raise
+        result = None
+    render_cache.put(_key(message), rendered)
+    return result
+
+
+async def edit_text(message: Message, text: str, reply_markup=None, parse_mode: str = None, **kwargs):
+    """
+    message.edit_text, пропускающий запрос без изменений.
+
+    Returns:
+        Результат edit_text или None, если редактировать было нечего
+    """
+    rendered = (_digest("text", parse_mode, text), _markup_digest(reply_markup))
+    if _current(message, parse_mode) == rendered:
+        return None
+    if parse_mode is not None:
+        kwargs["parse_mode"] = parse_mode
+    return await _send(message, rendered, message.edit_text(text, reply_markup=reply_markup, **kwargs))
+
+
+async def edit_media(message: Message, media: InputMedia, reply_markup=None, **kwargs):
+    """
+    message.edit_media, пропускающий запрос без изменений.
+
+    Returns:
+        Отредактированное сообщение или None, если редактировать было нечего
+    """
+    media_ref = _media_ref(media)
+    if media_ref is None:
+        # Не с чем сравнивать - редактируем всегда и не запоминаем содержимое
+        render_cache.forget(_key(message))
+        try:
+            return await message.edit_media(media=media, reply_markup=reply_markup, **kwargs)
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
+            return None
+    rendered = (
+        _digest("media", media_ref, media.parse_mode, media.caption),
+        _markup_digest(reply_markup),
+    )
+    if message.chat.type == "private" and render_cache.get(_key(message)) == rendered:
+        return None
+    return await _send(message, rendered, message.edit_media(media=media, reply_markup=reply_markup, **kwargs))
+
+
+async def edit_reply_markup(message: Message, reply_markup=None, **kwargs):
+    """
+    message.edit_reply_markup, пропускающий запрос, если клавиатура не изменилась.
+
+    Returns:
+        Результат edit_reply_markup или None, если редактировать было нечего
+    """
+    content, markup = _current(message)
+    new_markup = _markup_digest(reply_markup)
+    if markup == new_markup:
+        return None
+    return await _send(
+        message,
+        (content, new_markup),
+        message.edit_reply_markup(reply_markup=reply_markup, **kwargs),
+    )
@@ -1,8 +1,8 @@
 from aiogram import Bot
 from typing import List
 from events_bot.database.models import User, Post
-from events_bot.database.services import NotificationService
-from events_bot.storage import file_storage
+from events_bot.database import release_connection
+from events_bot.database.services import NotificationService, MediaService
 from aiogram.types import FSInputFile, InputMediaPhoto
 import logfire
 
@@ -15,6 +15,11 @@ async def send_post_notification(bot: Bot, post: Post, users: List[User], db) ->
     await db.refresh(post, attribute_names=["author", "categories"])
     notification_text = NotificationService.format_post_notification(post)
 
+    # Фото получаем один раз: после первой отправки используем file_id Telegram
+    photo = await MediaService.get_photo(db, post.image_id) if post.image_id else None
+    # Рассылка идет долго - на это время возвращаем соединение с БД в пул
+    await release_connection(db)
+
     success_count = 0
     error_count = 0
     
@@ -24,14 +29,15 @@ async def send_post_notification(bot: Bot, post: Post, users: List[User], db) ->
             
             # Если у поста есть изображение, отправляем с фото
             if post.image_id:
-                media_photo = await file_storage.get_media_photo(post.image_id)
-                if media_photo:
+                if photo:
                     logfire.debug(f"Отправляем уведомление с изображением пользователю {user.id}")
-                    await bot.send_photo(
+                    sent = await bot.send_photo(
                         chat_id=user.id,
-                        photo=media_photo.media,
+                        photo=photo,
                         caption=notification_text
                     )
+                    if not isinstance(photo, str):
+                        photo = await MediaService.remember_sent_photo(db, post.image_id, sent) or photo
                 else:
                     # Если файл не найден, отправляем только текст
                     logfire.warning(f"Изображение для поста {post.id} не найдено, отправляем только текст")
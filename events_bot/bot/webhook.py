@@ -0,0 +1,149 @@
+"""
+Прием обновлений через webhook (BOT_MODE=webhook).
+
+aiohttp-сервер проверяет секретный токен Telegram, сразу отвечает 200 и
+обрабатывает обновление в фоновой задаче. Одновременно обрабатывается не
+больше WEBHOOK_MAX_CONCURRENCY обновлений; если в очереди уже
+WEBHOOK_MAX_PENDING необработанных, сервер отвечает 503 и Telegram повторит
+доставку позже.
+"""
+
+import asyncio
+import hmac
+import os
+from typing import Any, Dict, Set
+import logfire
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookHandler:
+    """Обработчик POST-запросов Telegram с фоновой обработкой обновлений"""
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        secret_token: str = None,
+        max_concurrency: int = None,
+        max_pending: int = None,
+        **data: Any,
+    ):
+        """
+        Args:
+            dp: Диспетчер
+            bot: Бот, от имени которого обрабатываются обновления
+            secret_token: Ожидаемое значение заголовка X-Telegram-Bot-Api-Secret-Token
+            max_concurrency: Сколько обновлений обрабатывать одновременно
+            max_pending: Сколько принятых, но не обработанных обновлений допускается
+            data: Дополнительные данные для обработчиков (как в start_polling)
+        """
+        self.dp = dp
+        self.bot = bot
+        self.secret_token = secret_token if secret_token is not None else os.getenv("WEBHOOK_SECRET", "")
+        self.max_concurrency = max_concurrency or int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "100"))
+        self.max_pending = max_pending or int(os.getenv("WEBHOOK_MAX_PENDING", "1000"))
+        self.data = data
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Принятые обновления, обработка которых еще не завершилась"""
+        return len(self._tasks)
+
+    def _verify_secret(self, request: web.Request) -> bool:
+        # Без секрета любой, кто знает адрес, мог бы присылать поддельные обновления
+        if not self.secret_token:
+            return False
+        return hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret_token)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if not self._verify_secret(request):
+            return web.Response(status=401)
+        if self.pending >= self.max_pending:
+            logfire.warning(f"Webhook перегружен: {self.pending} обновлений в обработке")
+            return web.Response(status=503)
+        try:
+            update = await request.json(loads=self.bot.session.json_loads)
+        except ValueError:
+            return web.Response(status=400)
+
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response(status=200)
+
+    async def _process(self, update: Dict[str, Any]) -> None:
+        async with self._semaphore:
+            try:
+                await self.dp.feed_raw_update(self.bot, update, **self.data)
+            except Exception as e:
+                logfire.exception("Ошибка обработки обновления из webhook {e}", e=e)
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "pending": self.pending})
+
+    async def close(self, timeout: float = 30) -> None:
+        """Дождаться уже принятых обновлений перед остановкой"""
+        if self._tasks:
+            logfire.info(f"Ожидание обработки {len(self._tasks)} обновлений")
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+    def register(self, app: web.Application, path: str) -> None:
+        app.router.add_post(path, self.handle)
+        app.router.add_get("/health", self.health)
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, path: str = None, **kwargs: Any) -> web.Application:
+    """aiohttp-приложение с обработчиком webhook по пути WEBHOOK_PATH"""
+    path = path or os.getenv("WEBHOOK_PATH", "/webhook")
+    handler = WebhookHandler(dp, bot, **kwargs)
+    app = web.Application()
+    handler.register(app, path)
+    app["webhook_handler"] = handler
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """
+    Зарегистрировать webhook в Telegram и обслуживать его до остановки.
+
+    Адрес задается WEBHOOK_URL (публичный https-адрес без пути), сервер
+    слушает WEBHOOK_HOST:WEBHOOK_PORT.
+    """
+    base_url = os.getenv("WEBHOOK_URL")
+    if not base_url:
+        raise ValueError("WEBHOOK_URL не установлен в переменных окружения")
+    if not os.getenv("WEBHOOK_SECRET"):
+        raise ValueError("WEBHOOK_SECRET не установлен в переменных окружения")
+    path = os.getenv("WEBHOOK_PATH", "/webhook")
+    host = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    port = int(os.getenv("WEBHOOK_PORT", "8080"))
+
+    app = create_webhook_app(dp, bot, path)
+    handler: WebhookHandler = app["webhook_handler"]
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+
+    await bot.set_webhook(
+        url=base_url.rstrip("/") + path,
+        secret_token=handler.secret_token,
+        allowed_updates=dp.resolve_used_update_types(),
+        max_connections=int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40")),
+    )
+    logfire.info(f"🌐 Webhook слушает {host}:{port}{path}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # Webhook не удаляем: при поэтапном деплое его обслуживает следующий экземпляр.
+        # Перестаем принимать запросы и дожидаемся уже принятых обновлений
+        await site.stop()
+        await handler.close()
+        await runner.cleanup()
@@ -0,0 +1,294 @@
+"""
+Многопроцессный режим (BOT_WORKERS > 1).
+
+Процесс-супервизор получает обновления (long polling или webhook) в виде
+JSON, не разбирая их, и раздает рабочим процессам по from_user.id: все
+обновления одного пользователя попадают в один процесс, поэтому его
+состояние FSM живет в одном месте. Внутри процесса обновления одного
+пользователя обрабатываются строго по очереди, разных - параллельно.
+
+Фоновые задачи (очистка просроченных постов) выполняет только процесс 0;
+остальные пересылают ему дедлайны новых постов.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logfire
+from aiohttp import ClientError, ClientSession, ClientTimeout
+from aiogram import Bot
+
+
+# Проверка живости рабочих процессов, секунды
+MONITOR_INTERVAL = 5
+
+
+def get_shard_key(update: Dict[str, Any]) -> int:
+    """Ключ шардирования: id пользователя, иначе id чата, иначе update_id"""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+        chat = event.get("chat")
+        if chat:
+            return chat["id"]
+    return update.get("update_id", 0)
+
+
+class ShardRouter:
+    """
+    Раздача обновлений по очередям рабочих процессов.
+
+    Повторяет нужную часть интерфейса Dispatcher (feed_raw_update,
+    resolve_used_update_types), чтобы супервизор мог использовать тот же
+    обработчик webhook, что и однопроцессный режим.
+    """
+
+    def __init__(self, queues: List[multiprocessing.Queue], allowed_updates: List[str]):
+        self.queues = queues
+        self.allowed_updates = allowed_updates
+
+    def resolve_used_update_types(self) -> List[str]:
+        return self.allowed_updates
+
+    def dispatch(self, updates: List[Dict[str, Any]]) -> None:
+        """Разложить пачку обновлений по процессам, сохраняя порядок внутри шарда"""
+        shards: Dict[int, List[Dict[str, Any]]] = {}
+        for update in updates:
+            shards.setdefault(get_shard_key(update) % len(self.queues), []).append(update)
+        for index, shard in shards.items():
+            self.queues[index].put(("updates", shard))
+
+    async def feed_raw_update(self, bot: Bot, update: Dict[str, Any], **kwargs: Any) -> None:
+        self.dispatch([update])
+
+
+class UpdateSequencer:
+    """
+    Параллельная обработка обновлений с сохранением порядка для каждого пользователя.
+
+    Повторное нажатие той же кнопки, пока предыдущее еще ждет очереди или
+    обрабатывается, отбрасывается здесь же (только снимаем "часики"):
+    ThrottlingMiddleware этого не видит, потому что следующее обновление
+    пользователя доходит до диспетчера только после завершения предыдущего.
+    """
+
+    def __init__(self, dp, bot: Bot, coalesce_callbacks: bool = None):
+        """
+        Args:
+            dp: Диспетчер
+            bot: Бот
+            coalesce_callbacks: Отбрасывать повторные нажатия (по умолчанию - если THROTTLING не false)
+        """
+        self.dp = dp
+        self.bot = bot
+        if coalesce_callbacks is None:
+            coalesce_callbacks = os.getenv("THROTTLING", "true").lower() != "false"
+        self.coalesce_callbacks = coalesce_callbacks
+        self._tails: Dict[int, asyncio.Task] = {}
+        # (ключ шарда, callback_data) нажатий, которые ждут очереди или обрабатываются
+        self._pending_callbacks: Set[Tuple[int, str]] = set()
+        self._answers: Set[asyncio.Task] = set()
+        self._coalesced_counter = logfire.metric_counter("callbacks_coalesced")
+
+    @property
+    def pending(self) -> int:
+        return len(self._tails)
+
+    def feed(self, update: Dict[str, Any]) -> None:
+        key = get_shard_key(update)
+        callback = update.get("callback_query")
+        callback_key = None
+        if callback is not None and self.coalesce_callbacks:
+            callback_key = (key, callback.get("data") or "")
+            if callback_key in self._pending_callbacks:
+                self._coalesced_counter.add(1)
+                answer = asyncio.create_task(self._answer(callback["id"]))
+                self._answers.add(answer)
+                answer.add_done_callback(self._answers.discard)
+                return
+            self._pending_callbacks.add(callback_key)
+
+        previous = self._tails.get(key)
+        task = asyncio.create_task(self._process(update, previous))
+        self._tails[key] = task
+        task.add_done_callback(lambda done: self._release(key, done, callback_key))
+
+    def _release(self, key: int, task: asyncio.Task, callback_key: Optional[Tuple[int, str]]) -> None:
+        if self._tails.get(key) is task:
+            del self._tails[key]
+        if callback_key is not None:
+            self._pending_callbacks.discard(callback_key)
+
+    async def _answer(self, callback_query_id: str) -> None:
+        try:
+            await self.bot.answer_callback_query(callback_query_id)
+        except Exception as e:
+            logfire.warning(f"Не удалось ответить на повторное нажатие: {e}")
+
+    async def _process(self, update: Dict[str, Any], previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            # Ошибки предыдущего обновления уже залогированы в его задаче
+            await asyncio.wait([previous])
+        try:
+            await self.dp.feed_raw_update(self.bot, update)
+        except Exception as e:
+            logfire.exception("Ошибка обработки обновления в рабочем процессе {e}", e=e)
+
+    async def close(self, timeout: float = 30) -> None:
+        tasks = set(self._tails.values()) | self._answers
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+
+async def _worker_main(index: int, token: str, inbox, jobs_inbox) -> None:
+    from events_bot.bot.dispatcher import build_dispatcher
+    from events_bot.tasks import cleanup_expired_posts_task, expiry_scheduler
+
+    bot = Bot(token=token)
+    dp = build_dispatcher()
+    sequencer = UpdateSequencer(dp, bot)
+    loop = asyncio.get_running_loop()
+
+    jobs = None
+    if index == 0:
+        jobs = asyncio.create_task(cleanup_expired_posts_task())
+    else:
+        expiry_scheduler.forward_to(
+            lambda post_id, event_at: jobs_inbox.put(("schedule", post_id, event_at))
+        )
+
+    logfire.info(f"⚙️ Рабочий процесс {index} запущен (pid {os.getpid()})")
+    try:
+        while True:
+            message = await loop.run_in_executor(None, inbox.get)
+            if message is None:
+                break
+            kind, *payload = message
+            if kind == "updates":
+                for update in payload[0]:
+                    sequencer.feed(update)
+            elif kind == "schedule":
+                expiry_scheduler.schedule(*payload)
+        await sequencer.close()
+    finally:
+        if jobs is not None:
+            jobs.cancel()
+        from events_bot.storage import image_pipeline
+        image_pipeline.shutdown()
+        await bot.session.close()
+
+
+def _worker_entry(index: int, token: str, inbox, jobs_inbox) -> None:
+    """Точка входа рабочего процесса"""
+    try:
+        logfire.configure(token=os.getenv("LOGFIRE_TOKEN"))
+    except Exception:
+        pass
+    try:
+        asyncio.run(_worker_main(index, token, inbox, jobs_inbox))
+    except KeyboardInterrupt:
+        pass
+
+
+async def poll_raw_updates(bot: Bot, router: ShardRouter, timeout: int = 30) -> None:
+    """Long polling без разбора обновлений: JSON сразу уходит рабочим процессам"""
+    url = bot.session.api.api_url(bot.token, "getUpdates")
+    allowed_updates = json.dumps(router.resolve_used_update_types())
+    offset = None
+    async with ClientSession(timeout=ClientTimeout(total=timeout + 10)) as http:
+        while True:
+            params = {"timeout": timeout, "allowed_updates": allowed_updates}
+            if offset is not None:
+                params["offset"] = offset
+            try:
+                async with http.post(url, data=params) as response:
+                    payload = await response.json()
+            except (ClientError, asyncio.TimeoutError, ValueError) as e:
+                logfire.warning(f"Ошибка getUpdates: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not payload.get("ok"):
+                logfire.warning(f"getUpdates вернул ошибку: {payload.get('description')}")
+                await asyncio.sleep(1)
+                continue
+            updates = payload["result"]
+            if updates:
+                offset = updates[-1]["update_id"] + 1
+                router.dispatch(updates)
+
+
+class WorkerPool:
+    """Рабочие процессы с перезапуском упавших"""
+
+    def __init__(self, token: str, workers: int):
+        self.token = token
+        self.context = multiprocessing.get_context("spawn")
+        self.queues = [self.context.Queue() for _ in range(workers)]
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+
+    def _spawn(self, index: int) -> None:
+        process = self.context.Process(
+            target=_worker_entry,
+            args=(index, self.token, self.queues[index], self.queues[0]),
+            name=f"bot-worker-{index}",
+            daemon=True,
+        )
+        # Номер процесса нужен уже при импорте модулей (файловый кэш, см. CachedFileStorage):
+        # spawn передает дочернему процессу копию окружения на момент start()
+        os.environ["BOT_WORKER_INDEX"] = str(index)
+        try:
+            process.start()
+        finally:
+            os.environ.pop("BOT_WORKER_INDEX", None)
+        self.processes[index] = process
+
+    def start(self) -> None:
+        for index in range(len(self.queues)):
+            self._spawn(index)
+
+    async def monitor(self) -> None:
+        while True:
+            await asyncio.sleep(MONITOR_INTERVAL)
+            for index, process in enumerate(self.processes):
+                if not process.is_alive():
+                    logfire.error(f"Рабочий процесс {index} завершился с кодом {process.exitcode}, перезапуск")
+                    self._spawn(index)
+
+    async def stop(self, timeout: float = 30) -> None:
+        for queue in self.queues:
+            queue.put(None)
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+async def run_supervisor(token: str, workers: int) -> None:
+    """Запустить рабочие процессы и раздавать им обновления до остановки"""
+    from events_bot.bot.dispatcher import build_dispatcher
+    from .webhook import run_webhook
+
+    pool = WorkerPool(token, workers)
+    pool.start()
+    router = ShardRouter(pool.queues, build_dispatcher().resolve_used_update_types())
+    bot = Bot(token=token)
+    logfire.info(f"🤖 Супервизор запущен, рабочих процессов: {workers}")
+
+    async def receive_updates():
+        if os.getenv("BOT_MODE", "polling").lower() == "webhook":
+            await run_webhook(router, bot)
+        else:
+            await bot.delete_webhook()
+            await poll_raw_updates(bot, router)
+
+    try:
+        await asyncio.gather(receive_updates(), pool.monitor())
+    finally:
+        await pool.stop()
+        await bot.session.close()
@@ -1,5 +1,6 @@
 from .models import Base, User, Category, Post, ModerationRecord
-from .connection import create_async_engine_and_session, create_tables, get_db
+from .views import PostView
+from .connection import create_async_engine_and_session, create_tables, get_db, release_connection
 from .repositories import (
     UserRepository,
     CategoryRepository,
@@ -7,6 +8,7 @@ from .repositories import (
     ModerationRepository,
 )
 from .init_db import init_database
+from .migrations import run_migrations
 
 __all__ = [
     # Database models
@@ -15,10 +17,13 @@ __all__ = [
     "Category",
     "Post",
     "ModerationRecord",
+    # Read models
+    "PostView",
     # Database connection
     "create_async_engine_and_session",
     "create_tables",
     "get_db",
+    "release_connection",
     # Repositories
     "UserRepository",
     "CategoryRepository",
@@ -26,4 +31,5 @@ __all__ = [
     "ModerationRepository",
     # Initialization
     "init_database",
+    "run_migrations",
 ]
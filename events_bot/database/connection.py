@@ -1,10 +1,26 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import StaticPool
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
 from .models import Base
+from .replicas import RoutingSession, configure_replicas, get_replica_urls
+from .partitioning import (
+    add_event_at_columns,
+    create_partitioned_tables,
+    ensure_partitions,
+    is_partitioning_enabled,
+)
+from .write_queue import (
+    SQLiteWriteQueue,
+    configure_write_queue,
+    enable_savepoints,
+    is_write_queue_enabled,
+)
 from logfire import instrument_sqlalchemy
 
 
@@ -18,6 +34,11 @@ def get_database_url():
     if not database_url:
         raise ValueError("DATABASE_URL не установлен в переменных окружения")
 
+    return normalize_database_url(database_url)
+
+
+def normalize_database_url(database_url: str) -> str:
+    """Экранировать пароль и привести URL к асинхронному драйверу"""
     # Экранируем спецсимволы в пароле (например, ;, #, /, =)
     if "@" in database_url and "://" in database_url:
         prefix, rest = database_url.split("://", 1)
@@ -37,6 +58,83 @@ def get_database_url():
     return database_url
 
 
+def _is_sqlite_memory(url) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+
+def get_engine_options(database_url: str) -> dict:
+    """
+    Параметры create_async_engine для конкретного диалекта.
+
+    Размеры пула и прочие значения по умолчанию переопределяются переменными
+    окружения DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    PG_STATEMENT_CACHE_SIZE, PG_STATEMENT_TIMEOUT_MS, SQLITE_POOL_SIZE.
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        if _is_sqlite_memory(url):
+            # Одна общая in-memory база: каждое новое соединение видело бы пустую БД
+            return {"poolclass": StaticPool}
+        # Сетевых разрывов нет - pre_ping и recycle не нужны. Пишет одно соединение,
+        # в WAL читатели ему не мешают, так что большой пул только плодит блокировки
+        return {
+            "pool_size": int(os.getenv("SQLITE_POOL_SIZE", "5")),
+            "max_overflow": 0,
+            "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        }
+
+    options = {
+        "pool_pre_ping": True,
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "300")),
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    }
+
+    if url.get_driver_name() == "asyncpg":
+        statement_cache_size = int(os.getenv("PG_STATEMENT_CACHE_SIZE", "500"))
+        connect_args = {
+            # Кэш подготовленных запросов SQLAlchemy на каждое соединение
+            "prepared_statement_cache_size": statement_cache_size,
+            "server_settings": {
+                "application_name": os.getenv("PG_APPLICATION_NAME", "events_bot"),
+                # Короткие OLTP-запросы: компиляция JIT только добавляет задержку
+                "jit": "off",
+                "statement_timeout": os.getenv("PG_STATEMENT_TIMEOUT_MS", "30000"),
+            },
+        }
+        if statement_cache_size == 0:
+            # PgBouncer в режиме transaction: подготовленные запросы недопустимы
+            connect_args["statement_cache_size"] = 0
+        options["connect_args"] = connect_args
+
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Настроить соединение SQLite: WAL, умеренный fsync, mmap и ожидание блокировок"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}")
+        cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def build_engine(database_url: str, **overrides):
+    """Создать асинхронный движок с профилем настроек для диалекта"""
+    options = {"echo": False, **get_engine_options(database_url), **overrides}
+    engine = create_async_engine(database_url, **options)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
 # Глобальные переменные
 _engine = None
 _session_maker = None
@@ -49,17 +147,20 @@ def create_async_engine_and_session():
     
     if _engine is None:
         database_url = get_database_url()
-        _engine = create_async_engine(
-            database_url,
-            echo=False,
-            pool_pre_ping=True,
-            pool_recycle=300,
-            pool_size=10,
-            max_overflow=20,
+        _engine = build_engine(database_url)
+        # Реплики для читающих запросов (см. replicas.py)
+        configure_replicas(
+            [build_engine(normalize_database_url(url)) for url in get_replica_urls()]
         )
+        # Единственный писатель SQLite с групповым commit (см. write_queue.py)
+        if is_write_queue_enabled(database_url) and not _is_sqlite_memory(make_url(database_url)):
+            writer_engine = build_engine(database_url, pool_size=1, max_overflow=0)
+            enable_savepoints(writer_engine)
+            configure_write_queue(SQLiteWriteQueue(writer_engine))
         _session_maker = async_sessionmaker(
             bind=_engine,
             class_=AsyncSession,
+            sync_session_class=RoutingSession,
             expire_on_commit=False,
             autoflush=False,
         )
@@ -71,12 +172,38 @@ def create_async_engine_and_session():
     return _engine, _session_maker
 
 
+async def create_schema(conn) -> None:
+    """Создать недостающие таблицы и колонки в открытой транзакции"""
+    # Секционированные таблицы постов создаются до create_all, который их пропустит
+    if is_partitioning_enabled() and conn.dialect.name == "postgresql":
+        await create_partitioned_tables(conn)
+        await ensure_partitions(conn)
+    await conn.run_sync(Base.metadata.create_all)
+    await add_event_at_columns(conn)
+
+
 async def create_tables(engine=None):
     """Создает все таблицы в базе данных асинхронно"""
     if engine is None:
         engine, _ = create_async_engine_and_session()
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await create_schema(conn)
+
+
+async def release_connection(db) -> None:
+    """
+    Вернуть соединение сессии в пул перед долгим сетевым вызовом (отправка фото и т.п.).
+
+    Текущая транзакция фиксируется, загруженные объекты остаются доступны
+    (expire_on_commit=False), а соединение будет взято заново при следующем запросе.
+    """
+    if db is None:
+        return
+    release = getattr(db, "release", None)
+    if release is not None:
+        await release()
+    elif db.in_transaction():
+        await db.commit()
 
 
 async def get_db():
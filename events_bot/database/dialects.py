@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, literal, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def get_upsert_insert(db: AsyncSession):
+    """
+    Вернуть insert() диалекта с поддержкой ON CONFLICT для текущей сессии.
+
+    Returns:
+        Функцию insert из sqlalchemy.dialects.* или None, если диалект не поддерживает ON CONFLICT
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        return insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+
+        return insert
+    return None
+
+
+def db_utcnow(db: AsyncSession, offset_seconds: float = 0):
+    """
+    Выражение "текущее время UTC + offset_seconds" по часам сервера БД.
+
+    Нужно там, где время сравнивают несколько экземпляров бота (аренды):
+    часы разных машин могут расходиться, часы БД у всех одни.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return func.timezone("UTC", func.now()) + timedelta(seconds=offset_seconds)
+    if dialect == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:%f", "now", f"{offset_seconds:+.3f} seconds")
+    if dialect == "mysql":
+        return func.timestampadd(
+            text("MICROSECOND"), int(offset_seconds * 1_000_000), func.utc_timestamp(6)
+        )
+    return literal(datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=offset_seconds))
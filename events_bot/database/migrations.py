@@ -0,0 +1,116 @@
+"""
+Версионированные миграции схемы.
+
+Номер примененной миграции хранится в таблице schema_version. При старте
+бот читает его одним запросом и, если схема актуальна, больше ничего не
+делает: ни отражения таблиц через create_all, ни проверки категорий.
+Новое изменение схемы добавляется функцией в конец MIGRATIONS.
+"""
+
+from typing import Awaitable, Callable, List, Tuple
+import logfire
+from sqlalchemy import Column, Integer, MetaData, Table, func, insert, select, text
+from sqlalchemy.exc import DBAPIError
+from .connection import create_schema
+from .models import Category, FSMRecord
+
+
+# Отдельные метаданные: таблица версии не должна попадать в create_all моделей
+_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, nullable=False),
+)
+
+# Ключ pg_advisory_xact_lock, чтобы реплики не мигрировали одновременно
+MIGRATION_LOCK_ID = 7_318_264_001
+
+DEFAULT_CATEGORIES = [
+    {"name": "Технологии", "description": "Новости и обсуждения в сфере технологий"},
+    {"name": "Спорт", "description": "Спортивные новости и события"},
+    {"name": "Культура", "description": "Культурные события и искусство"},
+    {"name": "Наука", "description": "Научные открытия и исследования"},
+    {"name": "Бизнес", "description": "Бизнес новости и экономика"},
+    {"name": "Здоровье", "description": "Медицина и здоровый образ жизни"},
+    {"name": "Образование", "description": "Образовательные программы и курсы"},
+    {"name": "Путешествия", "description": "Туризм и путешествия"},
+    {"name": "Кулинария", "description": "Рецепты и кулинарные новости"},
+    {"name": "Авто", "description": "Автомобильная тематика"},
+    {"name": "Мода", "description": "Модные тренды и стиль"},
+    {"name": "Музыка", "description": "Музыкальные новости и события"},
+    {"name": "Кино", "description": "Фильмы, сериалы и кинематограф"},
+    {"name": "Книги", "description": "Литература и книжные новинки"},
+    {"name": "Игры", "description": "Видеоигры и игровая индустрия"},
+]
+
+
+async def _create_initial_schema(conn) -> None:
+    """Таблицы моделей (для существующих баз - только недостающие)"""
+    await create_schema(conn)
+
+
+async def _seed_categories(conn) -> None:
+    """Категории по умолчанию одной вставкой, если категорий еще нет"""
+    count = (await conn.execute(select(func.count(Category.id)))).scalar()
+    if count:
+        logfire.info(f"База данных уже содержит {count} категорий")
+        return
+    await conn.execute(insert(Category), DEFAULT_CATEGORIES)
+    logfire.info(f"✅ Добавлено {len(DEFAULT_CATEGORIES)} категорий")
+
+
+async def _create_fsm_states(conn) -> None:
+    """Таблица состояний FSM вместо MemoryStorage"""
+    await conn.run_sync(FSMRecord.__table__.create, checkfirst=True)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[..., Awaitable[None]]]] = [
+    (1, "создание таблиц", _create_initial_schema),
+    (2, "категории по умолчанию", _seed_categories),
+    (3, "таблица состояний FSM", _create_fsm_states),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+async def get_schema_version(engine) -> int:
+    """Текущая версия схемы (0 - миграции еще не применялись)"""
+    try:
+        async with engine.connect() as conn:
+            return (await conn.execute(select(schema_version.c.version))).scalar() or 0
+    except DBAPIError:
+        # Таблицы schema_version еще нет
+        return 0
+
+
+async def run_migrations(engine) -> int:
+    """
+    Применить недостающие миграции.
+
+    Returns:
+        int: Количество примененных миграций
+    """
+    if await get_schema_version(engine) >= LATEST_VERSION:
+        return 0
+
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text(f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_ID})"))
+        await conn.run_sync(_metadata.create_all)
+        # Перечитываем под блокировкой: миграции мог уже применить другой экземпляр
+        current = (await conn.execute(select(schema_version.c.version))).scalar()
+        if current is None:
+            await conn.execute(insert(schema_version).values(version=0))
+            current = 0
+
+        applied = 0
+        for version, description, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            logfire.info(f"Миграция {version}: {description}")
+            await migration(conn)
+            await conn.execute(schema_version.update().values(version=version))
+            applied += 1
+    return applied
@@ -48,6 +48,8 @@ post_categories = Table(
     Base.metadata,
     Column("post_id", ForeignKey("posts.id"), primary_key=True),
     Column("category_id", ForeignKey("categories.id"), primary_key=True),
+    # Копия posts.event_at: ключ секционирования по месяцам (см. partitioning.py)
+    Column("event_at", DateTime, nullable=True, index=True),
 )
 
 
@@ -142,6 +144,8 @@ class Like(Base, TimestampMixin):
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     post_id: Mapped[int] = mapped_column(ForeignKey("posts.id"), nullable=False)
+    # Копия posts.event_at: ключ секционирования по месяцам (см. partitioning.py)
+    event_at: Mapped[Optional[DateTime]] = mapped_column(DateTime, nullable=True, index=True)
 
     # Связи
     user: Mapped[User] = relationship()
@@ -153,6 +157,46 @@ class Like(Base, TimestampMixin):
     )
 
 
+class MediaFile(Base, TimestampMixin):
+    """Модель файла в хранилище с подсчетом ссылок (дедупликация по содержимому)"""
+
+    __tablename__ = "media_files"
+
+    # Id файла в хранилище (SHA-256 содержимого), совпадает с Post.image_id
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    # Количество постов, ссылающихся на файл
+    ref_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # file_id Telegram после первой отправки - повторно файл не выгружаем
+    telegram_file_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+
+class Lease(Base, TimestampMixin):
+    """Модель аренды (lease) для выбора лидера среди нескольких экземпляров бота"""
+
+    __tablename__ = "leases"
+
+    # Имя фоновой задачи, которая должна выполняться в одном экземпляре
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # Идентификатор экземпляра-владельца
+    holder: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Время окончания аренды (UTC); после него аренду может забрать другой экземпляр
+    expires_at: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
+
+
+class FSMRecord(Base):
+    """Состояние FSM пользователя (черновик поста, комментарий модератора и т.п.)"""
+
+    __tablename__ = "fsm_states"
+
+    # Ключ хранилища aiogram (бот, чат, пользователь)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # Данные FSMContext в JSON
+    data: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # После этого времени (UTC) состояние считается брошенным и удаляется
+    expires_at: Mapped[DateTime] = mapped_column(DateTime, nullable=False, index=True)
+
+
 class ModerationAction(str, Enum):
     APPROVE = "approve"
     REJECT = "reject"
@@ -0,0 +1,316 @@
+"""
+Секционирование постов по месяцам event_at.
+
+В режиме DB_PARTITIONING=true на PostgreSQL таблицы posts, likes и
+post_categories создаются как секционированные по диапазону event_at
+(одна секция на месяц плюс секция по умолчанию для постов без даты).
+Полностью просроченные месяцы удаляются целиком через DROP TABLE секции,
+построчное удаление остается только для текущего месяца.
+
+На SQLite (и на PostgreSQL с обычными таблицами) тот же путь выполняется
+диапазонными DELETE по месяцам через денормализованный event_at в likes
+и post_categories, без соединений с posts.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import List, Tuple
+import logfire
+from sqlalchemy import DateTime, and_, inspect, select, text, update
+from sqlalchemy.schema import CreateIndex, CreateTable
+from .models import Base, Like, ModerationRecord, Post, post_categories
+from .repositories.media_file_repository import MediaFileRepository
+from .write_queue import write_operation
+
+
+# Секционируемые таблицы (порядок важен: posts создается первой, удаляется последней)
+PARTITIONED_TABLES = ("posts", "likes", "post_categories")
+
+# Таблицы, которые ссылаются на posts.id: в секционированном режиме posts.id
+# не уникален сам по себе, поэтому внешние ключи на него не создаются
+POST_REFERENCING_TABLES = ("likes", "post_categories", "moderation_records")
+
+# Уникальность в секционированной таблице должна включать ключ секционирования
+PARTITIONED_UNIQUE_COLUMNS = {
+    "posts": ("id", "event_at"),
+    "likes": ("user_id", "post_id", "event_at"),
+    "post_categories": ("post_id", "category_id", "event_at"),
+}
+
+
+def is_partitioning_enabled() -> bool:
+    """Включен ли режим секционирования постов по месяцам"""
+    return os.getenv("DB_PARTITIONING", "false").lower() == "true"
+
+
+def _months_ahead() -> int:
+    return int(os.getenv("DB_PARTITION_MONTHS_AHEAD", "3"))
+
+
+def _current_month() -> Tuple[int, int]:
+    now = datetime.now(timezone.utc)
+    return now.year, now.month
+
+
+def _add_months(year: int, month: int, count: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + count
+    return index // 12, index % 12 + 1
+
+
+def _month_start(year: int, month: int) -> datetime:
+    return datetime(year, month, 1)
+
+
+def _partition_name(table: str, year: int, month: int) -> str:
+    return f"{table}_p{year:04d}_{month:02d}"
+
+
+def _parse_partition_name(table: str, name: str):
+    """(год, месяц) по имени секции или None для секции по умолчанию"""
+    prefix = f"{table}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        year, month = name[len(prefix):].split("_")
+        return int(year), int(month)
+    except ValueError:
+        return None
+
+
+def _partitioned_table_ddl(table, dialect) -> str:
+    """
+    DDL секционированной таблицы по описанию модели.
+
+    Первичный ключ заменяется уникальным ограничением с event_at, внешние
+    ключи на posts не создаются (PostgreSQL не позволяет ссылаться на
+    секционированную таблицу без ключа секционирования).
+    """
+    compiler = dialect.ddl_compiler(dialect, None)
+    preparer = dialect.identifier_preparer
+    lines = [compiler.get_column_specification(column) for column in table.columns]
+    for fk in table.foreign_key_constraints:
+        if fk.referred_table.name in PARTITIONED_TABLES:
+            continue
+        lines.append(compiler.process(fk))
+    unique = ", ".join(preparer.quote(name) for name in PARTITIONED_UNIQUE_COLUMNS[table.name])
+    lines.append(f"UNIQUE ({unique})")
+    return (
+        f"CREATE TABLE {preparer.format_table(table)} (\n\t"
+        + ",\n\t".join(lines)
+        + "\n) PARTITION BY RANGE (event_at)"
+    )
+
+
+def _dialect(conn):
+    """Диалект для AsyncConnection или AsyncSession"""
+    dialect = getattr(conn, "dialect", None)
+    return dialect if dialect is not None else conn.get_bind().dialect
+
+
+async def _is_partitioned(conn, table: str) -> bool:
+    """Является ли таблица секционированной (только PostgreSQL)"""
+    if _dialect(conn).name != "postgresql":
+        return False
+    result = await conn.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :name AND relkind IN ('p', 'r')"),
+        {"name": table},
+    )
+    return result.scalar() == "p"
+
+
+async def _list_partitions(conn, table: str) -> List[str]:
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :name"
+        ),
+        {"name": table},
+    )
+    return list(result.scalars().all())
+
+
+async def create_partitioned_tables(conn) -> None:
+    """
+    Создать секционированные posts/likes/post_categories на PostgreSQL.
+
+    Существующие обычные таблицы не преобразуются: для них очистка работает
+    диапазонными DELETE.
+    """
+    existing = await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+    if "posts" in existing:
+        if not await _is_partitioned(conn, "posts"):
+            logfire.warning(
+                "DB_PARTITIONING=true, но таблица posts уже создана без секционирования - "
+                "используется удаление по диапазонам"
+            )
+        return
+
+    # Сначала все таблицы, на которые ссылаются секционированные (users, categories и т.д.)
+    special = set(PARTITIONED_TABLES) | set(POST_REFERENCING_TABLES)
+    await conn.run_sync(
+        Base.metadata.create_all,
+        tables=[table for table in Base.metadata.sorted_tables if table.name not in special],
+    )
+
+    for name in PARTITIONED_TABLES:
+        table = Base.metadata.tables[name]
+        await conn.execute(text(_partitioned_table_ddl(table, conn.dialect)))
+        await conn.execute(
+            text(f"CREATE TABLE {name}_default PARTITION OF {name} DEFAULT")
+        )
+        for index in table.indexes:
+            await conn.execute(CreateIndex(index))
+
+    moderation_records = ModerationRecord.__table__
+    await conn.execute(
+        CreateTable(
+            moderation_records,
+            include_foreign_key_constraints=[
+                fk
+                for fk in moderation_records.foreign_key_constraints
+                if fk.referred_table.name not in PARTITIONED_TABLES
+            ],
+        )
+    )
+    logfire.info("✅ Созданы секционированные таблицы постов")
+
+
+async def ensure_partitions(conn, months_ahead: int = None) -> None:
+    """
+    Создать секции с текущего месяца на months_ahead вперед (PostgreSQL).
+
+    Строки, успевшие попасть в секцию по умолчанию (события далеко в будущем),
+    переносятся в новую секцию до ее подключения.
+    """
+    if not await _is_partitioned(conn, "posts"):
+        return
+    months_ahead = _months_ahead() if months_ahead is None else months_ahead
+    year, month = _current_month()
+
+    for name in PARTITIONED_TABLES:
+        existing = set(await _list_partitions(conn, name))
+        for offset in range(months_ahead + 1):
+            part_year, part_month = _add_months(year, month, offset)
+            partition = _partition_name(name, part_year, part_month)
+            if partition in existing:
+                continue
+            start = _month_start(part_year, part_month)
+            end = _month_start(*_add_months(part_year, part_month, 1))
+            bounds = {"start": start, "end": end}
+            await conn.execute(
+                text(f"CREATE TABLE {partition} (LIKE {name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            )
+            await conn.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {name}_default "
+                    f"WHERE event_at >= :start AND event_at < :end RETURNING *) "
+                    f"INSERT INTO {partition} SELECT * FROM moved"
+                ),
+                bounds,
+            )
+            await conn.execute(
+                text(
+                    f"ALTER TABLE {name} ATTACH PARTITION {partition} "
+                    f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{end.isoformat(sep=' ')}')"
+                )
+            )
+            logfire.info(f"Создана секция {partition}")
+
+
+@write_operation
+async def drop_expired_partitions(db) -> Tuple[int, List[str]]:
+    """
+    Удалить посты всех полностью прошедших месяцев (до начала текущего).
+
+    Returns:
+        Tuple[int, List[str]]: Количество удаленных постов и id изображений,
+            на которые больше никто не ссылается
+    """
+    if await _is_partitioned(db, "posts"):
+        result = await _drop_partitions(db)
+    else:
+        result = await _delete_month_ranges(db)
+    await db.commit()
+    return result
+
+
+async def _drop_partitions(db) -> Tuple[int, List[str]]:
+    """Удалить секции прошедших месяцев целиком (PostgreSQL)"""
+    current = _current_month()
+    deleted = 0
+    orphaned: List[str] = []
+    for partition in await _list_partitions(db, "posts"):
+        month = _parse_partition_name("posts", partition)
+        if month is None or month >= current:
+            continue
+
+        # Ссылки на изображения и записи модерации живут вне секций
+        result = await db.execute(text(f"SELECT id, image_id FROM {partition}"))
+        rows = result.all()
+        orphaned += await MediaFileRepository.release(
+            db, [row.image_id for row in rows if row.image_id]
+        )
+        await db.execute(
+            text(f"DELETE FROM moderation_records WHERE post_id IN (SELECT id FROM {partition})")
+        )
+        for name in reversed(PARTITIONED_TABLES):
+            await db.execute(text(f"DROP TABLE IF EXISTS {_partition_name(name, *month)}"))
+        deleted += len(rows)
+        logfire.info(f"🧹 Удалена секция {partition}: {len(rows)} постов")
+
+    await ensure_partitions(db)
+    return deleted, orphaned
+
+
+async def _delete_month_ranges(db) -> Tuple[int, List[str]]:
+    """Удалить посты прошедших месяцев диапазонными DELETE (SQLite и обычные таблицы)"""
+    month_start = _month_start(*_current_month())
+    expired = and_(Post.event_at.is_not(None), Post.event_at < month_start)
+
+    await db.execute(
+        ModerationRecord.__table__.delete().where(
+            ModerationRecord.post_id.in_(select(Post.id).where(expired))
+        )
+    )
+    # Лайки и связи с категориями - по собственной копии event_at, без соединения с posts
+    await db.execute(Like.__table__.delete().where(Like.event_at < month_start))
+    await db.execute(post_categories.delete().where(post_categories.c.event_at < month_start))
+    result = await db.execute(
+        Post.__table__.delete().where(expired).returning(Post.image_id)
+    )
+    image_ids = list(result.scalars().all())
+    orphaned = await MediaFileRepository.release(db, [image_id for image_id in image_ids if image_id])
+    return len(image_ids), orphaned
+
+
+async def add_event_at_columns(conn) -> None:
+    """
+    Добавить денормализованный event_at в likes и post_categories в уже
+    существующей базе и заполнить его из posts.
+    """
+    def missing_tables(sync_conn):
+        inspector = inspect(sync_conn)
+        return [
+            name
+            for name in ("likes", "post_categories")
+            if "event_at" not in {column["name"] for column in inspector.get_columns(name)}
+        ]
+
+    column_type = DateTime().compile(dialect=conn.dialect)
+    for name in await conn.run_sync(missing_tables):
+        table = Base.metadata.tables[name]
+        await conn.execute(text(f"ALTER TABLE {name} ADD COLUMN event_at {column_type}"))
+        await conn.execute(
+            update(table)
+            .where(table.c.event_at.is_(None))
+            .values(
+                event_at=select(Post.event_at)
+                .where(Post.id == table.c.post_id)
+                .scalar_subquery()
+            )
+        )
+        for index in table.indexes:
+            await conn.execute(CreateIndex(index, if_not_exists=True))
+        logfire.info(f"Добавлена колонка {name}.event_at")
@@ -0,0 +1,110 @@
+"""
+Маршрутизация читающих запросов на реплики.
+
+Реплики задаются переменной DATABASE_REPLICA_URLS (через запятую). Запросы,
+помеченные .execution_options(use_replica=True), уходят на реплику; все
+остальное, включая записи, идет на основную БД. Чтобы пользователь сразу видел
+свои изменения, после его записи чтения в течение DB_REPLICA_RYW_SECONDS
+выполняются на основной БД.
+"""
+
+import itertools
+import os
+import time
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+# Опция выполнения, которой репозитории помечают запросы, допускающие реплику
+REPLICA_OPTION = "use_replica"
+
+# Ключи Session.info
+USER_ID_KEY = "user_id"
+WROTE_KEY = "wrote"
+
+# Сколько пользователей помнить в окне read-your-writes до принудительной очистки
+RECENT_WRITERS_LIMIT = 10000
+
+_replica_engines: List = []
+_replica_cycle = None
+_recent_writes: Dict[int, float] = {}
+
+
+def _ryw_window() -> float:
+    return float(os.getenv("DB_REPLICA_RYW_SECONDS", "5"))
+
+
+def get_replica_urls() -> List[str]:
+    """URL реплик из DATABASE_REPLICA_URLS"""
+    return [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+def configure_replicas(engines: List) -> None:
+    """Задать движки реплик (пустой список - все запросы на основную БД)"""
+    global _replica_engines, _replica_cycle
+    _replica_engines = list(engines)
+    _replica_cycle = itertools.cycle(_replica_engines) if _replica_engines else None
+
+
+def has_replicas() -> bool:
+    return bool(_replica_engines)
+
+
+def mark_user_write(user_id: Optional[int]) -> None:
+    """Запомнить момент записи пользователя (начало окна read-your-writes)"""
+    if user_id is None:
+        return
+    now = time.monotonic()
+    if len(_recent_writes) >= RECENT_WRITERS_LIMIT:
+        window = _ryw_window()
+        for stale in [uid for uid, at in _recent_writes.items() if now - at > window]:
+            del _recent_writes[stale]
+    _recent_writes[user_id] = now
+
+
+def wrote_recently(user_id: Optional[int]) -> bool:
+    """Писал ли пользователь в пределах окна read-your-writes"""
+    if user_id is None:
+        return False
+    written_at = _recent_writes.get(user_id)
+    if written_at is None:
+        return False
+    if time.monotonic() - written_at > _ryw_window():
+        _recent_writes.pop(user_id, None)
+        return False
+    return True
+
+
+class RoutingSession(Session):
+    """Сессия, отправляющая помеченные читающие запросы на реплики"""
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _route_execute(orm_execute_state) -> None:
+    session = orm_execute_state.session
+    if not orm_execute_state.is_select:
+        # Запись Core-запросом (update/delete/insert) - flush ее не увидит
+        session.info[WROTE_KEY] = True
+        return
+    if _replica_cycle is None or not orm_execute_state.execution_options.get(REPLICA_OPTION):
+        return
+    if session.info.get(WROTE_KEY) or wrote_recently(session.info.get(USER_ID_KEY)):
+        return
+    orm_execute_state.bind_arguments["bind"] = next(_replica_cycle).sync_engine
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _track_flush(session, flush_context) -> None:
+    session.info[WROTE_KEY] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _track_commit(session) -> None:
+    if session.info.pop(WROTE_KEY, False):
+        mark_user_write(session.info.get(USER_ID_KEY))
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _track_rollback(session) -> None:
+    session.info.pop(WROTE_KEY, None)
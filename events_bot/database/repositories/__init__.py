@@ -3,6 +3,9 @@ from .category_repository import CategoryRepository
 from .post_repository import PostRepository
 from .moderation_repository import ModerationRepository
 from .like_repository import LikeRepository
+from .media_file_repository import MediaFileRepository
+from .lease_repository import LeaseRepository
+from .fsm_repository import FSMRepository
 
 __all__ = [
     "UserRepository",
@@ -10,4 +13,7 @@ __all__ = [
     "PostRepository",
     "ModerationRepository",
     "LikeRepository",
+    "MediaFileRepository",
+    "LeaseRepository",
+    "FSMRepository",
 ]
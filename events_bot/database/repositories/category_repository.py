@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
 from ..models import Category
+from ..write_queue import write_operation
 
 
 class CategoryRepository:
@@ -18,6 +19,7 @@ class CategoryRepository:
         return result.scalar_one_or_none()
 
     @staticmethod
+    @write_operation
     async def create_category(
         db: AsyncSession, name: str, description: str = None
     ) -> Category:
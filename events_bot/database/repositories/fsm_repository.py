@@ -0,0 +1,71 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, delete, case, null
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from ..models import FSMRecord
+from ..dialects import get_upsert_insert
+from ..write_queue import write_operation
+
+
+class FSMRepository:
+    """Репозиторий состояний FSM"""
+
+    @staticmethod
+    def _utcnow() -> datetime:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    @staticmethod
+    async def get(db: AsyncSession, key: str) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """Состояние и данные (JSON) по ключу; None, если записи нет или она истекла"""
+        result = await db.execute(
+            select(FSMRecord.state, FSMRecord.data).where(
+                FSMRecord.key == key,
+                FSMRecord.expires_at > FSMRepository._utcnow(),
+            )
+        )
+        row = result.first()
+        return tuple(row) if row is not None else None
+
+    @staticmethod
+    @write_operation
+    async def save(db: AsyncSession, key: str, expires_at: datetime, **values) -> None:
+        """
+        Записать переданные поля (state и/или data) одним upsert.
+
+        Поля, которые не переданы, у существующей записи не меняются,
+        а у истекшей сбрасываются: иначе set_state после брошенного
+        черновика вернул бы его старые данные.
+        """
+        values["expires_at"] = expires_at
+        now = FSMRepository._utcnow()
+        updates = dict(values)
+        for column in (FSMRecord.state, FSMRecord.data):
+            if column.key not in updates:
+                updates[column.key] = case((FSMRecord.expires_at <= now, null()), else_=column)
+        upsert_insert = get_upsert_insert(db)
+        if upsert_insert is not None:
+            stmt = upsert_insert(FSMRecord).values(key=key, **values)
+            await db.execute(stmt.on_conflict_do_update(index_elements=[FSMRecord.key], set_=updates))
+        else:
+            result = await db.execute(
+                update(FSMRecord).where(FSMRecord.key == key).values(**updates)
+            )
+            if not result.rowcount:
+                await db.execute(insert(FSMRecord).values(key=key, **values))
+        await db.commit()
+
+    @staticmethod
+    @write_operation
+    async def delete(db: AsyncSession, key: str) -> None:
+        await db.execute(delete(FSMRecord).where(FSMRecord.key == key))
+        await db.commit()
+
+    @staticmethod
+    @write_operation
+    async def delete_expired(db: AsyncSession) -> int:
+        """Удалить брошенные состояния, вернуть их количество"""
+        result = await db.execute(
+            delete(FSMRecord).where(FSMRecord.expires_at <= FSMRepository._utcnow())
+        )
+        await db.commit()
+        return result.rowcount
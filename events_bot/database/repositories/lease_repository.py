@@ -0,0 +1,72 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update, insert, or_, and_
+from sqlalchemy.exc import IntegrityError
+from ..models import Lease
+from ..dialects import get_upsert_insert, db_utcnow
+from ..write_queue import write_operation
+
+
+class LeaseRepository:
+    """Репозиторий аренды для выбора лидера фоновых задач"""
+
+    @staticmethod
+    @write_operation
+    async def try_acquire(db: AsyncSession, name: str, holder: str, ttl: float) -> bool:
+        """
+        Взять или продлить аренду.
+
+        Аренда достается holder, если она уже его или истекла. Решение принимает
+        одно условное UPDATE/INSERT, поэтому из конкурирующих экземпляров
+        выигрывает ровно один. Время берется по часам БД, а не экземпляра.
+
+        Returns:
+            bool: True, если holder владеет арендой до now + ttl
+        """
+        now = db_utcnow(db)
+        expires_at = db_utcnow(db, ttl)
+
+        result = await db.execute(
+            update(Lease)
+            .where(
+                and_(
+                    Lease.name == name,
+                    or_(Lease.holder == holder, Lease.expires_at < now),
+                )
+            )
+            .values(holder=holder, expires_at=expires_at)
+        )
+        if result.rowcount:
+            await db.commit()
+            return True
+
+        # Записи еще нет - пробуем создать ее первыми
+        upsert_insert = get_upsert_insert(db)
+        if upsert_insert is not None:
+            result = await db.execute(
+                upsert_insert(Lease)
+                .values(name=name, holder=holder, expires_at=expires_at)
+                .on_conflict_do_nothing(index_elements=[Lease.name])
+            )
+            await db.commit()
+            return bool(result.rowcount)
+
+        try:
+            await db.execute(
+                insert(Lease).values(name=name, holder=holder, expires_at=expires_at)
+            )
+            await db.commit()
+            return True
+        except IntegrityError:
+            await db.rollback()
+            return False
+
+    @staticmethod
+    @write_operation
+    async def release(db: AsyncSession, name: str, holder: str) -> None:
+        """Освободить аренду, чтобы другой экземпляр забрал ее без ожидания TTL"""
+        await db.execute(
+            update(Lease)
+            .where(and_(Lease.name == name, Lease.holder == holder))
+            .values(expires_at=db_utcnow(db))
+        )
+        await db.commit()
@@ -1,13 +1,21 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, delete
+from sqlalchemy import select, and_, delete, bindparam
 from typing import List, Optional
 from ..models import Like, User, Post
+from ..write_queue import write_operation
+
+
+# Проверка лайка выполняется на каждый показ поста - запрос собирается один раз
+_USER_LIKE_STMT = select(Like).where(
+    and_(Like.user_id == bindparam("user_id"), Like.post_id == bindparam("post_id"))
+)
 
 
 class LikeRepository:
     """Репозиторий для работы с лайками"""
 
     @staticmethod
+    @write_operation
     async def add_like(db: AsyncSession, user_id: int, post_id: int) -> Like:
         """Добавить лайк пользователя на пост"""
         # Проверяем, есть ли уже лайк от этого пользователя на этот пост
@@ -18,13 +26,19 @@ class LikeRepository:
             return existing_like
         else:
             # Если лайка нет, создаём новый
-            like = Like(user_id=user_id, post_id=post_id)
+            like = Like(
+                user_id=user_id,
+                post_id=post_id,
+                # Копия даты события поста (ключ секционирования)
+                event_at=select(Post.event_at).where(Post.id == post_id).scalar_subquery(),
+            )
             db.add(like)
             await db.commit()
             await db.refresh(like)
             return like
 
     @staticmethod
+    @write_operation
     async def remove_like(db: AsyncSession, user_id: int, post_id: int) -> bool:
         """Удалить лайк пользователя на пост"""
         stmt = delete(Like).where(
@@ -39,10 +53,7 @@ class LikeRepository:
         db: AsyncSession, user_id: int, post_id: int
     ) -> Optional[Like]:
         """Получить лайк пользователя на конкретный пост"""
-        stmt = select(Like).where(
-            and_(Like.user_id == user_id, Like.post_id == post_id)
-        )
-        result = await db.execute(stmt)
+        result = await db.execute(_USER_LIKE_STMT, {"user_id": user_id, "post_id": post_id})
         return result.scalar_one_or_none()
 
     @staticmethod
@@ -55,7 +66,7 @@ class LikeRepository:
     @staticmethod
     async def get_post_likes_count(db: AsyncSession, post_id: int) -> int:
         """Получить количество лайков на пост"""
-        stmt = select(Like).where(Like.post_id == post_id)
+        stmt = select(Like).where(Like.post_id == post_id).execution_options(use_replica=True)
         result = await db.execute(stmt)
         return len(result.scalars().all())
 
@@ -67,6 +78,7 @@ class LikeRepository:
         return result.scalars().all()
 
     @staticmethod
+    @write_operation
     async def toggle_like(db: AsyncSession, user_id: int, post_id: int) -> dict:
         """Переключить лайк пользователя на пост"""
         existing_like = await LikeRepository.get_user_like(db, user_id, post_id)
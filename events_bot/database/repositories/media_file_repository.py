@@ -0,0 +1,103 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, insert, func
+from collections import Counter
+from typing import List, Optional
+from ..models import MediaFile, Post
+from ..dialects import get_upsert_insert
+from ..write_queue import write_operation
+
+
+class MediaFileRepository:
+    """Репозиторий для учета ссылок на файлы хранилища"""
+
+    @staticmethod
+    async def acquire(db: AsyncSession, file_id: str) -> None:
+        """Увеличить счетчик ссылок на файл (в транзакции вызывающего, без commit)"""
+        upsert_insert = get_upsert_insert(db)
+        if upsert_insert is not None:
+            stmt = upsert_insert(MediaFile).values(id=file_id, ref_count=1)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[MediaFile.id],
+                set_={"ref_count": MediaFile.ref_count + 1, "updated_at": func.now()},
+            )
+            await db.execute(stmt)
+            return
+
+        result = await db.execute(
+            update(MediaFile)
+            .where(MediaFile.id == file_id)
+            .values(ref_count=MediaFile.ref_count + 1)
+        )
+        if not result.rowcount:
+            await db.execute(insert(MediaFile).values(id=file_id, ref_count=1))
+
+    @staticmethod
+    async def release(db: AsyncSession, file_ids: List[str]) -> List[str]:
+        """
+        Уменьшить счетчики ссылок (в транзакции вызывающего, без commit).
+
+        Returns:
+            List[str]: Id файлов, на которые больше никто не ссылается - их можно удалять
+        """
+        counts = Counter(file_id for file_id in file_ids if file_id)
+        if not counts:
+            return []
+
+        for file_id, count in counts.items():
+            await db.execute(
+                update(MediaFile)
+                .where(MediaFile.id == file_id)
+                .values(ref_count=MediaFile.ref_count - count)
+            )
+
+        result = await db.execute(
+            select(MediaFile.id, MediaFile.ref_count).where(MediaFile.id.in_(counts))
+        )
+        remaining = {row.id: row.ref_count for row in result}
+        # Файлы без записи загружены до появления учета ссылок - удаляем как раньше
+        orphaned = [
+            file_id for file_id in counts if remaining.get(file_id, 0) <= 0
+        ]
+        if orphaned:
+            await db.execute(delete(MediaFile).where(MediaFile.id.in_(orphaned)))
+        return orphaned
+
+    @staticmethod
+    async def filter_unreferenced(db: AsyncSession, file_ids: List[str]) -> List[str]:
+        """
+        Оставить только файлы, на которые по-прежнему никто не ссылается.
+
+        Между release и удалением файла из хранилища та же картинка могла быть
+        загружена снова: ContentAddressedStorage не сохраняет ее повторно,
+        а новый пост получает ссылку на старый файл.
+        """
+        if not file_ids:
+            return []
+        result = await db.execute(
+            select(MediaFile.id).where(MediaFile.id.in_(file_ids), MediaFile.ref_count > 0)
+        )
+        referenced = set(result.scalars())
+        result = await db.execute(select(Post.image_id).where(Post.image_id.in_(file_ids)))
+        referenced.update(result.scalars())
+        return [file_id for file_id in file_ids if file_id not in referenced]
+
+    @staticmethod
+    async def get_telegram_file_id(db: AsyncSession, file_id: str) -> Optional[str]:
+        """Получить сохраненный file_id Telegram для файла"""
+        result = await db.execute(
+            select(MediaFile.telegram_file_id).where(MediaFile.id == file_id)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    @write_operation
+    async def set_telegram_file_id(
+        db: AsyncSession, file_id: str, telegram_file_id: str
+    ) -> None:
+        """Сохранить file_id Telegram для файла"""
+        await db.execute(
+            update(MediaFile)
+            .where(MediaFile.id == file_id)
+            .values(telegram_file_id=telegram_file_id)
+        )
+        await db.commit()
@@ -1,16 +1,82 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, insert, or_
+from sqlalchemy import select, and_, func, insert, or_, bindparam, literal_column
 from sqlalchemy.orm import selectinload
+from collections import defaultdict
 from typing import List, Optional
 from datetime import datetime
 from ..models import Post, ModerationRecord, ModerationAction, Category, post_categories
-from ..models import User
+from ..models import User, user_categories
+from ..views import PostView
+from ..write_queue import write_operation
+from .media_file_repository import MediaFileRepository
+
+
+# Горячие запросы ленты собираются один раз: при выполнении меняются только
+# параметры, а скомпилированный SQL берется из кэша движка по готовому ключу
+_USER_CATEGORY_IDS_STMT = (
+    select(user_categories.c.category_id)
+    .where(user_categories.c.user_id == bindparam("user_id"))
+    .execution_options(use_replica=True)
+)
+
+_FEED_CONDITION = and_(
+    Post.categories.any(Category.id.in_(bindparam("category_ids", expanding=True))),
+    Post.is_approved == True,
+    Post.is_published == True,
+    or_(Post.event_at.is_(None), Post.event_at > func.now()),
+)
+
+# Колонки PostView: поля поста и имя автора одной строкой, без ORM-объектов
+_POST_VIEW_SELECT = select(
+    Post.id,
+    Post.title,
+    Post.content,
+    Post.city,
+    Post.event_at,
+    Post.image_id,
+    Post.is_approved,
+    Post.created_at,
+    User.first_name,
+    User.username,
+).join(User, User.id == Post.author_id)
+
+_POST_CATEGORY_NAMES_STMT = (
+    select(post_categories.c.post_id, Category.name)
+    .join(Category, Category.id == post_categories.c.category_id)
+    .where(post_categories.c.post_id.in_(bindparam("post_ids", expanding=True)))
+    .order_by(Category.id)
+    .execution_options(use_replica=True)
+)
+
+# Название категории для RETURNING вставки в post_categories. SQLAlchemy не
+# коррелирует подзапрос с целевой таблицей INSERT, поэтому он задан SQL-текстом
+_CATEGORY_NAME_BY_LINK = literal_column(
+    "(SELECT categories.name FROM categories "
+    "WHERE categories.id = post_categories.category_id)"
+)
+
+# Пост попадает в ленту один раз, даже если совпало несколько категорий
+_FEED_POSTS_STMT = (
+    _POST_VIEW_SELECT
+    .where(_FEED_CONDITION)
+    .order_by(Post.published_at.desc())
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+    .execution_options(use_replica=True)
+)
+
+_FEED_POSTS_COUNT_STMT = (
+    select(func.count(Post.id))
+    .where(_FEED_CONDITION)
+    .execution_options(use_replica=True)
+)
 
 
 class PostRepository:
     """Асинхронный репозиторий для работы с постами"""
 
     @staticmethod
+    @write_operation
     async def create_post(
         db: AsyncSession,
         title: str,
@@ -20,38 +86,89 @@ class PostRepository:
         city: str | None = None,
         image_id: str | None = None,
         event_at: datetime | None = None,
-    ) -> Post:
+    ) -> PostView:
+        """
+        Создать пост с категориями в одной транзакции.
+
+        Имя автора и названия категорий возвращаются через RETURNING вместе
+        со вставкой, поэтому данные для модерации не требуют refresh.
+        """
         # Создаем пост
-        post = Post(
+        result = await db.execute(
+            insert(Post)
+            .values(
+                title=title,
+                content=content,
+                author_id=author_id,
+                city=city,
+                image_id=image_id,
+                event_at=event_at,
+            )
+            .returning(
+                Post.id,
+                Post.is_approved,
+                Post.created_at,
+                select(func.coalesce(User.first_name, User.username))
+                .where(User.id == author_id)
+                .scalar_subquery()
+                .label("author_name"),
+            )
+        )
+        post_row = result.one()
+
+        # Добавляем категории к посту
+        category_names = ()
+        if category_ids:
+            result = await db.execute(
+                insert(post_categories)
+                .values(
+                    [
+                        {'post_id': post_row.id, 'category_id': category, 'event_at': event_at}
+                        for category in category_ids
+                    ]
+                )
+                .returning(_CATEGORY_NAME_BY_LINK)
+            )
+            category_names = tuple(name for name in result.scalars() if name is not None)
+        # Учитываем ссылку поста на файл изображения
+        if image_id:
+            await MediaFileRepository.acquire(db, image_id)
+        await db.commit()
+
+        return PostView(
+            id=post_row.id,
             title=title,
             content=content,
-            author_id=author_id,
             city=city,
-            image_id=image_id,
             event_at=event_at,
+            image_id=image_id,
+            is_approved=post_row.is_approved,
+            created_at=post_row.created_at,
+            author_name=post_row.author_name or "Аноним",
+            category_names=category_names,
         )
-        db.add(post)
-        await db.commit()
-        
-        # Добавляем категории к посту в отдельной транзакции
-        await db.execute(
-            insert(post_categories).values(
-                [{'post_id': post.id, 'category_id': category} for category in category_ids]
-            )
+
+    @staticmethod
+    async def _to_post_views(db: AsyncSession, rows) -> List[PostView]:
+        """Собрать PostView из строк _POST_VIEW_SELECT, догрузив названия категорий одним запросом"""
+        if not rows:
+            return []
+        category_names = defaultdict(list)
+        result = await db.execute(
+            _POST_CATEGORY_NAMES_STMT, {"post_ids": [row.id for row in rows]}
         )
-        await db.commit()
-        await db.refresh(post)
-        
-        return post
+        for post_id, name in result:
+            category_names[post_id].append(name)
+        return [PostView.from_row(row, tuple(category_names[row.id])) for row in rows]
 
     @staticmethod
-    async def get_pending_moderation(db: AsyncSession) -> List[Post]:
+    async def get_pending_moderation(db: AsyncSession) -> List[PostView]:
         result = await db.execute(
-            select(Post)
+            _POST_VIEW_SELECT
             .where(and_(Post.is_approved == False, Post.is_published == False))
-            .options(selectinload(Post.author), selectinload(Post.categories))
+            .execution_options(use_replica=True)
         )
-        return result.scalars().all()
+        return await PostRepository._to_post_views(db, result.all())
 
     @staticmethod
     async def get_approved_posts(db: AsyncSession) -> List[Post]:
@@ -87,6 +204,7 @@ class PostRepository:
         return result.scalars().all()
 
     @staticmethod
+    @write_operation
     async def approve_post(
         db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
     ) -> Post:
@@ -108,6 +226,7 @@ class PostRepository:
         return post
 
     @staticmethod
+    @write_operation
     async def reject_post(
         db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
     ) -> Post:
@@ -128,6 +247,7 @@ class PostRepository:
         return post
 
     @staticmethod
+    @write_operation
     async def request_changes(
         db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
     ) -> Post:
@@ -146,13 +266,16 @@ class PostRepository:
         return post
 
     @staticmethod
-    async def get_user_posts(db: AsyncSession, user_id: int) -> List[Post]:
-        result = await db.execute(
-            select(Post)
-            .where(Post.author_id == user_id)
-            .options(selectinload(Post.categories))
-        )
-        return result.scalars().all()
+    async def get_user_posts(db: AsyncSession, user_id: int) -> List[PostView]:
+        result = await db.execute(_POST_VIEW_SELECT.where(Post.author_id == user_id))
+        return await PostRepository._to_post_views(db, result.all())
+
+    @staticmethod
+    async def get_post_view(db: AsyncSession, post_id: int) -> Optional[PostView]:
+        """Пост для карточки в ленте или избранном"""
+        result = await db.execute(_POST_VIEW_SELECT.where(Post.id == post_id))
+        views = await PostRepository._to_post_views(db, result.all())
+        return views[0] if views else None
 
     @staticmethod
     async def get_post_by_id(db: AsyncSession, post_id: int) -> Optional[Post]:
@@ -164,6 +287,7 @@ class PostRepository:
         return result.scalar_one_or_none()
 
     @staticmethod
+    @write_operation
     async def publish_post(db: AsyncSession, post_id: int) -> Post:
         result = await db.execute(select(Post).where(Post.id == post_id))
         post = result.scalar_one_or_none()
@@ -177,77 +301,41 @@ class PostRepository:
     @staticmethod
     async def get_feed_posts(
         db: AsyncSession, user_id: int, limit: int = 10, offset: int = 0
-    ) -> List[Post]:
+    ) -> List[PostView]:
         """Получить посты для ленты пользователя (по его категориям, исключая его посты)"""
         # Получаем категории пользователя
-        user_categories_result = await db.execute(
-            select(User)
-            .where(User.id == user_id)
-            .options(selectinload(User.categories))
-        )
-        user = user_categories_result.scalar_one_or_none()
-        if not user or not user.categories:
+        result = await db.execute(_USER_CATEGORY_IDS_STMT, {"user_id": user_id})
+        category_ids = list(result.scalars().all())
+        if not category_ids:
             return []
         
-        category_ids = [cat.id for cat in user.categories]
-        
         # Получаем посты по категориям пользователя, исключая его собственные
-        now_utc = func.now()
         result = await db.execute(
-            select(Post)
-            .join(Post.categories)
-            .where(
-                and_(
-                    Post.categories.any(Category.id.in_(category_ids)),
-                    Post.is_approved == True,
-                    Post.is_published == True,
-                    or_(Post.event_at.is_(None), Post.event_at > now_utc),
-                )
-            )
-            .options(selectinload(Post.author), selectinload(Post.categories))
-            .order_by(Post.published_at.desc())
-            .limit(limit)
-            .offset(offset)
+            _FEED_POSTS_STMT,
+            {"category_ids": category_ids, "limit": limit, "offset": offset},
         )
-        return result.scalars().all()
+        return await PostRepository._to_post_views(db, result.all())
 
     @staticmethod
     async def get_feed_posts_count(db: AsyncSession, user_id: int) -> int:
         """Получить общее количество постов для ленты пользователя"""
         # Получаем категории пользователя
-        user_categories_result = await db.execute(
-            select(User)
-            .where(User.id == user_id)
-            .options(selectinload(User.categories))
-        )
-        user = user_categories_result.scalar_one_or_none()
-        if not user or not user.categories:
+        result = await db.execute(_USER_CATEGORY_IDS_STMT, {"user_id": user_id})
+        category_ids = list(result.scalars().all())
+        if not category_ids:
             return 0
         
-        category_ids = [cat.id for cat in user.categories]
-        
         # Подсчитываем количество постов
-        result = await db.execute(
-            select(func.count(Post.id))
-            .join(Post.categories)
-            .where(
-                and_(
-                    Post.categories.any(Category.id.in_(category_ids)),
-                    Post.is_approved == True,
-                    Post.is_published == True,
-                    or_(Post.event_at.is_(None), Post.event_at > func.now()),
-                )
-            )
-        )
+        result = await db.execute(_FEED_POSTS_COUNT_STMT, {"category_ids": category_ids})
         return result.scalar() or 0
 
     @staticmethod
     async def get_liked_posts(
         db: AsyncSession, user_id: int, limit: int = 10, offset: int = 0
-    ) -> List[Post]:
+    ) -> List[PostView]:
         from ..models import Like
         result = await db.execute(
-            select(Post)
+            _POST_VIEW_SELECT
             .join(Like, Like.post_id == Post.id)
             .where(
                 and_(
@@ -257,12 +345,12 @@ class PostRepository:
                     or_(Post.event_at.is_(None), Post.event_at > func.now()),
                 )
             )
-            .options(selectinload(Post.author), selectinload(Post.categories))
             .order_by(Post.published_at.desc())
             .limit(limit)
             .offset(offset)
+            .execution_options(use_replica=True)
         )
-        return result.scalars().all()
+        return await PostRepository._to_post_views(db, result.all())
 
     @staticmethod
     async def get_liked_posts_count(db: AsyncSession, user_id: int) -> int:
@@ -278,20 +366,37 @@ class PostRepository:
                     or_(Post.event_at.is_(None), Post.event_at > func.now()),
                 )
             )
+            .execution_options(use_replica=True)
         )
         return result.scalar() or 0
 
     @staticmethod
-    async def delete_expired_posts(db: AsyncSession) -> int:
-        """Удалить посты, у которых наступило event_at, вместе со связями"""
+    @write_operation
+    async def delete_expired_posts_chunk(db: AsyncSession, limit: int) -> tuple[int, list[str]]:
+        """
+        Удалить пачку постов, у которых наступило event_at, вместе со связями.
+
+        Все в одной транзакции: image_id берутся из того же DELETE ... RETURNING,
+        которым удаляются посты, и сразу снимаются ссылки на изображения.
+
+        Returns:
+            tuple[int, list[str]]: Количество удаленных постов и id изображений,
+                на которые больше никто не ссылается
+        """
         from ..models import Like, ModerationRecord
-        # Ищем просроченные посты
-        expired_posts = await db.execute(
-            select(Post.id).where(Post.event_at.is_not(None), Post.event_at <= func.now())
+        expired = and_(Post.event_at.is_not(None), Post.event_at <= func.now())
+        # Ограниченная пачка; на PostgreSQL параллельные очистки не ждут друг друга
+        result = await db.execute(
+            select(Post.id)
+            .where(expired)
+            .order_by(Post.event_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
         )
-        post_ids = [pid for pid in expired_posts.scalars().all()]
+        post_ids = list(result.scalars().all())
         if not post_ids:
-            return 0
+            await db.commit()
+            return 0, []
         # Удаляем связанные лайки
         await db.execute(
             Like.__table__.delete().where(Like.post_id.in_(post_ids))
@@ -304,20 +409,23 @@ class PostRepository:
         await db.execute(
             post_categories.delete().where(post_categories.c.post_id.in_(post_ids))
         )
-        # Удаляем сами посты
+        # Удаляем сами посты, получая image_id удаленных строк тем же запросом
         result = await db.execute(
-            Post.__table__.delete().where(Post.id.in_(post_ids))
+            Post.__table__.delete()
+            .where(Post.id.in_(post_ids))
+            .returning(Post.id, Post.image_id)
+        )
+        deleted = result.all()
+        orphaned = await MediaFileRepository.release(
+            db, [row.image_id for row in deleted if row.image_id]
         )
         await db.commit()
-        return result.rowcount or 0
+        return len(deleted), orphaned
 
     @staticmethod
-    async def get_expired_posts_info(db: AsyncSession) -> list[dict]:
-        """Вернуть информацию о просроченных постах (id, image_id)"""
+    async def get_post_deadlines(db: AsyncSession) -> list[tuple[int, datetime]]:
+        """Вернуть (id, event_at) всех постов с датой события"""
         result = await db.execute(
-            select(Post.id, Post.image_id).where(
-                and_(Post.event_at.is_not(None), Post.event_at <= func.now())
-            )
+            select(Post.id, Post.event_at).where(Post.event_at.is_not(None))
         )
-        rows = result.all()
-        return [{"id": row[0], "image_id": row[1]} for row in rows]
+        return [(row[0], row[1]) for row in result.all()]
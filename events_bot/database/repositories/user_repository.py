@@ -1,8 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, delete, insert
+from sqlalchemy import select, and_, delete, insert, update, bindparam, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from ..models import User, Category, user_categories
+from ..dialects import get_upsert_insert
+from ..write_queue import write_operation
+
+
+# Пользователь загружается почти в каждом обработчике - запрос собирается один раз
+_USER_BY_ID_STMT = select(User).where(User.id == bindparam("telegram_id"))
 
 
 class UserRepository:
@@ -10,10 +17,11 @@ class UserRepository:
 
     @staticmethod
     async def get_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optional[User]:
-        result = await db.execute(select(User).where(User.id == telegram_id))
+        result = await db.execute(_USER_BY_ID_STMT, {"telegram_id": telegram_id})
         return result.scalar_one_or_none()
 
     @staticmethod
+    @write_operation
     async def create_user(
         db: AsyncSession,
         telegram_id: int,
@@ -48,6 +56,65 @@ class UserRepository:
         return user
 
     @staticmethod
+    @write_operation
+    async def upsert_user(
+        db: AsyncSession,
+        telegram_id: int,
+        username: str = None,
+        first_name: str = None,
+        last_name: str = None,
+    ) -> User:
+        """
+        Создать пользователя или обновить его имя одним запросом (INSERT ... ON CONFLICT).
+
+        Параллельные обновления от нового пользователя не приводят к нарушению
+        первичного ключа.
+        """
+        profile = {"username": username, "first_name": first_name, "last_name": last_name}
+        upsert_insert = get_upsert_insert(db)
+        if upsert_insert is None:
+            return await UserRepository._get_or_create_with_profile(db, telegram_id, profile)
+
+        stmt = (
+            upsert_insert(User)
+            .values(id=telegram_id, **profile)
+            # onupdate колонок в ON CONFLICT не применяется - updated_at задаем явно
+            .on_conflict_do_update(
+                index_elements=[User.id], set_={**profile, "updated_at": func.now()}
+            )
+            .returning(User)
+        )
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        user = result.scalar_one()
+        await db.commit()
+        return user
+
+    @staticmethod
+    async def _get_or_create_with_profile(db: AsyncSession, telegram_id: int, profile: dict) -> User:
+        """Запасной путь для диалектов без ON CONFLICT"""
+        user = await UserRepository.get_by_telegram_id(db, telegram_id)
+        if user is None:
+            try:
+                return await UserRepository.create_user(db, telegram_id, **profile)
+            except IntegrityError:
+                # Пользователя успел создать параллельный запрос
+                await db.rollback()
+                user = await UserRepository.get_by_telegram_id(db, telegram_id)
+        for field, value in profile.items():
+            if getattr(user, field) != value:
+                setattr(user, field, value)
+        await db.commit()
+        return user
+
+    @staticmethod
+    @write_operation
+    async def set_user_city(db: AsyncSession, user_id: int, city: str) -> None:
+        """Сохранить город пользователя"""
+        await db.execute(update(User).where(User.id == user_id).values(city=city))
+        await db.commit()
+
+    @staticmethod
+    @write_operation
     async def add_categories_to_user(
         db: AsyncSession, user_id: int, category_ids: List[int]
     ) -> User:
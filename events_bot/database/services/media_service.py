@@ -0,0 +1,32 @@
+from typing import Optional, Union
+from aiogram.types import InputFile, Message
+from events_bot.storage import file_storage
+from ..repositories import MediaFileRepository
+
+
+class MediaService:
+    """Сервис изображений постов с переиспользованием file_id Telegram"""
+
+    @staticmethod
+    async def get_photo(db, image_id: str) -> Optional[Union[str, InputFile]]:
+        """
+        Получить фото для отправки в Telegram.
+
+        Если файл уже отправлялся, возвращается его file_id Telegram (без повторной
+        выгрузки), иначе - файл из хранилища. None, если файл не найден.
+        """
+        if db is not None:
+            telegram_file_id = await MediaFileRepository.get_telegram_file_id(db, image_id)
+            if telegram_file_id:
+                return telegram_file_id
+        media_photo = await file_storage.get_media_photo(image_id)
+        return media_photo.media if media_photo else None
+
+    @staticmethod
+    async def remember_sent_photo(db, image_id: str, message) -> Optional[str]:
+        """Запомнить file_id Telegram из отправленного сообщения, вернуть его"""
+        if db is None or not isinstance(message, Message) or not message.photo:
+            return None
+        telegram_file_id = message.photo[-1].file_id
+        await MediaFileRepository.set_telegram_file_id(db, image_id, telegram_file_id)
+        return telegram_file_id
@@ -1,6 +1,7 @@
 from typing import List
 import logfire
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from events_bot.bot.callbacks import LikeCallback
 from ..repositories import UserRepository
 from ..models import User, Post
 
@@ -62,7 +63,7 @@ class NotificationService:
         button_text = "❤️ В избранном" if liked else "🤍 Добавить в избранное"
         keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
-                [InlineKeyboardButton(text=button_text, callback_data=f"like_post_{post_id}")]
+                [InlineKeyboardButton(text=button_text, callback_data=LikeCallback(post_id=post_id).pack())]
             ]
         )
         return keyboard
@@ -1,14 +1,20 @@
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, timezone
-from ..repositories import PostRepository
+from ..repositories import PostRepository, MediaFileRepository
 from ..models import Post
+from ..views import PostView
+from ..partitioning import is_partitioning_enabled, drop_expired_partitions
+from ..connection import release_connection
 import os
 import logfire
 from events_bot.bot.keyboards.moderation_keyboard import get_moderation_keyboard
 from events_bot.storage import file_storage
+from events_bot.tasks import expiry_scheduler
 from aiogram.types import FSInputFile, InputMediaPhoto
 from .moderation_service import ModerationService
+from .media_service import MediaService
 
 
 class PostService:
@@ -24,7 +30,7 @@ class PostService:
         city: str | None = None,
         image_id: str | None = None,
         event_at: str | None = None,
-    ) -> Post:
+    ) -> PostView:
         """Создать новый пост"""
         parsed_event_at = None
         if event_at is not None:
@@ -36,9 +42,12 @@ class PostService:
                 parsed_event_at = parsed_event_at.replace(tzinfo=None)
             except Exception:
                 parsed_event_at = None
-        return await PostRepository.create_post(
+        post = await PostRepository.create_post(
             db, title, content, author_id, category_ids, city, image_id, parsed_event_at
         )
+        if post:
+            expiry_scheduler.schedule(post.id, post.event_at)
+        return post
 
     @staticmethod
     async def create_post_and_send_to_moderation(
@@ -51,7 +60,7 @@ class PostService:
         image_id: str | None = None,
         event_at: str | None = None,
         bot=None,
-    ) -> Post:
+    ) -> PostView:
         """Создать пост и отправить на модерацию"""
         # Создаем пост
         parsed_event_at = None
@@ -66,6 +75,8 @@ class PostService:
         post = await PostRepository.create_post(
             db, title, content, author_id, category_ids, city, image_id, parsed_event_at
         )
+        if post:
+            expiry_scheduler.schedule(post.id, post.event_at)
         
         # Отправляем на модерацию
         if post and bot:
@@ -74,7 +85,7 @@ class PostService:
         return post
 
     @staticmethod
-    async def send_post_to_moderation(bot, post: Post, db=None):
+    async def send_post_to_moderation(bot, post: PostView, db=None):
         """Отправить пост на модерацию"""
         moderation_group_id = os.getenv("MODERATION_GROUP_ID")
         logfire.info(f"MODERATION_GROUP_ID: {moderation_group_id}")
@@ -83,10 +94,6 @@ class PostService:
             logfire.error("MODERATION_GROUP_ID не установлен")
             return
         
-        # Загружаем связанные объекты если передан db
-        if db:
-            await db.refresh(post, attribute_names=["author", "categories"])
-        
         # Форматируем пост для модерации
         moderation_text = ModerationService.format_post_for_moderation(post)
         moderation_keyboard = get_moderation_keyboard(post.id)
@@ -98,15 +105,19 @@ class PostService:
             # Если у поста есть изображение, отправляем с фото
             if post.image_id:
                 logfire.info(f"Пост содержит изображение: {post.image_id}")
-                media_photo = await file_storage.get_media_photo(post.image_id)
-                if media_photo:
+                photo = await MediaService.get_photo(db, post.image_id)
+                if photo:
                     logfire.info("Изображение найдено")
-                    await bot.send_photo(
+                    # Выгрузка фото может занять секунды - не держим соединение с БД
+                    await release_connection(db)
+                    sent = await bot.send_photo(
                         chat_id=moderation_group_id,
-                        photo=media_photo.media,
+                        photo=photo,
                         caption=moderation_text,
                         reply_markup=moderation_keyboard
                     )
+                    if not isinstance(photo, str):
+                        await MediaService.remember_sent_photo(db, post.image_id, sent)
                     logfire.info("Пост с изображением отправлен на модерацию")
                     return
                 else:
@@ -114,6 +125,7 @@ class PostService:
             
             # Если нет изображения, отправляем только текст
             logfire.info("Отправляем пост без изображения")
+            await release_connection(db)
             await bot.send_message(
                 chat_id=moderation_group_id,
                 text=moderation_text,
@@ -126,7 +138,7 @@ class PostService:
             logfire.error(f"Стек ошибки: {traceback.format_exc()}")
 
     @staticmethod
-    async def get_user_posts(db: AsyncSession, user_id: int) -> List[Post]:
+    async def get_user_posts(db: AsyncSession, user_id: int) -> List[PostView]:
         """Получить посты пользователя"""
         return await PostRepository.get_user_posts(db, user_id)
 
@@ -135,6 +147,11 @@ class PostService:
         """Получить пост по ID"""
         return await PostRepository.get_post_by_id(db, post_id)
 
+    @staticmethod
+    async def get_post_view(db: AsyncSession, post_id: int) -> Optional[PostView]:
+        """Получить пост для отображения"""
+        return await PostRepository.get_post_view(db, post_id)
+
     @staticmethod
     async def get_posts_by_categories(
         db: AsyncSession, category_ids: list[int]
@@ -143,7 +160,7 @@ class PostService:
         return await PostRepository.get_posts_by_categories(db, category_ids)
 
     @staticmethod
-    async def get_pending_moderation_posts(db: AsyncSession) -> List[Post]:
+    async def get_pending_moderation_posts(db: AsyncSession) -> List[PostView]:
         """Получить посты, ожидающие модерации"""
         return await PostRepository.get_pending_moderation(db)
 
@@ -152,7 +169,10 @@ class PostService:
         db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
     ) -> Post:
         """Одобрить пост"""
-        return await PostRepository.approve_post(db, post_id, moderator_id, comment)
+        post = await PostRepository.approve_post(db, post_id, moderator_id, comment)
+        if post:
+            expiry_scheduler.schedule(post.id, post.event_at)
+        return post
 
     @staticmethod
     async def publish_post(
@@ -178,7 +198,7 @@ class PostService:
     @staticmethod
     async def get_feed_posts(
         db: AsyncSession, user_id: int, limit: int = 10, offset: int = 0
-    ) -> List[Post]:
+    ) -> List[PostView]:
         """Получить посты для ленты пользователя"""
         return await PostRepository.get_feed_posts(db, user_id, limit, offset)
 
@@ -190,7 +210,7 @@ class PostService:
     @staticmethod
     async def get_liked_posts(
         db: AsyncSession, user_id: int, limit: int = 10, offset: int = 0
-    ) -> List[Post]:
+    ) -> List[PostView]:
         return await PostRepository.get_liked_posts(db, user_id, limit, offset)
 
     @staticmethod
@@ -198,9 +218,50 @@ class PostService:
         return await PostRepository.get_liked_posts_count(db, user_id)
 
     @staticmethod
-    async def delete_expired_posts(db: AsyncSession) -> int:
-        return await PostRepository.delete_expired_posts(db)
+    async def cleanup_expired_posts(db: AsyncSession, batch_size: int = None) -> int:
+        """
+        Удалить просроченные посты пачками и файлы, на которые больше никто не ссылается.
+
+        Каждая пачка - отдельная короткая транзакция, между пачками управление
+        отдается event loop, поэтому большой накопившийся хвост не блокирует
+        таблицы и бота. В режиме секционирования прошедшие месяцы удаляются
+        целиком, построчно - только текущий.
+        """
+        batch_size = batch_size or int(os.getenv("EXPIRY_DELETE_BATCH_SIZE", "500"))
+        total = 0
+        if is_partitioning_enabled():
+            deleted, orphaned = await drop_expired_partitions(db)
+            total += deleted
+            await PostService.delete_image_files(db, orphaned)
+
+        while True:
+            deleted, orphaned = await PostRepository.delete_expired_posts_chunk(db, batch_size)
+            total += deleted
+            await PostService.delete_image_files(db, orphaned)
+            if deleted < batch_size:
+                break
+            await asyncio.sleep(0)
+
+        if total:
+            logfire.info(f"🧹 Удалено просроченных постов: {total}")
+        return total
 
     @staticmethod
-    async def get_expired_posts_info(db: AsyncSession) -> list[dict]:
-        return await PostRepository.get_expired_posts_info(db)
+    async def delete_image_files(db: AsyncSession, image_ids: list[str]) -> None:
+        """Удалить файлы изображений вместе со всеми вариантами (миниатюрами) одной пачкой"""
+        from events_bot.storage import image_pipeline
+        # Ссылку могли получить заново после release - такие файлы не трогаем
+        image_ids = await MediaFileRepository.filter_unreferenced(db, image_ids)
+        await release_connection(db)
+        file_ids = [
+            file_id
+            for image_id in image_ids
+            for file_id in image_pipeline.variant_ids(image_id)
+        ]
+        if not file_ids:
+            return
+        results = await file_storage.delete_many(file_ids)
+        failed = [file_id for file_id, ok in results.items() if not ok]
+        logfire.info(
+            f"🧹 Удалено файлов: {len(results) - len(failed)}, не удалось/не найдено: {len(failed)}"
+        )
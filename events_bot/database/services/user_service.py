@@ -1,11 +1,49 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
-from typing import List
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import os
 from ..repositories import UserRepository
 from ..models import User, Category
 
 
+class KnownUserCache:
+    """
+    LRU-кэш профилей уже записанных в БД пользователей.
+
+    Если имя пользователя в Telegram не изменилось с прошлой записи,
+    регистрация обходится без записи в БД.
+    """
+
+    def __init__(self, max_size: int = None):
+        """
+        Args:
+            max_size: Максимум пользователей в кэше
+        """
+        self.max_size = max_size or int(os.getenv("KNOWN_USERS_CACHE_SIZE", "10000"))
+        self._profiles: "OrderedDict[int, Tuple[Optional[str], ...]]" = OrderedDict()
+
+    def is_known(self, telegram_id: int, profile: Tuple[Optional[str], ...]) -> bool:
+        """Записан ли пользователь с таким же профилем"""
+        if self._profiles.get(telegram_id) != profile:
+            return False
+        self._profiles.move_to_end(telegram_id)
+        return True
+
+    def remember(self, telegram_id: int, profile: Tuple[Optional[str], ...]) -> None:
+        self._profiles[telegram_id] = profile
+        self._profiles.move_to_end(telegram_id)
+        if len(self._profiles) > self.max_size:
+            self._profiles.popitem(last=False)
+
+    def forget(self, telegram_id: int) -> None:
+        self._profiles.pop(telegram_id, None)
+
+
+known_users = KnownUserCache()
+
+
 class UserService:
     """Асинхронный сервис для работы с пользователями"""
 
@@ -17,10 +55,25 @@ class UserService:
         first_name: str = None,
         last_name: str = None,
     ) -> User:
-        """Регистрация нового пользователя"""
-        return await UserRepository.get_or_create_user(
+        """Регистрация пользователя или обновление его имени"""
+        profile = (username, first_name, last_name)
+        if known_users.is_known(telegram_id, profile):
+            user = await UserRepository.get_by_telegram_id(db, telegram_id)
+            if user is not None:
+                return user
+            # Пользователя удалили из БД в обход кэша
+            known_users.forget(telegram_id)
+
+        user = await UserRepository.upsert_user(
             db, telegram_id, username, first_name, last_name
         )
+        known_users.remember(telegram_id, profile)
+        return user
+
+    @staticmethod
+    async def set_user_city(db: AsyncSession, user_id: int, city: str) -> None:
+        """Выбор города пользователем"""
+        await UserRepository.set_user_city(db, user_id, city)
 
     @staticmethod
     async def select_categories(
@@ -0,0 +1,44 @@
+"""
+Модели чтения для экранов бота.
+
+Лента, избранное, "Мои посты" и очередь модерации показывают лишь несколько
+полей поста. Вместо ORM-объектов (карта идентичности, инструментирование
+атрибутов, подгрузка author/categories) репозитории возвращают компактные
+неизменяемые PostView, собранные из строк Core-запросов.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class PostView:
+    """Пост для отображения"""
+
+    id: int
+    title: str
+    content: str
+    city: Optional[str]
+    event_at: Optional[datetime]
+    image_id: Optional[str]
+    is_approved: bool
+    created_at: Optional[datetime]
+    author_name: str
+    category_names: Tuple[str, ...]
+
+    @classmethod
+    def from_row(cls, row, category_names: Tuple[str, ...]) -> "PostView":
+        """Собрать из строки запроса с колонками поста и автора"""
+        return cls(
+            id=row.id,
+            title=row.title,
+            content=row.content,
+            city=row.city,
+            event_at=row.event_at,
+            image_id=row.image_id,
+            is_approved=row.is_approved,
+            created_at=row.created_at,
+            author_name=row.first_name or row.username or "Аноним",
+            category_names=category_names,
+        )
@@ -0,0 +1,201 @@
+"""
+Очередь записей для SQLite.
+
+SQLite допускает одного писателя, поэтому параллельные commit из разных
+обработчиков упираются в "database is locked". В режиме SQLITE_WRITE_QUEUE=true
+методы репозиториев, помеченные @write_operation, не пишут через сессию
+обработчика, а ставятся в очередь единственной задаче-писателю. Писатель
+выполняет до SQLITE_WRITE_BATCH операций в одной транзакции (групповой commit),
+каждую - в своей точке сохранения, чтобы ошибка одной не откатывала остальные.
+Читатели работают через обычный пул соединений (WAL).
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+from typing import Any, Callable, List, Optional
+import logfire
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+# Выполняется ли код внутри задачи-писателя (вложенные операции - без очереди)
+_in_writer: contextvars.ContextVar[bool] = contextvars.ContextVar("in_sqlite_writer", default=False)
+
+_write_queue: Optional["SQLiteWriteQueue"] = None
+
+
+def is_write_queue_enabled(database_url: str) -> bool:
+    """Включать ли очередь записей для этого URL"""
+    return (
+        database_url.startswith("sqlite")
+        and os.getenv("SQLITE_WRITE_QUEUE", "false").lower() == "true"
+    )
+
+
+def configure_write_queue(queue: Optional["SQLiteWriteQueue"]) -> None:
+    """Задать очередь записей (None - писать напрямую через сессию вызывающего)"""
+    global _write_queue
+    _write_queue = queue
+
+
+def get_write_queue() -> Optional["SQLiteWriteQueue"]:
+    return _write_queue
+
+
+def enable_savepoints(engine) -> None:
+    """
+    Включить корректные SAVEPOINT для pysqlite/aiosqlite.
+
+    Драйвер сам управляет транзакциями и ломает точки сохранения, поэтому
+    отключаем это и начинаем транзакцию явно - сразу с блокировкой записи.
+    """
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class _BatchSession:
+    """
+    Сессия писателя, которую получает операция.
+
+    commit() превращается во flush(): фиксирует пачку целиком писатель.
+    """
+
+    __slots__ = ("_session",)
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+    async def commit(self) -> None:
+        await self._session.flush()
+
+
+class _WriteOperation:
+    __slots__ = ("func", "args", "kwargs", "future")
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class SQLiteWriteQueue:
+    """Единственный писатель SQLite с групповым commit"""
+
+    def __init__(self, engine, max_batch: int = None):
+        """
+        Args:
+            engine: Движок писателя (одно соединение, см. enable_savepoints)
+            max_batch: Максимум операций в одной транзакции
+        """
+        self.engine = engine
+        self.max_batch = max_batch or int(os.getenv("SQLITE_WRITE_BATCH", "64"))
+        self._session_maker = async_sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> None:
+        """Лениво запустить задачу-писателя в текущем event loop"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run(), name="sqlite-writer")
+
+    async def submit(self, func: Callable, args: tuple, kwargs: dict) -> Any:
+        """Поставить операцию в очередь и дождаться ее фиксации"""
+        self._ensure_started()
+        operation = _WriteOperation(func, args, kwargs)
+        await self._queue.put(operation)
+        return await operation.future
+
+    async def _run(self) -> None:
+        while True:
+            batch: List[_WriteOperation] = [await self._queue.get()]
+            # Все, что накопилось, пока шла предыдущая транзакция, - в одну пачку
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._execute_batch(batch)
+
+    async def _execute_batch(self, batch: List[_WriteOperation]) -> None:
+        results: List[Any] = [None] * len(batch)
+        errors: List[Optional[BaseException]] = [None] * len(batch)
+        token = _in_writer.set(True)
+        try:
+            async with self._session_maker() as session:
+                db = _BatchSession(session)
+                for index, operation in enumerate(batch):
+                    try:
+                        async with session.begin_nested():
+                            results[index] = await operation.func(
+                                db, *operation.args, **operation.kwargs
+                            )
+                    except Exception as e:
+                        errors[index] = e
+                try:
+                    await session.commit()
+                except Exception as e:
+                    logfire.error(f"Ошибка группового commit SQLite ({len(batch)} операций): {e}")
+                    await session.rollback()
+                    errors = [error or e for error in errors]
+        finally:
+            _in_writer.reset(token)
+
+        for operation, result, error in zip(batch, results, errors, strict=True):
+            if operation.future.done():
+                continue
+            if error is not None:
+                operation.future.set_exception(error)
+            else:
+                operation.future.set_result(result)
+
+    async def close(self) -> None:
+        """Остановить писателя"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+async def _merge_result(db, result: Any) -> Any:
+    """Перенести ORM-объекты из сессии писателя в сессию вызывающего"""
+    if hasattr(result, "_sa_instance_state"):
+        return await db.merge(result, load=False)
+    if isinstance(result, list):
+        return [await _merge_result(db, item) for item in result]
+    return result
+
+
+def write_operation(func: Callable) -> Callable:
+    """
+    Пометить метод репозитория как записывающий.
+
+    Первый аргумент метода - сессия. В режиме очереди метод выполняется
+    писателем в его сессии, а результат возвращается в сессию вызывающего.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(db, *args, **kwargs):
+        queue = _write_queue
+        if queue is None or _in_writer.get():
+            return await func(db, *args, **kwargs)
+
+        from .connection import release_connection
+
+        # Отпускаем соединение вызывающего: следующее чтение увидит запись писателя
+        await release_connection(db)
+        result = await queue.submit(func, args, kwargs)
+        return await _merge_result(db, result)
+
+    return wrapper
@@ -3,6 +3,9 @@ import logfire
 from .interfaces import FileStorageInterface
 from .file_storage import LocalFileStorage
 from .s3_storage import S3FileStorage
+from .image_pipeline import ImagePipeline
+from .content_addressed import ContentAddressedStorage
+from .cached_storage import CachedFileStorage
 
 def has_s3_credentials() -> bool:
     """Проверить наличие данных для авторизации в S3"""
@@ -15,8 +18,8 @@ def has_s3_credentials() -> bool:
     return all(os.getenv(var) for var in required_vars)
 
 # Инициализируем файловое хранилище в зависимости от доступности S3
-def get_file_storage() -> FileStorageInterface:
-    """Получить подходящее файловое хранилище"""
+def get_backend_storage() -> FileStorageInterface:
+    """Получить хранилище, в котором физически лежат файлы"""
     
     if has_s3_credentials():
         try:
@@ -29,7 +32,37 @@ def get_file_storage() -> FileStorageInterface:
         logfire.info("No S3 credentials found, using local storage")
         return LocalFileStorage()
 
+
+def get_file_storage() -> FileStorageInterface:
+    """Получить подходящее файловое хранилище"""
+    storage = get_backend_storage()
+    
+    # Локальный дисковый кэш перед S3 (FILE_CACHE_MAX_MB=0 - отключить)
+    if isinstance(storage, S3FileStorage) and int(os.getenv("FILE_CACHE_MAX_MB", "256")) > 0:
+        storage = CachedFileStorage(storage)
+    
+    # Дедупликация по содержимому (STORAGE_DEDUPLICATION=false - отключить)
+    if os.getenv("STORAGE_DEDUPLICATION", "true").lower() != "false":
+        storage = ContentAddressedStorage(storage)
+    
+    return storage
+
 # Инициализируем файловое хранилище для использования во всем приложении
 file_storage = get_file_storage()
 
-__all__ = ["FileStorageInterface", "LocalFileStorage", "S3FileStorage", "file_storage", "get_file_storage"] 
+# Конвейер обработки загружаемых изображений
+image_pipeline = ImagePipeline()
+
+__all__ = [
+    "FileStorageInterface",
+    "LocalFileStorage",
+    "S3FileStorage",
+    "ImagePipeline",
+    "ContentAddressedStorage",
+    "CachedFileStorage",
+    "file_storage",
+    "get_backend_storage",
+    "get_file_storage",
+    "image_pipeline",
+]
+
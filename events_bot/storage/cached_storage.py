@@ -0,0 +1,266 @@
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+import aiofiles
+import logfire
+from aiogram.types import InputMediaPhoto, FSInputFile
+from .interfaces import FileStorageInterface
+
+
+class CachedFileStorage(FileStorageInterface):
+    """
+    Локальный дисковый LRU-кэш поверх другого хранилища (например, S3).
+
+    Запись сквозная: файл сохраняется во внутреннее хранилище и сразу попадает
+    в кэш. При промахе файл скачивается из внутреннего хранилища. Размер кэша
+    ограничен, вытесняются давно не использованные файлы; удаление файлов
+    с диска выполняется в отдельном потоке, не блокируя event loop.
+
+    В многопроцессном режиме (BOT_WORKERS > 1) каждый рабочий процесс ведет
+    свою подпапку с долей общего лимита: индексы процессов не видят друг
+    друга, а перезапущенный процесс не трогает чужие недописанные файлы.
+    """
+
+    # Как часто (в обращениях) писать статистику кэша в лог
+    STATS_LOG_INTERVAL = 100
+
+    def __init__(
+        self,
+        inner: FileStorageInterface,
+        cache_path: str = None,
+        max_bytes: int = None,
+    ):
+        """
+        Args:
+            inner: Хранилище, в котором физически лежат файлы
+            cache_path: Путь к папке кэша
+            max_bytes: Максимальный размер кэша в байтах
+        """
+        self.inner = inner
+        self.cache_path = Path(os.getcwd()) / Path(cache_path or os.getenv("FILE_CACHE_PATH", "cache"))
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else int(os.getenv("FILE_CACHE_MAX_MB", "256")) * 1024 * 1024
+        )
+        worker_index = os.getenv("BOT_WORKER_INDEX")
+        if worker_index is not None:
+            self.cache_path = self.cache_path / f"worker-{worker_index}"
+            self.max_bytes //= max(1, int(os.getenv("BOT_WORKERS", "1")))
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+
+        # file_id -> размер файла; порядок - от давно использованных к недавним
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hits_counter = logfire.metric_counter("file_cache_hits")
+        self._misses_counter = logfire.metric_counter("file_cache_misses")
+        self._evictions_counter = logfire.metric_counter("file_cache_evictions")
+
+        self._load_existing()
+
+    def _load_existing(self) -> None:
+        """Восстановить индекс кэша по файлам на диске (после перезапуска)"""
+        files = []
+        for path in self.cache_path.iterdir():
+            if not path.is_file():
+                continue
+            if path.name.startswith("."):
+                # Недописанный временный файл
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            files.append((stat.st_atime, path.name, stat.st_size))
+
+        for _, file_id, size in sorted(files):
+            self._entries[file_id] = size
+            self._size += size
+        self._unlink_all(self._evict())
+        logfire.info(
+            f"Файловый кэш: {len(self._entries)} файлов, {self._size} байт из {self.max_bytes}"
+        )
+
+    def _path(self, file_id: str) -> Path:
+        return self.cache_path / file_id
+
+    def _temp_path(self, file_id: str) -> Path:
+        # Точка в начале: временные файлы не попадают в индекс при перезапуске
+        return self.cache_path / f".{file_id}.{uuid.uuid4().hex}.part"
+
+    @staticmethod
+    def _unlink_all(paths: List[Path]) -> None:
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    async def _remove(self, paths: List[Path]) -> None:
+        """Удалить файлы с диска в отдельном потоке"""
+        if paths:
+            await asyncio.to_thread(self._unlink_all, paths)
+
+    def _register(self, file_id: str, size: int) -> List[Path]:
+        """Добавить файл в индекс; вернуть вытесненные файлы, которые нужно удалить"""
+        self._size -= self._entries.pop(file_id, 0)
+        self._entries[file_id] = size
+        self._size += size
+        return self._evict()
+
+    def _evict(self) -> List[Path]:
+        """Вытеснить из индекса давно не использованные файлы, пока кэш больше лимита"""
+        evicted = []
+        while self._size > self.max_bytes and self._entries:
+            file_id, size = self._entries.popitem(last=False)
+            self._size -= size
+            evicted.append(self._path(file_id))
+            self.evictions += 1
+            self._evictions_counter.add(1)
+        return evicted
+
+    def _forget(self, file_id: str) -> List[Path]:
+        """Убрать файл из индекса; вернуть его путь для удаления"""
+        size = self._entries.pop(file_id, None)
+        if size is None:
+            return []
+        self._size -= size
+        return [self._path(file_id)]
+
+    def _lookup(self, file_id: str) -> Optional[Path]:
+        """Найти файл в кэше и учесть попадание/промах"""
+        path = self._path(file_id) if file_id in self._entries else None
+        if path is not None and not path.exists():
+            # Файл удалили с диска в обход кэша
+            self._forget(file_id)
+            path = None
+
+        if path is not None:
+            self._entries.move_to_end(file_id)
+            self.hits += 1
+            self._hits_counter.add(1)
+        else:
+            self.misses += 1
+            self._misses_counter.add(1)
+
+        if (self.hits + self.misses) % self.STATS_LOG_INTERVAL == 0:
+            logfire.info("Статистика файлового кэша", **self.stats())
+        return path
+
+    async def _store(self, file_id: str, file_data: bytes) -> bool:
+        """Атомарно записать файл в кэш; False - файл в кэш не попал"""
+        if len(file_data) > self.max_bytes:
+            return False
+        tmp_path = self._temp_path(file_id)
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(file_data)
+            os.replace(tmp_path, self._path(file_id))
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            logfire.warning(f"Не удалось записать файл в кэш {file_id}: {e}")
+            return False
+        await self._remove(self._register(file_id, len(file_data)))
+        return True
+
+    async def _download(self, file_id: str) -> Optional[bytes]:
+        """Скачать файл из внутреннего хранилища и положить в кэш"""
+        file_data = await self.inner.read_file(file_id)
+        if file_data is not None:
+            await self._store(file_id, file_data)
+        return file_data
+
+    def stats(self) -> Dict[str, float]:
+        """Метрики кэша"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+        }
+
+    async def save_file(
+        self, file_data: bytes, file_extension: str, file_id: Optional[str] = None
+    ) -> str:
+        """Сохранить файл во внутреннее хранилище и в кэш"""
+        file_id = await self.inner.save_file(file_data, file_extension, file_id=file_id)
+        await self._store(file_id, file_data)
+        return file_id
+
+    async def save_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        file_extension: str,
+        file_id: Optional[str] = None,
+    ) -> str:
+        """Сохранить поток во внутреннее хранилище, попутно записывая его в кэш"""
+        tmp_path = self._temp_path(file_id or "stream")
+        size = 0
+
+        async def tee() -> AsyncIterator[bytes]:
+            nonlocal size
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in stream:
+                    await f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+
+        try:
+            file_id = await self.inner.save_stream(tee(), file_extension, file_id=file_id)
+            if size <= self.max_bytes:
+                try:
+                    os.replace(tmp_path, self._path(file_id))
+                except OSError as e:
+                    # Файл уже во внутреннем хранилище - без кэша загрузка все равно удалась
+                    logfire.warning(f"Не удалось записать файл в кэш {file_id}: {e}")
+                else:
+                    await self._remove(self._register(file_id, size))
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return file_id
+
+    async def read_file(self, file_id: str) -> Optional[bytes]:
+        """Прочитать файл из кэша, при промахе - из внутреннего хранилища"""
+        path = self._lookup(file_id)
+        if path is not None:
+            try:
+                async with aiofiles.open(path, "rb") as f:
+                    return await f.read()
+            except FileNotFoundError:
+                # Вытеснен параллельно - читаем из внутреннего хранилища
+                self._forget(file_id)
+        return await self._download(file_id)
+
+    async def get_media_photo(self, file_id: str) -> Optional[InputMediaPhoto]:
+        """
+        Отдать файл из кэша; при промахе скачать его в кэш.
+
+        Если файл в кэш не поместился, отдаем как внутреннее хранилище (по ссылке).
+        """
+        path = self._lookup(file_id)
+        if path is None and await self._download(file_id) is not None and file_id in self._entries:
+            path = self._path(file_id)
+        if path is not None:
+            return InputMediaPhoto(media=FSInputFile(str(path)))
+        return await self.inner.get_media_photo(file_id)
+
+    async def get_file_url(self, file_id: str, expires_in: int = 3600) -> Optional[str]:
+        return await self.inner.get_file_url(file_id, expires_in)
+
+    async def delete_file(self, file_id: str) -> bool:
+        await self._remove(self._forget(file_id))
+        return await self.inner.delete_file(file_id)
+
+    async def delete_many(self, file_ids: List[str], concurrency: int = 16) -> Dict[str, bool]:
+        await self._remove([path for file_id in file_ids for path in self._forget(file_id)])
+        return await self.inner.delete_many(file_ids, concurrency)
+
+    async def exists(self, file_id: str) -> bool:
+        if file_id in self._entries:
+            return True
+        return await self.inner.exists(file_id)
@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import AsyncIterator, Dict, List, Optional
+import aiofiles
+import logfire
+from aiogram.types import InputMediaPhoto
+from .interfaces import FileStorageInterface
+from .streams import iter_file
+
+
+class ContentAddressedStorage(FileStorageInterface):
+    """
+    Хранилище с адресацией по содержимому поверх другого хранилища.
+
+    Id файла - SHA-256 его байт, поэтому повторная загрузка той же картинки
+    не создает новый объект. Учет ссылок на файлы ведется в таблице media_files.
+    """
+
+    def __init__(self, inner: FileStorageInterface):
+        """
+        Args:
+            inner: Хранилище, в котором физически лежат файлы
+        """
+        self.inner = inner
+
+    async def save_file(
+        self, file_data: bytes, file_extension: str, file_id: Optional[str] = None
+    ) -> str:
+        """Сохранить файл под id, равным хешу содержимого"""
+        file_id = file_id or hashlib.sha256(file_data).hexdigest()
+        if await self.inner.exists(file_id):
+            logfire.info(f"Файл уже есть в хранилище, повторно не сохраняем: {file_id}")
+            return file_id
+        return await self.inner.save_file(file_data, file_extension, file_id=file_id)
+
+    async def save_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        file_extension: str,
+        file_id: Optional[str] = None,
+    ) -> str:
+        """Сохранить поток под id, равным хешу содержимого"""
+        if file_id:
+            if await self.inner.exists(file_id):
+                return file_id
+            return await self.inner.save_stream(stream, file_extension, file_id=file_id)
+
+        # Ключ известен только после чтения всего потока: хешируем, складывая блоки во временный файл
+        fd, tmp_path = await asyncio.to_thread(tempfile.mkstemp, prefix="cas_")
+        os.close(fd)
+        try:
+            digest = hashlib.sha256()
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in stream:
+                    digest.update(chunk)
+                    await f.write(chunk)
+            file_id = digest.hexdigest()
+
+            if await self.inner.exists(file_id):
+                logfire.info(f"Файл уже есть в хранилище, повторно не сохраняем: {file_id}")
+                return file_id
+            return await self.inner.save_stream(
+                iter_file(tmp_path), file_extension, file_id=file_id
+            )
+        finally:
+            await asyncio.to_thread(os.unlink, tmp_path)
+
+    async def read_file(self, file_id: str) -> Optional[bytes]:
+        return await self.inner.read_file(file_id)
+
+    async def get_media_photo(self, file_id: str) -> Optional[InputMediaPhoto]:
+        return await self.inner.get_media_photo(file_id)
+
+    async def get_file_url(self, file_id: str, expires_in: int = 3600) -> Optional[str]:
+        return await self.inner.get_file_url(file_id, expires_in)
+
+    async def delete_file(self, file_id: str) -> bool:
+        return await self.inner.delete_file(file_id)
+
+    async def delete_many(self, file_ids: List[str], concurrency: int = 16) -> Dict[str, bool]:
+        return await self.inner.delete_many(file_ids, concurrency)
+
+    async def exists(self, file_id: str) -> bool:
+        return await self.inner.exists(file_id)
@@ -1,10 +1,13 @@
-from typing import Optional
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
 import aiofiles
+import logfire
 import os
 import uuid
 from pathlib import Path
 from aiogram.types import InputMediaPhoto, FSInputFile
 from .interfaces import FileStorageInterface
+from .streams import write_stream
 
 
 class LocalFileStorage(FileStorageInterface):
@@ -18,10 +21,12 @@ class LocalFileStorage(FileStorageInterface):
         self.storage_path = Path(os.getcwd()) / Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
     
-    async def save_file(self, file_data: bytes, file_extension: str) -> str:
+    async def save_file(
+        self, file_data: bytes, file_extension: str, file_id: Optional[str] = None
+    ) -> str:
         """Сохранить файл локально"""
-        # Генерируем уникальный id
-        file_id = str(uuid.uuid4())
+        # Генерируем уникальный id, если он не задан явно
+        file_id = file_id or str(uuid.uuid4())
         file_path = self.storage_path / f"{file_id}.{file_extension}"
         
         # Сохраняем файл асинхронно
@@ -30,6 +35,35 @@ class LocalFileStorage(FileStorageInterface):
         
         return file_id
     
+    async def save_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        file_extension: str,
+        file_id: Optional[str] = None,
+    ) -> str:
+        """Сохранить поток локально блоками через aiofiles"""
+        file_id = file_id or str(uuid.uuid4())
+        file_path = self.storage_path / f"{file_id}.{file_extension}"
+        # Пишем во временный файл (не попадает под glob "{id}.*") и атомарно переименовываем
+        tmp_path = self.storage_path / f".{file_id}.{file_extension}.part"
+        
+        try:
+            await write_stream(stream, tmp_path)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        
+        return file_id
+    
+    async def read_file(self, file_id: str) -> Optional[bytes]:
+        """Прочитать файл с диска"""
+        for file_path in self.storage_path.glob(f"{file_id}.*"):
+            if file_path.exists():
+                async with aiofiles.open(file_path, 'rb') as f:
+                    return await f.read()
+        return None
+    
     async def get_media_photo(self, file_id: str) -> Optional[InputMediaPhoto]:
         """Получить файл как InputMediaPhoto для отправки в Telegram"""
         # Ищем файл по id (проверяем все возможные расширения)
@@ -49,6 +83,27 @@ class LocalFileStorage(FileStorageInterface):
     
     async def delete_file(self, file_id: str) -> bool:
         """Удалить файл по id"""
+        return self._delete_sync(file_id)
+    
+    async def delete_many(self, file_ids: List[str], concurrency: int = 16) -> Dict[str, bool]:
+        """Удалить несколько файлов в пуле потоков с ограниченной параллельностью"""
+        file_ids = list(dict.fromkeys(file_ids))
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def delete_one(file_id: str) -> bool:
+            async with semaphore:
+                try:
+                    # glob и unlink блокирующие - выносим из event loop
+                    return await asyncio.to_thread(self._delete_sync, file_id)
+                except OSError as e:
+                    logfire.warning(f"Ошибка удаления файла {file_id}: {e}")
+                    return False
+        
+        results = await asyncio.gather(*(delete_one(file_id) for file_id in file_ids))
+        return dict(zip(file_ids, results, strict=True))
+    
+    def _delete_sync(self, file_id: str) -> bool:
+        """Синхронно удалить файл по id"""
         # Ищем файл по id
         for file_path in self.storage_path.glob(f"{file_id}.*"):
             if file_path.exists():
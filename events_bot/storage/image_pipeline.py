@@ -0,0 +1,187 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+import logfire
+from .interfaces import FileStorageInterface
+from .streams import iter_file, write_stream
+
+
+# Расширения файлов для форматов, которые умеет выдавать конвейер
+FORMAT_EXTENSIONS = {
+    "JPEG": "jpg",
+    "WEBP": "webp",
+}
+
+
+def _encode(image, target: str, image_format: str, quality: int) -> None:
+    """Закодировать изображение Pillow в файл"""
+    if image_format == "JPEG":
+        image.save(target, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(target, format=image_format, quality=quality, method=4)
+
+
+def process_image_file(
+    source_path: str,
+    target_path: str,
+    thumbnail_path: str,
+    max_dimension: int,
+    image_format: str,
+    quality: int,
+    thumbnail_size: int,
+) -> Tuple[str, bool]:
+    """
+    Декодировать, уменьшить и перекодировать изображение, построить миниатюру.
+
+    Выполняется в дочернем процессе: данные передаются через файлы, а не через
+    pickle, поэтому функция принимает и возвращает только пути и флаги.
+
+    Returns:
+        Tuple[str, bool]: Расширение результата и признак того, что миниатюра создана
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        # thumbnail() уменьшает с сохранением пропорций и никогда не увеличивает
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        _encode(image, target_path, image_format, quality)
+
+        has_thumbnail = False
+        if thumbnail_size > 0:
+            image.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+            _encode(image, thumbnail_path, image_format, quality)
+            has_thumbnail = True
+
+    return FORMAT_EXTENSIONS[image_format], has_thumbnail
+
+
+class ImagePipeline:
+    """Конвейер загрузки изображений: обработка в пуле процессов и сохранение вариантов"""
+
+    THUMBNAIL_SUFFIX = "_thumb"
+
+    def __init__(
+        self,
+        max_dimension: int = None,
+        image_format: str = None,
+        quality: int = None,
+        thumbnail_size: int = None,
+        max_workers: int = None,
+    ):
+        """
+        Args:
+            max_dimension: Максимальная сторона основного изображения в пикселях
+            image_format: Формат перекодирования ('JPEG' или 'WEBP')
+            quality: Качество кодирования (1-100)
+            thumbnail_size: Максимальная сторона миниатюры (0 - не создавать)
+            max_workers: Количество процессов обработки
+        """
+        # IMAGE_PROCESSING=false - сохранять оригиналы без перекодирования
+        self.enabled = os.getenv("IMAGE_PROCESSING", "true").lower() != "false"
+        self.max_dimension = max_dimension or int(os.getenv("IMAGE_MAX_DIMENSION", "1280"))
+        self.image_format = (image_format or os.getenv("IMAGE_FORMAT", "JPEG")).upper()
+        self.quality = quality or int(os.getenv("IMAGE_QUALITY", "85"))
+        self.thumbnail_size = (
+            thumbnail_size
+            if thumbnail_size is not None
+            else int(os.getenv("IMAGE_THUMBNAIL_SIZE", "320"))
+        )
+        self.max_workers = max_workers or int(
+            os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1)))
+        )
+
+        if self.image_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Неподдерживаемый формат изображений: {self.image_format}")
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Лениво создать пул процессов"""
+        if self._executor is None:
+            # spawn вместо fork: родительский процесс уже держит event loop и потоки логирования
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def process_file(
+        self, source_path: Path, target_path: Path, thumbnail_path: Path
+    ) -> Tuple[str, bool]:
+        """Обработать файл изображения в пуле процессов, не блокируя event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(),
+            process_image_file,
+            str(source_path),
+            str(target_path),
+            str(thumbnail_path),
+            self.max_dimension,
+            self.image_format,
+            self.quality,
+            self.thumbnail_size,
+        )
+
+    async def ingest_stream(
+        self, storage: FileStorageInterface, stream: AsyncIterator[bytes]
+    ) -> str:
+        """Обработать изображение из потока и сохранить все варианты, вернуть id основного файла"""
+        if not self.enabled:
+            return await storage.save_stream(stream, "jpg")
+
+        # Поток складываем во временный файл: в памяти event loop держим только один блок
+        workdir = Path(await asyncio.to_thread(tempfile.mkdtemp, prefix="image_"))
+        try:
+            source_path = workdir / "source"
+            target_path = workdir / "image"
+            thumbnail_path = workdir / "thumbnail"
+            source_size = await write_stream(stream, source_path)
+
+            try:
+                extension, has_thumbnail = await self.process_file(
+                    source_path, target_path, thumbnail_path
+                )
+            except Exception as e:
+                # Не смогли декодировать - сохраняем оригинал, чтобы не терять пост
+                logfire.warning(f"Не удалось обработать изображение, сохраняем оригинал: {e}")
+                return await storage.save_stream(iter_file(source_path), "jpg")
+
+            file_id = await storage.save_stream(iter_file(target_path), extension)
+            if has_thumbnail:
+                await storage.save_stream(
+                    iter_file(thumbnail_path),
+                    extension,
+                    file_id=self.thumbnail_id(file_id),
+                )
+
+            logfire.info(
+                f"Изображение обработано: {source_size} -> {target_path.stat().st_size} байт, id={file_id}"
+            )
+            return file_id
+        finally:
+            await asyncio.to_thread(shutil.rmtree, workdir, True)
+
+    @classmethod
+    def thumbnail_id(cls, file_id: str) -> str:
+        """Id миниатюры для основного файла"""
+        return f"{file_id}{cls.THUMBNAIL_SUFFIX}"
+
+    @classmethod
+    def variant_ids(cls, file_id: str) -> List[str]:
+        """Все id файлов, относящихся к изображению (для удаления)"""
+        return [file_id, cls.thumbnail_id(file_id)]
+
+    def shutdown(self) -> None:
+        """Остановить пул процессов"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,5 +1,7 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional
+import logfire
 from aiogram.types import InputMediaPhoto
 
 
@@ -7,19 +9,55 @@ class FileStorageInterface(ABC):
     """Абстрактный интерфейс для файлового хранилища"""
     
     @abstractmethod
-    async def save_file(self, file_data: bytes, file_extension: str) -> str:
+    async def save_file(
+        self, file_data: bytes, file_extension: str, file_id: Optional[str] = None
+    ) -> str:
         """
         Сохранить файл и вернуть его id
         
         Args:
             file_data: Данные файла в bytes
             file_extension: Расширение файла (например, 'jpg')
+            file_id: Явный id файла (например, для вариантов изображения); по умолчанию генерируется
             
         Returns:
             str: Уникальный id файла
         """
         pass
     
+    @abstractmethod
+    async def save_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        file_extension: str,
+        file_id: Optional[str] = None,
+    ) -> str:
+        """
+        Сохранить файл из потока блоков и вернуть его id (без полной копии в памяти)
+        
+        Args:
+            stream: Асинхронный итератор блоков данных
+            file_extension: Расширение файла (например, 'jpg')
+            file_id: Явный id файла; по умолчанию генерируется
+            
+        Returns:
+            str: Уникальный id файла
+        """
+        pass
+    
+    @abstractmethod
+    async def read_file(self, file_id: str) -> Optional[bytes]:
+        """
+        Прочитать содержимое файла
+        
+        Args:
+            file_id: Id файла
+            
+        Returns:
+            Optional[bytes]: Данные файла или None если файл не найден
+        """
+        pass
+    
     @abstractmethod
     async def get_media_photo(self, file_id: str) -> Optional[InputMediaPhoto]:
         """
@@ -58,4 +96,42 @@ class FileStorageInterface(ABC):
         Returns:
             bool: True если файл удален, False если файл не найден
         """
-        pass 
+        pass
+    
+    async def delete_many(self, file_ids: List[str], concurrency: int = 16) -> Dict[str, bool]:
+        """
+        Удалить несколько файлов с ограниченной параллельностью
+        
+        Args:
+            file_ids: Id файлов
+            concurrency: Максимум одновременных удалений
+            
+        Returns:
+            Dict[str, bool]: Результат удаления по каждому id (хранилища, которые
+                не различают отсутствующие файлы, возвращают для них True)
+        """
+        file_ids = list(dict.fromkeys(file_ids))
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def delete_one(file_id: str) -> bool:
+            async with semaphore:
+                try:
+                    return await self.delete_file(file_id)
+                except Exception as e:
+                    logfire.warning(f"Ошибка удаления файла {file_id}: {e}")
+                    return False
+        
+        results = await asyncio.gather(*(delete_one(file_id) for file_id in file_ids))
+        return dict(zip(file_ids, results, strict=True))
+    
+    async def exists(self, file_id: str) -> bool:
+        """
+        Проверить, есть ли файл в хранилище
+        
+        Args:
+            file_id: Id файла
+            
+        Returns:
+            bool: True если файл существует
+        """
+        return await self.get_file_url(file_id, expires_in=60) is not None
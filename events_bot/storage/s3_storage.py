@@ -1,6 +1,6 @@
 import os
 import uuid
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional
 from pathlib import Path
 from aioboto3 import Session
 from aiogram.types import InputMediaPhoto, URLInputFile
@@ -10,6 +10,16 @@ import logfire
 from types_aiobotocore_s3 import Client
 
 
+# Расширения, под которыми может лежать файл (id хранится без расширения)
+FILE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp']
+
+# Максимум ключей в одном запросе delete_objects
+DELETE_BATCH_SIZE = 1000
+
+# Коды ошибок S3, означающие отсутствие объекта
+MISSING_KEY_CODES = ('NoSuchKey', '404', 'NotFound')
+
+
 class S3FileStorage(FileStorageInterface):
     """S3 файловое хранилище для продакшена"""
     
@@ -40,6 +50,12 @@ class S3FileStorage(FileStorageInterface):
         if not self.aws_access_key_id or not self.aws_secret_access_key:
             raise ValueError("AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY environment variables are required")
         
+        # Размер части multipart upload (минимум S3 - 5 МиБ для всех частей, кроме последней)
+        self.multipart_part_size = max(
+            5 * 1024 * 1024,
+            int(os.getenv("S3_MULTIPART_PART_SIZE", str(5 * 1024 * 1024))),
+        )
+        
         logfire.info(f"S3 storage initialized with bucket: {self.bucket_name}, region: {self.region_name}")
         self.session: Session = Session(
             aws_access_key_id=self.aws_access_key_id,
@@ -47,10 +63,12 @@ class S3FileStorage(FileStorageInterface):
             region_name=self.region_name
         )
     
-    async def save_file(self, file_data: bytes, file_extension: str) -> str:
+    async def save_file(
+        self, file_data: bytes, file_extension: str, file_id: Optional[str] = None
+    ) -> str:
         """Сохранить файл в S3"""
-        # Генерируем уникальный id
-        file_id = str(uuid.uuid4())
+        # Генерируем уникальный id, если он не задан явно
+        file_id = file_id or str(uuid.uuid4())
         key = f"{file_id}.{file_extension}"
         
         try:
@@ -73,11 +91,125 @@ class S3FileStorage(FileStorageInterface):
             logfire.error(f"Error saving file to S3: {e}")
             raise
     
+    async def save_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        file_extension: str,
+        file_id: Optional[str] = None,
+    ) -> str:
+        """Сохранить поток в S3 через multipart upload (в памяти не больше одной части)"""
+        file_id = file_id or str(uuid.uuid4())
+        key = f"{file_id}.{file_extension}"
+        content_type = self._get_content_type(file_extension)
+        
+        try:
+            async with self.session.client(
+                's3',
+                endpoint_url=self.endpoint_url,
+                use_ssl=False
+            ) as s3_client:
+                s3_client: Client
+                buffer = bytearray()
+                parts = []
+                upload_id = None
+                try:
+                    async for chunk in stream:
+                        buffer += chunk
+                        if len(buffer) < self.multipart_part_size:
+                            continue
+                        if upload_id is None:
+                            upload = await s3_client.create_multipart_upload(
+                                Bucket=self.bucket_name,
+                                Key=key,
+                                ContentType=content_type
+                            )
+                            upload_id = upload['UploadId']
+                        part_number = len(parts) + 1
+                        body = bytes(buffer)
+                        buffer.clear()
+                        part = await s3_client.upload_part(
+                            Bucket=self.bucket_name,
+                            Key=key,
+                            UploadId=upload_id,
+                            PartNumber=part_number,
+                            Body=body
+                        )
+                        parts.append({'ETag': part['ETag'], 'PartNumber': part_number})
+                    
+                    if upload_id is None:
+                        # Файл меньше одной части - multipart не нужен
+                        await s3_client.put_object(
+                            Bucket=self.bucket_name,
+                            Key=key,
+                            Body=bytes(buffer),
+                            ContentType=content_type
+                        )
+                    else:
+                        if buffer:
+                            part_number = len(parts) + 1
+                            part = await s3_client.upload_part(
+                                Bucket=self.bucket_name,
+                                Key=key,
+                                UploadId=upload_id,
+                                PartNumber=part_number,
+                                Body=bytes(buffer)
+                            )
+                            parts.append({'ETag': part['ETag'], 'PartNumber': part_number})
+                        await s3_client.complete_multipart_upload(
+                            Bucket=self.bucket_name,
+                            Key=key,
+                            UploadId=upload_id,
+                            MultipartUpload={'Parts': parts}
+                        )
+                except BaseException:
+                    # Не оставляем в bucket незавершенные загрузки
+                    if upload_id is not None:
+                        await s3_client.abort_multipart_upload(
+                            Bucket=self.bucket_name, Key=key, UploadId=upload_id
+                        )
+                    raise
+            
+            logfire.info(f"File streamed to S3: {key}")
+            return file_id
+        
+        except Exception as e:
+            logfire.error(f"Error streaming file to S3: {e}")
+            raise
+    
+    async def read_file(self, file_id: str) -> Optional[bytes]:
+        """Скачать файл из S3"""
+        try:
+            async with self.session.client(
+                's3',
+                endpoint_url=self.endpoint_url,
+                use_ssl=False
+            ) as s3_client:
+                s3_client: Client
+                for extension in FILE_EXTENSIONS:
+                    key = f"{file_id}.{extension}"
+                    try:
+                        response = await s3_client.get_object(Bucket=self.bucket_name, Key=key)
+                    except ClientError as e:
+                        if e.response['Error']['Code'] in MISSING_KEY_CODES:
+                            continue
+                        raise
+                    async with response['Body'] as body:
+                        data = await body.read()
+                    logfire.info(f"File read from S3: {key}")
+                    return data
+            
+            logfire.warning(f"File not found in S3: {file_id}")
+            return None
+        
+        except Exception as e:
+            logfire.error(f"Error reading file from S3: {e}")
+            return None
+    
     async def get_media_photo(self, file_id: str) -> Optional[InputMediaPhoto]:
         """Получить файл как InputMediaPhoto для отправки в Telegram"""
         try:
             # Пробуем найти файл с разными расширениями
-            for extension in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
+            for extension in FILE_EXTENSIONS:
                 key = f"{file_id}.{extension}"
                 try:
                     # Генерируем временный URL для файла
@@ -97,6 +229,33 @@ class S3FileStorage(FileStorageInterface):
     
     async def delete_file(self, file_id: str) -> bool:
         """Удалить файл из S3 по id"""
+        # delete_objects не сообщает об отсутствии ключа - проверяем заранее
+        if not await self.exists(file_id):
+            return False
+        # Удаляем все возможные расширения одним запросом delete_objects
+        results = await self.delete_many([file_id])
+        return results.get(file_id, False)
+    
+    async def delete_many(self, file_ids: List[str], concurrency: int = 16) -> Dict[str, bool]:
+        """
+        Удалить файлы пачками delete_objects (до 1000 ключей за запрос).
+
+        S3 не сообщает об отсутствии ключа, поэтому для отсутствовавших файлов
+        результат тоже True (файла в хранилище нет); False - ошибка удаления.
+        """
+        file_ids = list(dict.fromkeys(file_ids))
+        results = {file_id: True for file_id in file_ids}
+        if not file_ids:
+            return results
+        
+        # Расширение файла не хранится, поэтому удаляем все возможные ключи
+        keys = [
+            (file_id, f"{file_id}.{extension}")
+            for file_id in file_ids
+            for extension in FILE_EXTENSIONS
+        ]
+        key_owners = {key: file_id for file_id, key in keys}
+        
         try:
             async with self.session.client(
                 's3',
@@ -104,25 +263,35 @@ class S3FileStorage(FileStorageInterface):
                 use_ssl=False
             ) as s3_client:
                 s3_client: Client
-                # Пробуем удалить файл с разными расширениями
-                for extension in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
-                    key = f"{file_id}.{extension}"
+                for start in range(0, len(keys), DELETE_BATCH_SIZE):
+                    batch = keys[start:start + DELETE_BATCH_SIZE]
                     try:
-                        await s3_client.delete_object(Bucket=self.bucket_name, Key=key)
-                        logfire.info(f"File deleted from S3: {key}")
-                        return True
+                        response = await s3_client.delete_objects(
+                            Bucket=self.bucket_name,
+                            Delete={
+                                'Objects': [{'Key': key} for _, key in batch],
+                                'Quiet': True,
+                            }
+                        )
                     except ClientError as e:
-                        if e.response['Error']['Code'] == 'NoSuchKey':
-                            continue
-                        else:
-                            raise
-                            
-            logfire.warning(f"File not found for deletion in S3: {file_id}")
-            return False
-            
+                        logfire.error(f"Error deleting batch from S3: {e}")
+                        for file_id, _ in batch:
+                            results[file_id] = False
+                        continue
+                    # В режиме Quiet S3 возвращает только ключи с ошибками
+                    for error in response.get('Errors', []):
+                        file_id = key_owners.get(error.get('Key'))
+                        if file_id is not None:
+                            results[file_id] = False
+                            logfire.warning(
+                                f"Error deleting {error.get('Key')} from S3: {error.get('Code')} {error.get('Message')}"
+                            )
         except Exception as e:
-            logfire.error(f"Error deleting file from S3: {e}")
-            return False
+            logfire.error(f"Error deleting files from S3: {e}")
+            return {file_id: False for file_id in file_ids}
+        
+        logfire.info(f"Files deleted from S3: {sum(results.values())} of {len(file_ids)}")
+        return results
     
     async def get_file_url(self, file_id: str, expires_in: int = 3600) -> Optional[str]:
         """Получить URL файла для прямого доступа (с временной ссылкой)"""
@@ -134,7 +303,7 @@ class S3FileStorage(FileStorageInterface):
             ) as s3_client:
                 s3_client: Client
                 # Пробуем найти файл с разными расширениями
-                for extension in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
+                for extension in FILE_EXTENSIONS:
                     key = f"{file_id}.{extension}"
                     try:
                         # Проверяем существование файла
@@ -149,7 +318,8 @@ class S3FileStorage(FileStorageInterface):
                         logfire.info("Generated presigned URL for: {key}, {url}", key=key, url=url)
                         return url
                     except ClientError as e:
-                        if e.response['Error']['Code'] == 'NoSuchKey':
+                        # HEAD на отсутствующий ключ возвращает 404, а не NoSuchKey
+                        if e.response['Error']['Code'] in MISSING_KEY_CODES:
                             continue
                         else:
                             raise
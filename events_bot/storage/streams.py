@@ -0,0 +1,27 @@
+from pathlib import Path
+from typing import AsyncIterator, Union
+import aiofiles
+
+
+# Размер блока при потоковом чтении/записи файлов
+CHUNK_SIZE = 64 * 1024
+
+
+async def iter_file(path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Прочитать файл блоками, не загружая его в память целиком"""
+    async with aiofiles.open(path, "rb") as f:
+        while True:
+            chunk = await f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def write_stream(stream: AsyncIterator[bytes], path: Union[str, Path]) -> int:
+    """Записать поток в файл блоками, вернуть количество записанных байт"""
+    size = 0
+    async with aiofiles.open(path, "wb") as f:
+        async for chunk in stream:
+            await f.write(chunk)
+            size += len(chunk)
+    return size
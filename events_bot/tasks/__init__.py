@@ -0,0 +1,11 @@
+from .expiry_scheduler import ExpiryScheduler, expiry_scheduler
+from .leader import LeaderElector, run_singleton
+from .cleanup import cleanup_expired_posts_task
+
+__all__ = [
+    "ExpiryScheduler",
+    "expiry_scheduler",
+    "LeaderElector",
+    "run_singleton",
+    "cleanup_expired_posts_task",
+]
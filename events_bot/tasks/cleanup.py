@@ -0,0 +1,24 @@
+from .expiry_scheduler import expiry_scheduler
+from .leader import run_singleton
+
+
+async def cleanup_expired_posts_task() -> None:
+    """Фоновое удаление просроченных постов"""
+    from events_bot.bot.utils import get_db_session
+    from events_bot.database.services.post_service import PostService
+
+    async def process_due():
+        async with get_db_session() as db:
+            await PostService.cleanup_expired_posts(db)
+
+    async def refresh():
+        async with get_db_session() as db:
+            await expiry_scheduler.seed(db)
+
+    # Очистка выполняется только в экземпляре-лидере; дедлайны загружаются
+    # из БД при каждом избрании и каждые EXPIRY_MAX_SLEEP секунд (посты других
+    # экземпляров), между ними планировщик пополняется при создании и одобрении постов
+    await run_singleton(
+        "expiry_cleanup",
+        lambda: expiry_scheduler.run(process_due, refresh=refresh),
+    )
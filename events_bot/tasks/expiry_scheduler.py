@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
+import logfire
+from events_bot.database.repositories import PostRepository
+
+
+class ExpiryScheduler:
+    """
+    Планировщик удаления просроченных постов.
+
+    Держит min-кучу ближайших event_at и спит ровно до следующего дедлайна,
+    а не опрашивает таблицу постов по таймеру. Все, что наступило к моменту
+    пробуждения, обрабатывается одной пачкой.
+
+    Посты, созданные другими экземплярами бота, в локальную кучу не попадают,
+    поэтому не реже раза в max_sleep дедлайны перечитываются из БД и
+    выполняется страховочная очистка - независимо от состояния кучи.
+    """
+
+    # Запас после дедлайна, чтобы часы БД точно успели дойти до event_at
+    GRACE = timedelta(seconds=1)
+
+    def __init__(self, max_sleep: int = None):
+        """
+        Args:
+            max_sleep: Период в секундах, с которым дедлайны перечитываются из БД
+                и выполняется страховочная очистка
+        """
+        self.max_sleep = max_sleep or int(os.getenv("EXPIRY_MAX_SLEEP", "600"))
+        self._heap: List[Tuple[datetime, int]] = []
+        self._wakeup = asyncio.Event()
+        self._forward: Optional[Callable[[int, datetime], None]] = None
+
+    @staticmethod
+    def _utcnow() -> datetime:
+        # event_at хранится в UTC без tzinfo (см. PostService.create_post)
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def forward_to(self, forward: Optional[Callable[[int, datetime], None]]) -> None:
+        """
+        Передавать дедлайны в другой процесс вместо локальной кучи.
+
+        Используется рабочими процессами, в которых планировщик не запущен:
+        дедлайны уходят процессу, выполняющему фоновые задачи.
+        """
+        self._forward = forward
+
+    def schedule(self, post_id: int, event_at: Optional[datetime]) -> None:
+        """Добавить дедлайн поста; будит планировщик, если дедлайн стал ближайшим"""
+        if event_at is None:
+            return
+        if event_at.tzinfo is not None:
+            event_at = event_at.astimezone(timezone.utc).replace(tzinfo=None)
+        if self._forward is not None:
+            self._forward(post_id, event_at)
+            return
+        heapq.heappush(self._heap, (event_at, post_id))
+        if self._heap[0] == (event_at, post_id):
+            self._wakeup.set()
+
+    async def seed(self, db) -> None:
+        """Заполнить кучу дедлайнами постов из БД (при избрании лидером и страховочных проверках)"""
+        deadlines = await PostRepository.get_post_deadlines(db)
+        self._heap = [(event_at, post_id) for post_id, event_at in deadlines]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+        logfire.info(f"⏰ Планировщик просрочки: загружено дедлайнов {len(self._heap)}")
+
+    def _pop_due(self, now: datetime) -> List[int]:
+        """Извлечь из кучи все наступившие дедлайны"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def _next_timeout(self, now: datetime) -> float:
+        """Сколько спать до ближайшего дедлайна"""
+        if not self._heap:
+            return self.max_sleep
+        delay = (self._heap[0][0] + self.GRACE - now).total_seconds()
+        return max(0.0, min(delay, self.max_sleep))
+
+    async def run(
+        self,
+        process_due: Callable[[], Awaitable[None]],
+        refresh: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> None:
+        """
+        Основной цикл: спать до ближайшего дедлайна и вызывать process_due.
+
+        Args:
+            process_due: Корутина, удаляющая все просроченные посты одной пачкой
+            refresh: Корутина, перечитывающая дедлайны из БД перед страховочной
+                очисткой (посты, созданные другими экземплярами бота)
+        """
+        # Первый проход - полная очистка того, что просрочилось до запуска
+        next_fallback = time.monotonic()
+        while True:
+            fallback = time.monotonic() >= next_fallback
+            if fallback:
+                # Страховочный проход по таймеру, а не только при пустой куче:
+                # ближайший локальный дедлайн не должен откладывать чужие посты
+                next_fallback = time.monotonic() + self.max_sleep
+                if refresh is not None:
+                    try:
+                        await refresh()
+                    except Exception as e:
+                        logfire.error(f"Не удалось загрузить дедлайны постов: {e}")
+            due = self._pop_due(self._utcnow() - self.GRACE)
+            if due or fallback:
+                try:
+                    await process_due()
+                except Exception as e:
+                    logfire.error(f"Ошибка фоновой очистки постов: {e}")
+
+            self._wakeup.clear()
+            timeout = min(
+                self._next_timeout(self._utcnow()),
+                max(0.0, next_fallback - time.monotonic()),
+            )
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Планировщик для использования во всем приложении
+expiry_scheduler = ExpiryScheduler()
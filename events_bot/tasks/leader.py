@@ -0,0 +1,135 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+import logfire
+from events_bot.database.connection import create_async_engine_and_session
+from events_bot.database.repositories import LeaseRepository
+
+
+class LeaderElector:
+    """
+    Выбор лидера для фоновой задачи через аренду в таблице leases.
+
+    Задача выполняется только в экземпляре, который держит аренду. Лидер
+    продлевает ее каждые ttl/3; если продлить не удалось за ttl - ttl/3, задача
+    останавливается еще до истечения аренды, и аренду забирает другой экземпляр.
+    Работает на любой поддерживаемой БД (в том числе SQLite), переключение -
+    не дольше ttl + ttl/3.
+    """
+
+    def __init__(self, name: str, ttl: float = None, holder: str = None):
+        """
+        Args:
+            name: Имя задачи (ключ аренды)
+            ttl: Время аренды в секундах
+            holder: Идентификатор экземпляра
+        """
+        self.name = name
+        self.ttl = ttl or float(os.getenv("LEADER_LEASE_SECONDS", "30"))
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+
+    async def _acquire(self) -> bool:
+        _, session_maker = create_async_engine_and_session()
+        async with session_maker() as db:
+            return await LeaseRepository.try_acquire(db, self.name, self.holder, self.ttl)
+
+    async def _try_acquire(self, timeout: float) -> Optional[bool]:
+        """Взять или продлить аренду; None - БД недоступна или не ответила за timeout"""
+        try:
+            return await asyncio.wait_for(self._acquire(), timeout)
+        except asyncio.TimeoutError:
+            logfire.warning(f"Не удалось обновить аренду {self.name}: нет ответа за {timeout:.1f} с")
+            return None
+        except Exception as e:
+            logfire.warning(f"Не удалось обновить аренду {self.name}: {e}")
+            return None
+
+    async def _release(self) -> None:
+        _, session_maker = create_async_engine_and_session()
+        try:
+            async with session_maker() as db:
+                await LeaseRepository.release(db, self.name, self.holder)
+        except Exception as e:
+            logfire.warning(f"Не удалось освободить аренду {self.name}: {e}")
+
+    async def run(self, job_factory: Callable[[], Awaitable[None]]) -> None:
+        """
+        Выполнять задачу, пока этот экземпляр - лидер, и ждать лидерства в остальное время.
+
+        Args:
+            job_factory: Функция, создающая корутину задачи (вызывается при каждом избрании)
+        """
+        interval = self.ttl / 3
+        while True:
+            acquired_at = time.monotonic()
+            if not await self._try_acquire(interval):
+                await asyncio.sleep(interval)
+                continue
+
+            logfire.info(f"👑 {self.holder} стал лидером задачи {self.name}")
+            self.is_leader = True
+            try:
+                finished = await self._lead(job_factory, interval, acquired_at)
+            finally:
+                self.is_leader = False
+                # Отдаем аренду сразу (в том числе при остановке бота), чтобы не ждать TTL
+                await asyncio.shield(self._release())
+            if finished:
+                return
+            await asyncio.sleep(interval)
+
+    async def _lead(
+        self, job_factory: Callable[[], Awaitable[None]], interval: float, renewed_at: float
+    ) -> bool:
+        """
+        Выполнять задачу, продлевая аренду.
+
+        Аренда истекает не раньше renewed_at + ttl (время начала последнего
+        успешного продления). Лидерство слагается на interval раньше: иначе
+        другой экземпляр мог бы забрать аренду, пока задача еще выполняется здесь.
+
+        Args:
+            renewed_at: time.monotonic() перед запросом, которым аренда была взята
+
+        Returns:
+            bool: True, если задача завершилась сама; False, если лидерство потеряно
+                или задача упала
+        """
+        job = asyncio.create_task(job_factory())
+        step_down_after = self.ttl - interval
+
+        def remaining() -> float:
+            return renewed_at + step_down_after - time.monotonic()
+
+        try:
+            while True:
+                if remaining() > 0:
+                    await asyncio.wait({job}, timeout=min(interval, remaining()))
+                if job.done():
+                    if not job.cancelled() and job.exception() is not None:
+                        logfire.error(f"Фоновая задача {self.name} упала: {job.exception()}")
+                        return False
+                    return True
+                acquired = None
+                if remaining() > 0:
+                    started_at = time.monotonic()
+                    acquired = await self._try_acquire(min(interval, remaining()))
+                    if acquired:
+                        renewed_at = started_at
+                if acquired is False or remaining() <= 0:
+                    # Аренду забрал другой экземпляр или продлить ее не удалось до истечения
+                    logfire.warning(f"{self.holder} потерял лидерство задачи {self.name}")
+                    return False
+        finally:
+            if not job.done():
+                job.cancel()
+                await asyncio.gather(job, return_exceptions=True)
+
+
+async def run_singleton(name: str, job_factory: Callable[[], Awaitable[None]]) -> None:
+    """Выполнять фоновую задачу ровно в одном экземпляре бота"""
+    await LeaderElector(name).run(job_factory)
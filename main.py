@@ -10,19 +10,12 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram import Bot
 from events_bot.database import init_database
-from events_bot.bot.handlers import (
-    register_start_handlers,
-    register_user_handlers,
-    register_post_handlers,
-    register_callback_handlers,
-    register_moderation_handlers,
-    register_feed_handlers,
-)
-from events_bot.bot.middleware import DatabaseMiddleware
-from events_bot.database.services.post_service import PostService
+from events_bot.bot.dispatcher import build_dispatcher
+from events_bot.bot.webhook import run_webhook
+from events_bot.bot.workers import run_supervisor
+from events_bot.tasks import cleanup_expired_posts_task
 from loguru import logger
 
 logger.configure(
@@ -53,57 +46,41 @@ async def main():
     await init_database()
     logfire.info("✅ Database initialized")
 
+    # BOT_WORKERS > 1 - обновления раздаются рабочим процессам по пользователям
+    workers = int(os.getenv("BOT_WORKERS", "1"))
+    if workers > 1:
+        try:
+            await run_supervisor(token_bot, workers)
+        except KeyboardInterrupt:
+            logfire.info("🛑 Bot stopped")
+        return
+
     # Создаем бота и диспетчер
     bot = Bot(token=token_bot)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
-
-    # Подключаем middleware для базы данных
-    dp.message.middleware(DatabaseMiddleware())
-    dp.callback_query.middleware(DatabaseMiddleware())
-
-    # Регистрируем обработчики
-    register_start_handlers(dp)
-    register_user_handlers(dp)
-    register_post_handlers(dp)
-    register_callback_handlers(dp)
-    register_moderation_handlers(dp)
-    register_feed_handlers(dp)
+    dp = build_dispatcher()
 
     logfire.info("🤖 Bot started...")
 
-    async def cleanup_expired_posts_task():
-        from events_bot.bot.utils import get_db_session
-        from events_bot.storage import file_storage
-        while True:
-            try:
-                async with get_db_session() as db:
-                    # Сначала собираем информацию о просроченных постах (id, image_id)
-                    expired = await PostService.get_expired_posts_info(db)
-                    deleted = await PostService.delete_expired_posts(db)
-                    if deleted:
-                        logfire.info(f"🧹 Удалено просроченных постов: {deleted}")
-                        # Удаляем связанные файлы из хранилища
-                        for row in expired:
-                            image_id = row.get("image_id")
-                            if image_id:
-                                try:
-                                    await file_storage.delete_file(image_id)
-                                except Exception:
-                                    pass
-            except Exception as e:
-                logfire.error(f"Ошибка фоновой очистки постов: {e}")
-            await asyncio.sleep(60 * 10)
+    async def receive_updates():
+        # BOT_MODE=webhook - обновления приходят на aiohttp-сервер, иначе long polling
+        if os.getenv("BOT_MODE", "polling").lower() == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            # getUpdates не работает, пока у бота установлен webhook
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
 
     try:
         # Запускаем бота и фоновую очистку одновременно
         await asyncio.gather(
-            dp.start_polling(bot),
+            receive_updates(),
             cleanup_expired_posts_task(),
         )
     except KeyboardInterrupt:
         logfire.info("🛑 Bot stopped")
     finally:
+        from events_bot.storage import image_pipeline
+        image_pipeline.shutdown()
         await bot.session.close()
 
 
@@ -0,0 +1,144 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from events_bot.database import partitioning
+from events_bot.database.models import (
+    Base,
+    Category,
+    Like,
+    MediaFile,
+    ModerationRecord,
+    Post,
+    User,
+    post_categories,
+)
+from events_bot.database.partitioning import add_event_at_columns, drop_expired_partitions
+
+# Текущий месяц в тестах - июнь 2025: все, что раньше 1 июня, просрочено
+CURRENT_MONTH = (2025, 6)
+
+# id поста -> (event_at, image_id)
+POSTS = {
+    1: (datetime(2025, 3, 10, 12, 0), "shared"),
+    2: (datetime(2025, 5, 31, 23, 59), "old_only"),
+    3: (datetime(2025, 6, 1, 0, 0), "shared"),
+    4: (datetime(2025, 6, 20, 18, 30), None),
+    5: (datetime(2025, 9, 1, 10, 0), "future"),
+    6: (None, None),
+}
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_maker(engine):
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+@pytest.fixture(autouse=True)
+def current_month(monkeypatch):
+    monkeypatch.setattr(partitioning, "_current_month", lambda: CURRENT_MONTH)
+
+
+async def _fill(db) -> None:
+    await db.execute(insert(User).values(id=100, first_name="author"))
+    await db.execute(insert(Category).values(id=1, name="Концерты"))
+    for post_id, (event_at, image_id) in POSTS.items():
+        await db.execute(
+            insert(Post).values(
+                id=post_id,
+                title=f"Пост {post_id}",
+                content="...",
+                author_id=100,
+                image_id=image_id,
+                event_at=event_at,
+            )
+        )
+        await db.execute(
+            insert(post_categories).values(post_id=post_id, category_id=1, event_at=event_at)
+        )
+        await db.execute(
+            insert(Like).values(user_id=100, post_id=post_id, event_at=event_at)
+        )
+        await db.execute(
+            insert(ModerationRecord).values(post_id=post_id, moderator_id=100, action="approve")
+        )
+    await db.execute(
+        insert(MediaFile),
+        [
+            {"id": "shared", "ref_count": 2},
+            {"id": "old_only", "ref_count": 1},
+            {"id": "future", "ref_count": 1},
+        ],
+    )
+    await db.commit()
+
+
+async def _post_ids(db, column) -> set:
+    return set((await db.execute(select(column))).scalars())
+
+
+async def test_drop_expired_partitions_deletes_past_months_on_sqlite(session_maker):
+    async with session_maker() as db:
+        await _fill(db)
+        deleted, orphaned = await drop_expired_partitions(db)
+
+        assert deleted == 2
+        # "shared" еще нужен посту 3
+        assert orphaned == ["old_only"]
+
+        kept = {3, 4, 5, 6}
+        assert await _post_ids(db, Post.id) == kept
+        assert await _post_ids(db, Like.post_id) == kept
+        assert await _post_ids(db, post_categories.c.post_id) == kept
+        assert await _post_ids(db, ModerationRecord.post_id) == kept
+
+        ref_counts = dict((await db.execute(select(MediaFile.id, MediaFile.ref_count))).all())
+        assert ref_counts == {"shared": 1, "future": 1}
+
+
+async def test_drop_expired_partitions_is_idempotent(session_maker):
+    async with session_maker() as db:
+        await _fill(db)
+        await drop_expired_partitions(db)
+        assert await drop_expired_partitions(db) == (0, [])
+
+
+async def test_add_event_at_columns_backfills_existing_tables(engine, session_maker):
+    async with session_maker() as db:
+        await _fill(db)
+
+    # База, созданная до появления колонок event_at
+    async with engine.begin() as conn:
+        for name, columns in (
+            ("likes", "id, user_id, post_id, created_at, updated_at"),
+            ("post_categories", "post_id, category_id"),
+        ):
+            await conn.execute(text(f"CREATE TABLE {name}_old AS SELECT {columns} FROM {name}"))
+            await conn.execute(text(f"DROP TABLE {name}"))
+            await conn.execute(text(f"ALTER TABLE {name}_old RENAME TO {name}"))
+
+        await add_event_at_columns(conn)
+        # Повторный запуск ничего не меняет
+        await add_event_at_columns(conn)
+
+    async with session_maker() as db:
+        for table in (Like.__table__, post_categories):
+            rows = (await db.execute(select(table.c.post_id, table.c.event_at))).all()
+            assert {post_id: event_at for post_id, event_at in rows} == {
+                post_id: event_at for post_id, (event_at, _) in POSTS.items()
+            }
+
+        deleted, _ = await drop_expired_partitions(db)
+        assert deleted == 2
+        assert await _post_ids(db, Like.post_id) == {3, 4, 5, 6}
@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from events_bot.database import replicas
+from events_bot.database.models import Base, Category
+from events_bot.database.replicas import USER_ID_KEY, RoutingSession, configure_replicas
+
+USER_ID = 42
+
+
+async def _create_engine(path, category_name):
+    """SQLite-база, в которой есть одна категория с именем, выдающим базу"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Category).values(name=category_name))
+    return engine
+
+
+@pytest.fixture
+async def session_maker(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_REPLICA_RYW_SECONDS", "5")
+    monkeypatch.setattr(replicas, "_recent_writes", {})
+    primary = await _create_engine(tmp_path / "primary.db", "primary")
+    replica = await _create_engine(tmp_path / "replica.db", "replica")
+    configure_replicas([replica])
+    yield async_sessionmaker(
+        bind=primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        expire_on_commit=False,
+        autoflush=False,
+    )
+    configure_replicas([])
+    await primary.dispose()
+    await replica.dispose()
+
+
+def _user_session(session_maker, user_id=USER_ID) -> AsyncSession:
+    db = session_maker()
+    db.sync_session.info[USER_ID_KEY] = user_id
+    return db
+
+
+async def _read(db, use_replica=True) -> str:
+    stmt = select(Category.name).order_by(Category.id).limit(1)
+    if use_replica:
+        stmt = stmt.execution_options(use_replica=True)
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def test_marked_select_goes_to_replica(session_maker):
+    async with _user_session(session_maker) as db:
+        assert await _read(db) == "replica"
+        assert await _read(db, use_replica=False) == "primary"
+
+
+async def test_reads_after_write_stay_on_primary(session_maker):
+    async with _user_session(session_maker) as db:
+        db.add(Category(name="new"))
+        await db.flush()
+        # Незафиксированная запись этой же сессии
+        assert await _read(db) == "primary"
+        await db.commit()
+
+    # Следующая сессия того же пользователя в окне read-your-writes
+    async with _user_session(session_maker) as db:
+        assert await _read(db) == "primary"
+
+    # Другие пользователи по-прежнему читают с реплики
+    async with _user_session(session_maker, user_id=USER_ID + 1) as db:
+        assert await _read(db) == "replica"
+
+
+async def test_reads_return_to_replica_after_window(session_maker, monkeypatch):
+    async with _user_session(session_maker) as db:
+        db.add(Category(name="new"))
+        await db.commit()
+
+    monkeypatch.setenv("DB_REPLICA_RYW_SECONDS", "0")
+    async with _user_session(session_maker) as db:
+        assert await _read(db) == "replica"
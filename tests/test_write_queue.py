@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from events_bot.database.connection import build_engine
+from events_bot.database.models import Base, FSMRecord, Like, Post, User
+from events_bot.database.repositories import FSMRepository, LikeRepository
+from events_bot.database.write_queue import (
+    SQLiteWriteQueue,
+    configure_write_queue,
+    enable_savepoints,
+    get_write_queue,
+)
+
+USERS = 30
+POST_ID = 1
+
+
+@pytest.fixture
+async def session_maker(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_WRITE_QUEUE", "true")
+    # Без очереди параллельные писатели ждали бы блокировку до этого таймаута
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "50")
+    url = f"sqlite+aiosqlite:///{tmp_path / 'test.db'}"
+    engine = build_engine(url)
+    writer_engine = build_engine(url, pool_size=1, max_overflow=0)
+    enable_savepoints(writer_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(User), [{"id": user_id, "first_name": "user"} for user_id in range(USERS)]
+        )
+        await conn.execute(
+            insert(Post).values(id=POST_ID, title="Пост", content="...", author_id=0)
+        )
+
+    queue = SQLiteWriteQueue(writer_engine)
+    configure_write_queue(queue)
+    yield async_sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+    )
+    configure_write_queue(None)
+    await queue.close()
+    await writer_engine.dispose()
+    await engine.dispose()
+
+
+async def test_concurrent_likes_and_fsm_writes_go_through_writer(session_maker):
+    assert get_write_queue() is not None
+    expires_at = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+
+    async def toggle(user_id: int):
+        async with session_maker() as db:
+            return await LikeRepository.toggle_like(db, user_id, POST_ID)
+
+    async def save_state(user_id: int):
+        async with session_maker() as db:
+            await FSMRepository.save(
+                db, f"fsm:{user_id}", expires_at, state="PostStates:waiting_for_title"
+            )
+
+    results = await asyncio.gather(
+        *(toggle(user_id) for user_id in range(USERS)),
+        *(save_state(user_id) for user_id in range(USERS)),
+    )
+
+    likes = [result for result in results if result is not None]
+    assert [like["action"] for like in likes] == ["added"] * USERS
+    async with session_maker() as db:
+        assert await db.scalar(select(func.count()).select_from(Like)) == USERS
+        assert await db.scalar(select(func.count()).select_from(FSMRecord)) == USERS
+        assert await FSMRepository.get(db, "fsm:0") == ("PostStates:waiting_for_title", None)